@@ -0,0 +1,170 @@
+"""
+Контроль допуска запросов к БД
+
+У каждого класса маршрутов свой бюджет одновременных запросов и своя ограниченная очередь:
+    crud     — чтение по ключу и запись (роутеры сущностей)
+    reports  — тяжелое чтение: списки целиком, потоковые выгрузки, поиск, дашборд
+    etl      — запуск задач ETL, загрузка файлов и скачивание результатов
+Сумма бюджетов держится в пределах пула соединений процесса (по умолчанию 5 + 10),
+поэтому запросы не ждут pool_timeout: лишние ждут в очереди не дольше ADMISSION_MAX_WAIT,
+а при полной очереди или по истечении ожидания сразу получают 503 с Retry-After.
+Бюджеты на процесс (воркер) — как и пул соединений. Метрики — GET /admission/.
+"""
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+from typing import Dict
+
+from fastapi import Depends, HTTPException, Request
+
+from streaming import streaming_media_type
+
+logger = logging.getLogger(__name__)
+
+# Класс -> (одновременных запросов, мест в очереди)
+BUDGETS = {
+    'crud': (int(os.getenv('ADMISSION_CRUD', 8)), int(os.getenv('ADMISSION_CRUD_QUEUE', 32))),
+    'reports': (int(os.getenv('ADMISSION_REPORTS', 3)), int(os.getenv('ADMISSION_REPORTS_QUEUE', 6))),
+    'etl': (int(os.getenv('ADMISSION_ETL', 2)), int(os.getenv('ADMISSION_ETL_QUEUE', 4))),
+}
+# Наибольшее ожидание места в очереди, с
+ADMISSION_MAX_WAIT = float(os.getenv('ADMISSION_MAX_WAIT', 2))
+# Сколько последних ожиданий хранить для перцентилей
+WAIT_SAMPLES = 1000
+
+
+class Overloaded(Exception):
+    """Запрос не допущен: очередь класса заполнена или ожидание истекло"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Limiter:
+    """Ограничение одновременных запросов с очередью FIFO (в цикле событий процесса)"""
+
+    def __init__(self, name: str, limit: int, queue: int, max_wait: float):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.max_wait = max_wait
+        self.active = 0
+        self._waiters = deque()
+        self.admitted = 0
+        self.rejected = {'queue_full': 0, 'timeout': 0}
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        # Среднее (EWMA) время удержания места — для оценки Retry-After
+        self._hold = 0.0
+
+    def retry_after(self) -> int:
+        """Через сколько секунд, вероятно, освободится место для нового запроса"""
+        backlog = len(self._waiters) + 1
+        return max(1, math.ceil(self._hold * backlog / self.limit))
+
+    async def acquire(self):
+        started = time.monotonic()
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+        else:
+            if len(self._waiters) >= self.queue:
+                self.rejected['queue_full'] += 1
+                raise Overloaded('queue_full', self.retry_after())
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter, self.max_wait)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                if waiter.done() and not waiter.cancelled():
+                    # Место передано в момент отмены — отдаем его следующему
+                    self._hand_over()
+                elif waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                self.rejected['timeout'] += 1
+                raise Overloaded('timeout', self.retry_after())
+        self.admitted += 1
+        self._waits.append(time.monotonic() - started)
+        return time.monotonic()
+
+    def release(self, admitted_at: float):
+        held = time.monotonic() - admitted_at
+        self._hold = 0.9 * self._hold + 0.1 * held if self._hold else held
+        self._hand_over()
+
+    def _hand_over(self):
+        # Место переходит к первому ожидающему, счетчик занятых не меняется
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> dict:
+        waits = sorted(self._waits)
+
+        def percentile(p):
+            return round(waits[min(len(waits) - 1, int(len(waits) * p))] * 1000, 1) if waits else 0.0
+
+        return {
+            'limit': self.limit,
+            'queue': self.queue,
+            'active': self.active,
+            'waiting': len(self._waiters),
+            'admitted': self.admitted,
+            'rejected': dict(self.rejected),
+            'wait_ms': {'p50': percentile(0.5), 'p99': percentile(0.99)},
+            'hold_ms': round(self._hold * 1000, 1),
+        }
+
+
+limiters: Dict[str, Limiter] = {
+    name: Limiter(name, limit, queue, ADMISSION_MAX_WAIT) for name, (limit, queue) in BUDGETS.items()
+}
+
+
+async def _acquire(limiter: Limiter) -> float:
+    try:
+        return await limiter.acquire()
+    except Overloaded as e:
+        logger.warning(f"Запрос класса {limiter.name} отклонен: {e.reason}")
+        raise HTTPException(status_code=503, detail=f"Сервер перегружен ({limiter.name}), повторите позже",
+                            headers={'Retry-After': str(e.retry_after)})
+
+
+def admit(route_class: str):
+    """Зависимость маршрута: место в бюджете класса до отправки ответа"""
+    limiter = limiters[route_class]
+
+    async def dependency():
+        admitted_at = await _acquire(limiter)
+        try:
+            yield
+        finally:
+            limiter.release(admitted_at)
+
+    return Depends(dependency)
+
+
+async def _crud_or_report(request: Request):
+    # Список целиком и потоковая выгрузка — тяжелое чтение, остальное — CRUD
+    heavy = request.method == 'GET' and (
+        streaming_media_type(request.headers.get('accept'))
+        or (request.url.path.endswith('/') and not request.query_params)
+    )
+    limiter = limiters['reports' if heavy else 'crud']
+    admitted_at = await _acquire(limiter)
+    try:
+        yield
+    finally:
+        limiter.release(admitted_at)
+
+
+# Зависимость роутеров сущностей: класс crud или reports по запросу
+admit_entities = Depends(_crud_or_report)
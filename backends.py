@@ -0,0 +1,349 @@
+import logging
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional, Sequence, Type
+
+from sqlalchemy import create_engine, event, insert, literal, or_, select, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import StaticPool
+
+logger = logging.getLogger(__name__)
+
+
+class Backend:
+    """Бэкенд БД: параметры движка, массовая вставка и ошибки драйвера"""
+
+    name = 'default'
+    # Создавать таблицы из Base.metadata при запуске
+    auto_create_schema = False
+    # Параметров в одной команде (SQLite с 3.32 — 32766, PostgreSQL — 65535)
+    max_parameters = 32766
+
+    def __init__(self, url: str):
+        self.url = make_url(url)
+
+    def engine_options(self) -> Dict[str, Any]:
+        """Дополнительные параметры create_engine"""
+        return {}
+
+    def configure(self, engine: Engine):
+        """Настройка движка после создания (обработчики событий)"""
+
+    def create_engine(self) -> Engine:
+        engine = create_engine(self.url, **self.engine_options())
+        self.configure(engine)
+        logger.info(f"БД: {self.name} ({self.url.render_as_string(hide_password=True)})")
+        return engine
+
+    def read_only_engine(self) -> Optional[Engine]:
+        """
+        Движок для чтения без изменений в БД (проверка файлов перед загрузкой)
+        Возвращает: None, если БД еще нет
+        """
+        return self.create_engine()
+
+    def integrity_errors(self) -> tuple:
+        """Исключения нарушения целостности (SQLAlchemy и драйвера)"""
+        return (IntegrityError,)
+
+    def replica_lag(self, connection) -> Optional[float]:
+        """
+        Отставание реплики от основной БД, с (соединение с репликой)
+        Возвращает: None, если БД его не сообщает (копии файла SQLite)
+        """
+        return None
+
+    def bulk_insert(self, session, model_class: Type, rows: List[Dict[str, Any]]):
+        """Массовая вставка строк (ключи — атрибуты модели) одной командой executemany"""
+        session.execute(insert(model_class), rows)
+
+    def chunks(self, rows: Sequence, width: int = 1) -> Iterator[Sequence]:
+        """Части строк, чтобы параметров команды (width на строку) было не больше max_parameters"""
+        size = max(1, self.max_parameters // max(width, 1))
+        for start in range(0, len(rows), size):
+            yield rows[start:start + size]
+
+    def _column_rows(self, model_class: Type, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Строки с ключами-атрибутами модели → ключи-имена столбцов таблицы"""
+        attrs = model_class.__mapper__.attrs
+        return [{attrs[key].columns[0].name: value for key, value in row.items()} for row in rows]
+
+    def _columns(self, model_class: Type, keys: Sequence[str]) -> List[str]:
+        attrs = model_class.__mapper__.attrs
+        return [attrs[key].columns[0].name for key in keys]
+
+    def upsert(self, session, model_class: Type, rows: List[Dict[str, Any]], update: Sequence[str],
+               changed: Sequence[str] = (), returning: bool = False) -> List[Dict[str, Any]]:
+        """
+        Вставка или обновление по первичному ключу одной командой INSERT ... ON CONFLICT
+        update — атрибуты, обновляемые у существующих строк;
+        changed — обновлять только если хотя бы один из этих атрибутов отличается
+        Возвращает: вставленные/обновленные строки (ключи — имена столбцов), если returning
+        """
+        dialect_insert = self._dialect_insert()
+        if dialect_insert is None:
+            return self._upsert_rows(session, model_class, rows, update, changed, returning)
+        written = []
+        for chunk in self.chunks(self._column_rows(model_class, rows), len(model_class.__table__.columns)):
+            written.extend(self._upsert_chunk(session, model_class, dialect_insert, chunk, update, changed, returning))
+        return written
+
+    def _upsert_chunk(self, session, model_class: Type, dialect_insert, rows: List[Dict[str, Any]],
+                      update: Sequence[str], changed: Sequence[str], returning: bool) -> List[Dict[str, Any]]:
+        table = model_class.__table__
+        stmt = dialect_insert(table).values(rows)
+        where = None
+        if changed:
+            where = or_(*(
+                table.c[column].is_distinct_from(stmt.excluded[column])
+                for column in self._columns(model_class, changed)
+            ))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(table.primary_key.columns),
+            set_={column: stmt.excluded[column] for column in self._columns(model_class, update)},
+            where=where,
+        )
+        if returning:
+            return [dict(row) for row in session.execute(stmt.returning(*table.c)).mappings()]
+        session.execute(stmt)
+        return []
+
+    def _upsert_rows(self, session, model_class: Type, rows: List[Dict[str, Any]], update: Sequence[str],
+                     changed: Sequence[str], returning: bool) -> List[Dict[str, Any]]:
+        """
+        upsert без ON CONFLICT (MySQL, Oracle и др.): по строке UPDATE, при отсутствии строки — INSERT
+        Строка сначала блокируется SELECT ... FOR UPDATE, где диалект это поддерживает
+        """
+        table = model_class.__table__
+        update_columns = self._columns(model_class, update)
+        changed_columns = self._columns(model_class, changed)
+        written = []
+        for row in self._column_rows(model_class, rows):
+            where = [column == row[column.name] for column in table.primary_key.columns]
+            exists = session.execute(select(literal(1)).where(*where).with_for_update()).first() is not None
+            if not exists:
+                try:
+                    with session.begin_nested():
+                        session.execute(insert(table).values(row))
+                except IntegrityError:
+                    # Строку успела вставить параллельная транзакция — обновляем ее
+                    exists = True
+                else:
+                    written.append(where)
+            if exists and update_columns:
+                if changed_columns:
+                    where.append(or_(*(table.c[column].is_distinct_from(row[column]) for column in changed_columns)))
+                result = session.execute(
+                    table.update().where(*where).values({column: row[column] for column in update_columns})
+                )
+                if result.rowcount:
+                    written.append(where[:len(table.primary_key.columns)])
+        if not returning:
+            return []
+        return [dict(session.execute(select(*table.c).where(*where)).mappings().one()) for where in written]
+
+    def insert_missing(self, session, model_class: Type, rows: List[Dict[str, Any]]):
+        """Вставка строк, которых еще нет (по первичному ключу); существующие не меняются"""
+        dialect_insert = self._dialect_insert()
+        if dialect_insert is not None:
+            table = model_class.__table__
+            for chunk in self.chunks(self._column_rows(model_class, rows), len(table.columns)):
+                stmt = dialect_insert(table).values(chunk)
+                session.execute(stmt.on_conflict_do_nothing(index_elements=list(table.primary_key)))
+            return
+        table = model_class.__table__
+        for row in self._column_rows(model_class, rows):
+            where = [column == row[column.name] for column in table.primary_key.columns]
+            if session.execute(select(literal(1)).where(*where)).first() is not None:
+                continue
+            try:
+                with session.begin_nested():
+                    session.execute(insert(table).values(row))
+            except IntegrityError:
+                # Строку успела вставить параллельная транзакция
+                pass
+
+    def _dialect_insert(self):
+        """insert с поддержкой ON CONFLICT для диалекта; None — у диалекта его нет"""
+        name = self.url.get_backend_name()
+        if name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        elif name == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            return None
+        return dialect_insert
+
+    def compile_sql(self, connection, statement) -> str:
+        """SQL запроса с подставленными значениями параметров"""
+        if isinstance(statement, str):
+            return statement
+        return str(statement.compile(dialect=connection.dialect, compile_kwargs={'literal_binds': True}))
+
+    def explain(self, connection, statement) -> List[str]:
+        """План выполнения запроса (без выполнения самого запроса)"""
+        sql = self.compile_sql(connection, statement)
+        return [str(row[0]) for row in connection.exec_driver_sql(f"EXPLAIN {sql}")]
+
+
+class MSSQLBackend(Backend):
+    """Microsoft SQL Server через pyodbc"""
+
+    name = 'mssql'
+    # Предел SQL Server — 2100 параметров на запрос
+    max_parameters = 2000
+
+    def engine_options(self) -> Dict[str, Any]:
+        # Пакетная отправка параметров executemany в драйвере ODBC
+        return {'fast_executemany': True}
+
+    def integrity_errors(self) -> tuple:
+        import pyodbc
+
+        return (IntegrityError, pyodbc.IntegrityError)
+
+    def replica_lag(self, connection) -> Optional[float]:
+        # Вторичная реплика группы доступности: повтор журнала отстает от полученного;
+        # вне группы строки нет — отставание неизвестно
+        return connection.execute(text(
+            "SELECT DATEDIFF(SECOND, last_redone_time, last_hardened_time) "
+            "FROM sys.dm_hadr_database_replica_states WHERE is_local = 1 AND database_id = DB_ID()"
+        )).scalar()
+
+    def upsert(self, session, model_class: Type, rows: List[Dict[str, Any]], update: Sequence[str],
+               changed: Sequence[str] = (), returning: bool = False) -> List[Dict[str, Any]]:
+        # SQL Server: MERGE с HOLDLOCK, иначе параллельные вставки одного ключа конфликтуют
+        table = model_class.__table__
+        quote = session.get_bind().dialect.identifier_preparer.quote
+        columns = [column.name for column in table.columns]
+        keys = [column.name for column in table.primary_key.columns]
+        update_columns = self._columns(model_class, update)
+        changed_columns = self._columns(model_class, changed)
+        written = []
+        for chunk in self.chunks(self._column_rows(model_class, rows), len(columns)):
+            written.extend(self._merge(session, table, quote, chunk, columns, keys, update_columns,
+                                       changed_columns, returning))
+        return written
+
+    @staticmethod
+    def _merge(session, table, quote, rows: List[Dict[str, Any]], columns: List[str], keys: List[str],
+               update_columns: List[str], changed_columns: List[str], returning: bool) -> List[Dict[str, Any]]:
+        params = {}
+        values = []
+        for i, row in enumerate(rows):
+            placeholders = []
+            for j, column in enumerate(columns):
+                params[f"p{i}_{j}"] = row.get(column)
+                placeholders.append(f":p{i}_{j}")
+            values.append(f"({', '.join(placeholders)})")
+
+        matched = 'WHEN MATCHED'
+        if changed_columns:
+            # Значения NULL в этих столбцах не ожидаются (NOT NULL)
+            matched += ' AND (' + ' OR '.join(
+                f"target.{quote(c)} <> source.{quote(c)}" for c in changed_columns
+            ) + ')'
+
+        sql = (
+            f"MERGE INTO {quote(table.name)} WITH (HOLDLOCK) AS target "
+            f"USING (VALUES {', '.join(values)}) AS source ({', '.join(quote(c) for c in columns)}) "
+            f"ON {' AND '.join(f'target.{quote(c)} = source.{quote(c)}' for c in keys)} "
+            f"{matched} THEN UPDATE SET "
+            f"{', '.join(f'target.{quote(c)} = source.{quote(c)}' for c in update_columns)} "
+            f"WHEN NOT MATCHED THEN INSERT ({', '.join(quote(c) for c in columns)}) "
+            f"VALUES ({', '.join(f'source.{quote(c)}' for c in columns)})"
+        )
+        if returning:
+            sql += f" OUTPUT {', '.join(f'inserted.{quote(c)}' for c in columns)};"
+            return [dict(row) for row in session.execute(text(sql), params).mappings()]
+        session.execute(text(sql + ';'), params)
+        return []
+
+    def explain(self, connection, statement) -> List[str]:
+        # SHOWPLAN_TEXT действует на весь пакет, поэтому включается отдельной командой
+        sql = self.compile_sql(connection, statement)
+        cursor = connection.connection.cursor()
+        try:
+            cursor.execute("SET SHOWPLAN_TEXT ON")
+            cursor.execute(sql)
+            lines = []
+            while True:
+                lines.extend(str(row[0]) for row in cursor.fetchall())
+                if not cursor.nextset():
+                    break
+            return lines
+        finally:
+            cursor.execute("SET SHOWPLAN_TEXT OFF")
+            cursor.close()
+
+
+class SQLiteBackend(Backend):
+    """Локальная БД SQLite в файле или в памяти процесса"""
+
+    name = 'sqlite'
+    auto_create_schema = True
+
+    PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'temp_store': 'MEMORY',
+        'cache_size': -64000,
+        'mmap_size': 256 * 1024 * 1024,
+        'busy_timeout': 5000,
+        # Внешние ключи в SQLite по умолчанию не проверяются
+        'foreign_keys': 'ON',
+    }
+
+    @property
+    def in_memory(self) -> bool:
+        return self.url.database in (None, '', ':memory:')
+
+    def engine_options(self) -> Dict[str, Any]:
+        options = {'connect_args': {'check_same_thread': False}}
+        if self.in_memory:
+            # Одно соединение на процесс, иначе у каждого соединения своя пустая БД
+            options['poolclass'] = StaticPool
+        return options
+
+    def configure(self, engine: Engine):
+        pragmas = dict(self.PRAGMAS)
+        if self.in_memory:
+            pragmas.pop('journal_mode')
+
+        @event.listens_for(engine, 'connect')
+        def set_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma, value in pragmas.items():
+                cursor.execute(f"PRAGMA {pragma}={value}")
+            cursor.close()
+
+    def read_only_engine(self) -> Optional[Engine]:
+        # Подключение создало бы файл БД, а journal_mode=WAL — еще и файлы -wal и -shm
+        if self.in_memory or not Path(self.url.database).is_file():
+            return None
+        url = self.url.set(database=f"file:{Path(self.url.database).resolve().as_posix()}",
+                           query={'mode': 'ro', 'uri': 'true'})
+        return create_engine(url, connect_args={'check_same_thread': False})
+
+    def explain(self, connection, statement) -> List[str]:
+        sql = self.compile_sql(connection, statement)
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")
+        # id, parent, notused, detail: отступ по глубине вложенности
+        depth = {0: -1}
+        lines = []
+        for node_id, parent, _, detail in rows:
+            depth[node_id] = depth.get(parent, -1) + 1
+            lines.append('  ' * depth[node_id] + detail)
+        return lines
+
+
+BACKENDS = {
+    'mssql': MSSQLBackend,
+    'sqlite': SQLiteBackend,
+}
+
+
+def get_backend(url: str) -> Backend:
+    """Выбирает бэкенд по диалекту URL"""
+    backend_class = BACKENDS.get(make_url(url).get_backend_name(), Backend)
+    return backend_class(url)
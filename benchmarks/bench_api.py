@@ -0,0 +1,154 @@
+"""
+Нагрузочные сценарии HTTP API на локальной БД SQLite
+
+Сервер запускается отдельным процессом uvicorn, БД наполняется синтетическими
+данными через import_all. Для каждого сценария считаются RPS и перцентили задержки.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_api --rows 10000 --requests 2000 --concurrency 16
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import httpx
+
+from benchmarks.common import use_database, reset_schema, write_results
+from benchmarks.generate import generate, scale
+
+
+def _scenarios(rows: int):
+    """Сценарии: имя, метод, функция построения пути, доля от числа запросов"""
+    sizes = scale(rows)
+    employees, teams = sizes['сотрудники'], sizes['команды']
+    rnd = random.Random(7)
+
+    return [
+        ('root', 'GET', lambda: '/', 1.0),
+        ('get_employee', 'GET', lambda: f"/employees/?employee_id={rnd.randint(1, employees)}", 1.0),
+        ('get_service', 'GET', lambda: f"/services/?service_id={rnd.randint(1, rows)}", 1.0),
+        ('employee_teams', 'GET', lambda: f"/employees/{rnd.randint(1, employees)}/teams?active=true", 1.0),
+        ('list_positions', 'GET', lambda: '/positions/', 1.0),
+        ('list_teams', 'GET', lambda: '/teams/', 1.0),
+        ('create_client', 'POST',
+         lambda: f"/clients/?contact_person=Bench&phone=80000000000&email=bench{rnd.randint(1, 10 ** 9)}@example.com",
+         0.5),
+        ('update_payment', 'PUT',
+         lambda: f"/payments/{rnd.randint(1, sizes['оплата'])}/status?paid={rnd.choice(['true', 'false'])}", 0.5),
+        ('toggle_participation', 'POST',
+         lambda: f"/employees/{rnd.randint(1, employees)}/teams/{rnd.randint(1, teams)}"
+                 f"?active={rnd.choice(['true', 'false'])}", 0.5),
+        ('list_services', 'GET', lambda: '/services/', 0.01),
+    ]
+
+
+def _run(base_url: str, method: str, make_path, requests: int, concurrency: int) -> dict:
+    """Выполняет запросы сценария с заданной конкурентностью"""
+    # Пути строятся заранее: генератор случайных чисел не потокобезопасен
+    paths = [make_path() for _ in range(requests)]
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    local = threading.local()
+
+    def call(path):
+        nonlocal errors
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = httpx.Client(base_url=base_url, timeout=60)
+        started = time.perf_counter()
+        response = client.request(method, path)
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if response.status_code >= 500:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(call, paths))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        'requests': requests,
+        'errors': errors,
+        'rps': round(requests / wall, 1),
+        'p50_ms': round(quantiles[49] * 1000, 2),
+        'p95_ms': round(quantiles[94] * 1000, 2),
+        'p99_ms': round(quantiles[98] * 1000, 2),
+    }
+
+
+def _start_server(port: int, command: list = None) -> subprocess.Popen:
+    """Запускает сервер (по умолчанию — один процесс uvicorn) и ждет готовности"""
+    if command is None:
+        command = [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(port), '--log-level', 'warning']
+    process = subprocess.Popen(command, env=os.environ.copy())
+    for _ in range(300):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError('Сервер не запустился')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Нагрузочные сценарии API')
+    parser.add_argument('--rows', type=int, default=10_000, help='Число услуг в наборе данных')
+    parser.add_argument('--requests', type=int, default=2000, help='Запросов на сценарий')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workdir', default='bench_data', help='Каталог для данных и БД')
+    parser.add_argument('--database', help='URL БД (по умолчанию новый файл SQLite)')
+    parser.add_argument('--json', help='Файл для сохранения результатов')
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir)
+    data_dir = workdir / f"csv_{args.rows}"
+    if not data_dir.exists():
+        print(f"Генерация данных в {data_dir}...")
+        generate(str(data_dir), args.rows)
+
+    use_database(args.database, str(workdir / 'bench_api.db'))
+
+    from etl_cli import import_all
+
+    print("Наполнение БД...")
+    reset_schema()
+    with contextlib.redirect_stdout(io.StringIO()):
+        import_all(str(data_dir))
+
+    server = _start_server(args.port)
+    base_url = f"http://127.0.0.1:{args.port}"
+    results = {}
+    try:
+        for name, method, make_path, share in _scenarios(args.rows):
+            requests = max(10, int(args.requests * share))
+            result = _run(base_url, method, make_path, requests, args.concurrency)
+            results[name] = result
+            print(f"  {name:22} {result['rps']:>9} rps  p50 {result['p50_ms']:>8} мс  "
+                  f"p99 {result['p99_ms']:>8} мс  ошибок {result['errors']}")
+    finally:
+        server.terminate()
+        server.wait()
+
+    if args.json:
+        params = {'rows': args.rows, 'requests': args.requests, 'concurrency': args.concurrency}
+        write_results(args.json, 'api', params, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Бенчмарк ETL: extract, transform, load, import_all и export_all на синтетических данных
+
+Запуск из корня репозитория (по умолчанию — новая БД SQLite в bench_data):
+    python -m benchmarks.bench_etl --rows 100000 --json bench_data/etl.json
+"""
+import argparse
+import contextlib
+import io
+import time
+from pathlib import Path
+
+from benchmarks.common import use_database, reset_schema, write_results
+from benchmarks.generate import generate
+
+
+def _timed(results: dict, name: str, rows: int, fn, *args):
+    """Выполняет шаг бенчмарка и записывает время и пропускную способность"""
+    started = time.perf_counter()
+    # Вывод CLI-функций не нужен в отчете бенчмарка
+    with contextlib.redirect_stdout(io.StringIO()):
+        value = fn(*args)
+    seconds = time.perf_counter() - started
+
+    results[name] = {
+        'seconds': round(seconds, 3),
+        'rows': rows,
+        'rows_per_second': round(rows / seconds) if seconds else None,
+    }
+    print(f"  {name:12} {seconds:9.3f} с  {results[name]['rows_per_second']:>10} строк/с")
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк ETL')
+    parser.add_argument('--rows', type=int, default=10_000, help='Число услуг в наборе данных')
+    parser.add_argument('--workdir', default='bench_data', help='Каталог для данных и БД')
+    parser.add_argument('--database', help='URL БД (по умолчанию новый файл SQLite)')
+    parser.add_argument('--json', help='Файл для сохранения результатов')
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir)
+    data_dir = workdir / f"csv_{args.rows}"
+    if not data_dir.exists():
+        print(f"Генерация данных в {data_dir}...")
+        generate(str(data_dir), args.rows)
+
+    use_database(args.database, str(workdir / 'bench_etl.db'))
+
+    # Модули с БД импортируются после выбора стенда
+    from etl.extractor import extract
+    from etl.loader import load
+    from etl.transformer import transform
+    from etl_cli import import_all, export_all
+
+    reset_schema()
+    counts = {path.stem: sum(1 for _ in open(path, encoding='utf-8-sig')) - 1
+              for path in data_dir.glob('*.csv')}
+    services = str(data_dir / 'услуга.csv')
+    rows = counts['услуга']
+    total = sum(counts.values())
+
+    results = {}
+    print(f"\nУслуг: {rows}, всего строк: {total}")
+    batch = _timed(results, 'extract', rows, extract, services)
+    model_class, transformed = _timed(results, 'transform', rows, transform, batch, 'услуга')
+    _timed(results, 'load', rows, load, model_class, transformed)
+
+    reset_schema()
+    _timed(results, 'import_all', total, import_all, str(data_dir))
+    _timed(results, 'export_all', total, export_all, str(workdir / f"export_{args.rows}"))
+
+    if args.json:
+        write_results(args.json, 'etl', {'rows': args.rows, 'counts': counts}, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Планы и задержка горячих запросов роутеров без индексов и с индексами из models.py
+
+Запуск из корня репозитория (по умолчанию — новая БД SQLite в bench_data):
+    python -m benchmarks.bench_indexes --rows 100000 --json bench_data/indexes.json
+"""
+import argparse
+import contextlib
+import io
+import random
+import statistics
+import time
+from pathlib import Path
+
+from benchmarks.common import use_database, reset_schema, write_results
+from benchmarks.generate import generate, scale
+
+
+def _queries(sizes: dict) -> dict:
+    """Горячие запросы: имя -> функция, строящая запрос со случайным параметром"""
+    from sqlalchemy import func, select
+
+    from models import Contract, Payment, Project, Service, TeamParticipation
+
+    return {
+        'employee_teams': lambda rnd: select(TeamParticipation).where(
+            TeamParticipation.employee == rnd.randint(1, sizes['сотрудники']),
+            TeamParticipation.active.is_(True)
+        ),
+        'project_services': lambda rnd: select(Service).where(
+            Service.project == rnd.randrange(2, sizes['договор'] + 1, 2)
+        ),
+        'client_contracts': lambda rnd: select(Contract).where(
+            Contract.client == rnd.randint(1, sizes['клиент'])
+        ),
+        'client_projects': lambda rnd: select(Project).where(
+            Project.client == rnd.randint(1, sizes['клиент'])
+        ),
+        'unpaid_total': lambda rnd: select(func.sum(Payment.amount)).where(Payment.paid.is_(False)),
+    }
+
+
+def _indexes():
+    from models import Base
+
+    return [index for table in Base.metadata.sorted_tables for index in table.indexes]
+
+
+def measure(connection, backend, build, repeat: int) -> dict:
+    """План запроса и задержка выполнения по repeat случайным параметрам"""
+    rnd = random.Random(42)
+    plan = backend.explain(connection, build(rnd))
+    timings = []
+    for _ in range(repeat):
+        stmt = build(rnd)
+        started = time.perf_counter()
+        connection.execute(stmt).all()
+        timings.append(time.perf_counter() - started)
+
+    timings.sort()
+    return {
+        'plan': plan,
+        'p50_ms': round(statistics.median(timings) * 1000, 3),
+        'p95_ms': round(timings[int(len(timings) * 0.95) - 1] * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк индексов горячих запросов')
+    parser.add_argument('--rows', type=int, default=100_000, help='Число услуг в наборе данных')
+    parser.add_argument('--repeat', type=int, default=200, help='Выполнений каждого запроса')
+    parser.add_argument('--workdir', default='bench_data', help='Каталог для данных и БД')
+    parser.add_argument('--database', help='URL БД (по умолчанию новый файл SQLite)')
+    parser.add_argument('--json', help='Файл для сохранения результатов')
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir)
+    data_dir = workdir / f"csv_{args.rows}"
+    if not data_dir.exists():
+        print(f"Генерация данных в {data_dir}...")
+        generate(str(data_dir), args.rows)
+
+    use_database(args.database, str(workdir / 'bench_indexes.db'))
+
+    # Модули с БД импортируются после выбора стенда
+    from database import backend, engine
+    from etl_cli import import_all
+
+    reset_schema()
+    with contextlib.redirect_stdout(io.StringIO()):
+        import_all(str(data_dir))
+
+    queries = _queries(scale(args.rows))
+    indexes = _indexes()
+    results = {name: {} for name in queries}
+
+    for variant in ('without', 'with'):
+        for index in indexes:
+            if variant == 'without':
+                index.drop(engine, checkfirst=True)
+            else:
+                index.create(engine, checkfirst=True)
+
+        with engine.connect() as connection:
+            if engine.dialect.name == 'sqlite':
+                # Статистика для планировщика, как после обычной эксплуатации
+                connection.exec_driver_sql('ANALYZE')
+            print(f"\n{'Индексы' if variant == 'with' else 'Без индексов'}:")
+            for name, build in queries.items():
+                result = measure(connection, backend, build, args.repeat)
+                results[name][variant] = result
+                print(f"  {name:18} p50 {result['p50_ms']:9.3f} мс  p95 {result['p95_ms']:9.3f} мс")
+                for line in result['plan']:
+                    print(f"      {line}")
+
+    print("\nУскорение p50:")
+    for name, result in results.items():
+        before, after = result['without']['p50_ms'], result['with']['p50_ms']
+        print(f"  {name:18} {before / after if after else float('inf'):8.1f}x")
+
+    if args.json:
+        write_results(args.json, 'indexes', {'rows': args.rows, 'repeat': args.repeat}, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Память промежуточного представления ETL: словари на строку против RecordBatch
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_memory --rows 1000000
+"""
+import argparse
+import csv
+import gc
+import itertools
+import json
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.bench_readers import HEADER, _rows
+from etl.extractor import extract
+from etl.transformer import transform, COLUMN_MAPPING, _convert_value
+
+
+def _dict_pipeline(path: Path):
+    """Прежнее представление: список словарей после extract и после transform"""
+    batch = extract(str(path))
+    records = [dict(zip(batch.columns, row)) for row in batch.rows]
+    del batch
+    transformed = []
+    for record in records:
+        validated = {}
+        for key, value in record.items():
+            attr_name = COLUMN_MAPPING.get(key, key)
+            validated[attr_name] = _convert_value(value, attr_name)
+        transformed.append(validated)
+    return records, transformed
+
+
+def _batch_pipeline(path: Path):
+    """Текущее представление: пакеты строк-кортежей с общей схемой"""
+    batch = extract(str(path))
+    _, transformed = transform(batch, table_name='услуга')
+    return batch, transformed
+
+
+def measure(name: str, pipeline, path: Path) -> dict:
+    """Удерживаемая и пиковая память после extract + transform"""
+    gc.collect()
+    tracemalloc.start()
+    result = pipeline(path)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    return {
+        'representation': name,
+        'retained_mb': round(current / 1024 / 1024, 1),
+        'peak_mb': round(peak / 1024 / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Память промежуточного представления ETL')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Число строк услуг')
+    parser.add_argument('--workdir', default='bench_data', help='Каталог для сгенерированных файлов')
+    parser.add_argument('--json', help='Файл для сохранения результатов')
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir)
+    workdir.mkdir(parents=True, exist_ok=True)
+    path = workdir / f"услуга_{args.rows}.csv"
+
+    if not path.exists():
+        print(f"Генерация {path}...")
+        with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(HEADER)
+            writer.writerows(itertools.islice(_rows(), args.rows))
+
+    results = [
+        measure('dict', _dict_pipeline, path),
+        measure('batch', _batch_pipeline, path),
+    ]
+    for result in results:
+        print(f"  {result['representation']:6} удерживается {result['retained_mb']:8.1f} МБ, "
+              f"пик {result['peak_mb']:8.1f} МБ")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding='utf-8')
+
+
+if __name__ == '__main__':
+    main()
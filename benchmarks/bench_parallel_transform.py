@@ -0,0 +1,99 @@
+"""
+Параллельная трансформация одного большого файла (etl.parallel) без загрузки в БД
+
+Для каждого числа процессов и способа передачи частей замеряется extract + transform
+файла услуг: строк в секунду и ускорение относительно одного процесса (в пересчете на процесс).
+На машине с одним ядром ускорения не будет — замер показывает только накладные расходы передачи.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_parallel_transform --rows 1000000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import time
+from pathlib import Path
+
+from benchmarks.common import write_results
+from benchmarks.generate import generate
+from etl.batch import RecordBatch
+from etl.extractor import extract_frames
+from etl.parallel import transform_parallel, HANDOFFS
+from etl.transformer import transform
+
+
+def _sequential(path: str, batch_size: int) -> int:
+    valid = 0
+    for offset, frame in extract_frames(path, batch_size):
+        _, transformed = transform(RecordBatch.from_frame(frame, offset), table_name='услуга')
+        valid += len(transformed)
+    return valid
+
+
+def _parallel(path: str, batch_size: int, workers: int, handoff: str) -> int:
+    valid = 0
+    for _, _, _, transformed in transform_parallel(extract_frames(path, batch_size), 'услуга', workers, handoff):
+        valid += len(transformed)
+    return valid
+
+
+def measure(path: str, rows: int, batch_size: int, workers: int, handoff: str, repeat: int) -> dict:
+    """Лучшее время из repeat прогонов extract + transform"""
+    timings = []
+    valid = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        if workers == 1:
+            valid = _sequential(path, batch_size)
+        else:
+            valid = _parallel(path, batch_size, workers, handoff)
+        timings.append(time.perf_counter() - started)
+
+    best = min(timings)
+    return {
+        'workers': workers,
+        'handoff': handoff if workers > 1 else None,
+        'valid': valid,
+        'best_s': round(best, 3),
+        'rows_per_s': round(rows / best),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Параллельная трансформация файла')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Число услуг в файле')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='Числа процессов')
+    parser.add_argument('--handoffs', nargs='+', default=list(HANDOFFS), choices=HANDOFFS)
+    parser.add_argument('--batch-size', type=int, default=50_000)
+    parser.add_argument('--repeat', type=int, default=3, help='Число повторов на вариант')
+    parser.add_argument('--workdir', default='bench_data', help='Каталог для сгенерированных файлов')
+    parser.add_argument('--json', help='Файл для сохранения результатов')
+    args = parser.parse_args()
+
+    data_dir = Path(args.workdir) / f"csv_{args.rows}"
+    if not data_dir.exists():
+        print(f"Генерация данных в {data_dir}...")
+        generate(str(data_dir), args.rows)
+    path = str(data_dir / 'услуга.csv')
+
+    print(f"Ядер: {os.cpu_count()}, строк: {args.rows}, пакет: {args.batch_size}")
+    results = []
+    baseline = None
+    for workers in sorted(set(args.workers)):
+        for handoff in (args.handoffs if workers > 1 else [None]):
+            result = measure(path, args.rows, args.batch_size, workers, handoff, args.repeat)
+            if workers == 1:
+                baseline = result['best_s']
+            if baseline:
+                result['speedup'] = round(baseline / result['best_s'], 2)
+                result['speedup_per_worker'] = round(result['speedup'] / workers, 2)
+            results.append(result)
+            print(f"  {workers:>3} проц. {handoff or '-':7} {result['best_s']:8.3f} с  "
+                  f"{result['rows_per_s']:>10} строк/с  ускорение {result.get('speedup', '-')}")
+
+    if args.json:
+        params = {'rows': args.rows, 'batch_size': args.batch_size, 'cpu_count': os.cpu_count()}
+        write_results(args.json, 'parallel_transform', params, {'runs': results})
+
+
+if __name__ == '__main__':
+    main()
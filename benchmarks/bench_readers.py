@@ -0,0 +1,128 @@
+"""
+Сравнение движков чтения extract на сгенерированных файлах
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_readers --size-mb 100 --formats csv xlsx
+"""
+import argparse
+import csv
+import json
+import random
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from etl.extractor import extract, engine_available, CSV_ENGINES, EXCEL_ENGINES
+
+HEADER = ['id', 'обрабатывающий_сотрудник', 'дата_обращения', 'оплата',
+          'проект', 'реализующая_команда', 'выполнена']
+
+
+def _rows(seed: int = 42):
+    """Бесконечный поток строк в формате таблицы услуга"""
+    rnd = random.Random(seed)
+    start = date(2020, 1, 1)
+    row_id = 0
+    while True:
+        row_id += 1
+        yield [
+            row_id,
+            rnd.randint(1, 5000),
+            (start + timedelta(days=rnd.randint(0, 2000))).isoformat(),
+            row_id,
+            rnd.randint(1, 20000),
+            rnd.randint(1, 500),
+            rnd.choice(['True', 'False']),
+        ]
+
+
+def generate_csv(path: Path, size_mb: int) -> int:
+    """Пишет CSV примерно заданного размера, возвращает число строк"""
+    limit = size_mb * 1024 * 1024
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for row in _rows():
+            writer.writerow(row)
+            count += 1
+            if count % 10000 == 0 and f.tell() >= limit:
+                break
+    return count
+
+
+def generate_xlsx(path: Path, size_mb: int) -> int:
+    """Пишет xlsx с объемом данных примерно как у CSV заданного размера"""
+    from openpyxl import Workbook
+
+    # Строка услуги в CSV занимает около 50 байт
+    total = size_mb * 1024 * 1024 // 50
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('услуга')
+    sheet.append(HEADER)
+    for count, row in enumerate(_rows(), start=1):
+        sheet.append(row)
+        if count >= total:
+            break
+    workbook.save(path)
+    return total
+
+
+def measure(path: Path, engine: str, repeat: int) -> dict:
+    """Замеряет время extract для одного движка"""
+    timings = []
+    rows = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        batch = extract(str(path), engine)
+        timings.append(time.perf_counter() - started)
+        rows = len(batch)
+        del batch
+
+    best = min(timings)
+    return {
+        'engine': engine,
+        'rows': rows,
+        'best_s': round(best, 3),
+        'rows_per_s': round(rows / best) if best else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Сравнение движков чтения')
+    parser.add_argument('--size-mb', type=int, default=100, help='Размер сгенерированных данных, МБ')
+    parser.add_argument('--formats', nargs='+', default=['csv', 'xlsx'], choices=['csv', 'xlsx'])
+    parser.add_argument('--repeat', type=int, default=3, help='Число повторов на движок')
+    parser.add_argument('--workdir', default='bench_data', help='Каталог для сгенерированных файлов')
+    parser.add_argument('--json', help='Файл для сохранения результатов')
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir)
+    workdir.mkdir(parents=True, exist_ok=True)
+
+    results = []
+    for fmt in args.formats:
+        path = workdir / f"услуга_{args.size_mb}mb.{fmt}"
+        if not path.exists():
+            print(f"Генерация {path}...")
+            generate = generate_csv if fmt == 'csv' else generate_xlsx
+            generate(path, args.size_mb)
+
+        engines = CSV_ENGINES if fmt == 'csv' else EXCEL_ENGINES[f'.{fmt}']
+        for engine in engines:
+            if not engine_available(engine):
+                print(f"  {fmt:5} {engine:10} не установлен, пропуск")
+                continue
+            result = measure(path, engine, args.repeat)
+            result['format'] = fmt
+            result['file_mb'] = round(path.stat().st_size / 1024 / 1024, 1)
+            results.append(result)
+            print(f"  {fmt:5} {engine:10} {result['best_s']:8.3f} с  "
+                  f"{result['rows_per_s']:>10} строк/с")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding='utf-8')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Поиск по индексу в памяти (search_index.py) против LIKE '%...%' в БД
+
+Запуск из корня репозитория (по умолчанию — новая БД SQLite в bench_data):
+    python -m benchmarks.bench_search --rows 1000000 --json bench_data/search.json
+"""
+import argparse
+import random
+import resource
+import statistics
+import time
+from pathlib import Path
+
+from benchmarks.common import use_database, reset_schema, write_results
+from benchmarks.generate import FIRST_NAMES, LAST_NAMES, PATRONYMICS
+
+# Запросы: имя -> функция, строящая строку запроса со случайным параметром
+QUERIES = {
+    'surname': lambda rnd: rnd.choice(LAST_NAMES),
+    'prefix': lambda rnd: rnd.choice(LAST_NAMES)[:3],
+    'two_words': lambda rnd: f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)[:4]}",
+    'typo': lambda rnd: rnd.choice(LAST_NAMES)[:-2] + 'ыв',
+    'email': lambda rnd: f"client{rnd.randint(1, 99999)}@",
+    'phone': lambda rnd: '8' + ''.join(rnd.choices('0123456789', k=6)),
+}
+
+
+def _fill(engine, rows: int):
+    """Клиенты со случайными ФИО, email и телефонами"""
+    from sqlalchemy import insert
+
+    from models import Client
+
+    rnd = random.Random(42)
+    batch = []
+    with engine.begin() as connection:
+        for i in range(1, rows + 1):
+            batch.append({
+                'id': i,
+                'контактное_лицо': f"{rnd.choice(FIRST_NAMES)} {rnd.choice(PATRONYMICS)} {rnd.choice(LAST_NAMES)}",
+                'телефон': '8' + ''.join(rnd.choices('0123456789', k=10)),
+                'email': f"client{i}@example.com",
+            })
+            if len(batch) == 10000:
+                connection.execute(insert(Client.__table__), batch)
+                batch.clear()
+        if batch:
+            connection.execute(insert(Client.__table__), batch)
+
+
+def _like(engine, query: str, limit: int):
+    from sqlalchemy import or_, select
+
+    from models import Client
+
+    criteria = []
+    for word in query.split():
+        pattern = f"%{word}%"
+        criteria.append(or_(Client.contact_person.ilike(pattern), Client.email.ilike(pattern),
+                            Client.phone.like(pattern)))
+    with engine.connect() as connection:
+        return connection.execute(select(Client.id).where(*criteria).limit(limit)).all()
+
+
+def _timings(run, build, repeat: int) -> dict:
+    rnd = random.Random(7)
+    timings = []
+    for _ in range(repeat):
+        query = build(rnd)
+        started = time.perf_counter()
+        run(query)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        'p50_ms': round(statistics.median(timings) * 1000, 3),
+        'p95_ms': round(timings[int(len(timings) * 0.95) - 1] * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк поиска клиентов')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Число клиентов')
+    parser.add_argument('--repeat', type=int, default=100, help='Запросов каждого вида')
+    parser.add_argument('--limit', type=int, default=20, help='Результатов на запрос')
+    parser.add_argument('--like-repeat', type=int, default=5, help='Запросов LIKE каждого вида')
+    parser.add_argument('--workdir', default='bench_data', help='Каталог для БД')
+    parser.add_argument('--database', help='URL БД (по умолчанию новый файл SQLite)')
+    parser.add_argument('--json', help='Файл для сохранения результатов')
+    args = parser.parse_args()
+
+    use_database(args.database, str(Path(args.workdir) / 'bench_search.db'))
+
+    from database import engine
+    from search_index import indexes, query_words
+
+    reset_schema()
+    print(f"Заполнение {args.rows} клиентов...")
+    _fill(engine, args.rows)
+
+    index = indexes['clients']
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    index._docs, index._postings, index._sorted, index._grams = index._load()
+    index.ready = True
+    build_s = time.perf_counter() - started
+    rss_mb = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024
+    print(f"Построение индекса: {build_s:.2f} с, прирост RSS ~{rss_mb:.0f} МБ, {index.stats()}")
+
+    results = {'build_s': round(build_s, 2), 'rss_mb': round(rss_mb), 'queries': {}}
+    print(f"\n{'Запрос':12} {'индекс p50':>12} {'p95':>10} {'LIKE p50':>12}")
+    for name, build in QUERIES.items():
+        indexed = _timings(lambda query: index.search(query_words(query), args.limit), build, args.repeat)
+        like = _timings(lambda query: _like(engine, query, args.limit), build, args.like_repeat)
+        results['queries'][name] = {'index': indexed, 'like': like}
+        print(f"{name:12} {indexed['p50_ms']:10.3f}мс {indexed['p95_ms']:8.3f}мс {like['p50_ms']:10.3f}мс")
+
+    if args.json:
+        write_results(args.json, 'search', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Время холодного старта API и CLI и самые дорогие импорты (-X importtime)
+
+Каждая команда запускается в новом процессе несколько раз; для последнего
+запуска разбирается вывод -X importtime по модулям верхнего уровня.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_startup --repeat 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+COMMANDS = {
+    'api_import': ['-c', 'import main'],
+    'api_startup': ['-c', 'from fastapi.testclient import TestClient; import main\n'
+                          'with TestClient(main.app): pass'],
+    'cli_help': ['etl_cli.py', '--help'],
+    'cli_tables': ['etl_cli.py', 'tables'],
+}
+
+# Модули, которые не должны загружаться без необходимости
+HEAVY_MODULES = ('pandas', 'numpy', 'pyarrow', 'openpyxl', 'odf', 'pyodbc', 'database')
+
+
+def _parse_importtime(stderr: str) -> dict:
+    """Время импорта (накопленное, мс) по модулям из вывода -X importtime"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = {'ms': int(cumulative) / 1000, 'depth': depth}
+    return modules
+
+
+def measure(args: list, repeat: int, env: dict) -> dict:
+    """Медиана времени запуска процесса и профиль импортов"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, *args], env=env, capture_output=True, check=True)
+        timings.append(time.perf_counter() - started)
+
+    completed = subprocess.run([sys.executable, '-X', 'importtime', *args],
+                               env=env, capture_output=True, text=True, check=True)
+    modules = _parse_importtime(completed.stderr)
+    top = sorted(
+        ((name, info['ms']) for name, info in modules.items() if info['depth'] <= 1),
+        key=lambda item: item[1], reverse=True
+    )[:8]
+
+    return {
+        'median_s': round(statistics.median(timings), 3),
+        'min_s': round(min(timings), 3),
+        'heavy': sorted(name for name in modules if name in HEAVY_MODULES),
+        'top_imports_ms': {name: round(ms, 1) for name, ms in top},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Время холодного старта')
+    parser.add_argument('--repeat', type=int, default=5, help='Запусков каждой команды')
+    parser.add_argument('--database', default='sqlite://', help='URL БД для запуска')
+    parser.add_argument('--json', help='Файл для сохранения результатов')
+    args = parser.parse_args()
+
+    env = {**os.environ, 'DATABASE_URL': args.database}
+    results = {}
+    for name, command in COMMANDS.items():
+        result = measure(command, args.repeat, env)
+        results[name] = result
+        heavy = ', '.join(result['heavy']) or '—'
+        print(f"  {name:12} {result['median_s']:7.3f} с  тяжелые модули: {heavy}")
+        for module, ms in result['top_imports_ms'].items():
+            print(f"      {module:36} {ms:8.1f} мс")
+
+    if args.json:
+        from benchmarks.common import write_results
+
+        write_results(args.json, 'startup', {'repeat': args.repeat}, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Масштабирование RPS по числу воркеров serve.py
+
+Для каждого числа воркеров сервер перезапускается, затем прогоняются сценарии
+чтения из bench_api с одинаковой конкурентностью.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_workers --workers 1 2 4 --requests 4000 --concurrency 64
+"""
+import argparse
+import contextlib
+import io
+import sys
+from pathlib import Path
+
+from benchmarks.bench_api import _run, _scenarios, _start_server
+from benchmarks.common import use_database, reset_schema, write_results
+from benchmarks.generate import generate
+
+SCENARIOS = ('root', 'get_employee', 'get_service', 'employee_teams')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Масштабирование API по числу воркеров')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, default=40, help='Потоков на воркер')
+    parser.add_argument('--rows', type=int, default=10_000, help='Число услуг в наборе данных')
+    parser.add_argument('--requests', type=int, default=4000, help='Запросов на сценарий')
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--gunicorn', action='store_true', help='Запуск через gunicorn')
+    parser.add_argument('--workdir', default='bench_data', help='Каталог для данных и БД')
+    parser.add_argument('--database', help='URL БД (по умолчанию новый файл SQLite)')
+    parser.add_argument('--json', help='Файл для сохранения результатов')
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir)
+    data_dir = workdir / f"csv_{args.rows}"
+    if not data_dir.exists():
+        print(f"Генерация данных в {data_dir}...")
+        generate(str(data_dir), args.rows)
+
+    use_database(args.database, str(workdir / 'bench_workers.db'))
+
+    from etl_cli import import_all
+
+    print("Наполнение БД...")
+    reset_schema()
+    with contextlib.redirect_stdout(io.StringIO()):
+        import_all(str(data_dir))
+
+    scenarios = [scenario for scenario in _scenarios(args.rows) if scenario[0] in SCENARIOS]
+    base_url = f"http://127.0.0.1:{args.port}"
+    results = {}
+    for workers in args.workers:
+        command = [sys.executable, 'serve.py', '--port', str(args.port),
+                   '--workers', str(workers), '--threads', str(args.threads)]
+        if args.gunicorn:
+            command.append('--gunicorn')
+
+        server = _start_server(args.port, command)
+        results[workers] = {}
+        print(f"\nВоркеров: {workers}")
+        try:
+            for name, method, make_path, _ in scenarios:
+                result = _run(base_url, method, make_path, args.requests, args.concurrency)
+                results[workers][name] = result
+                print(f"  {name:16} {result['rps']:>9} rps  p50 {result['p50_ms']:>8} мс  "
+                      f"p99 {result['p99_ms']:>8} мс  ошибок {result['errors']}")
+        finally:
+            server.terminate()
+            server.wait()
+
+    baseline = results[args.workers[0]]
+    print(f"\nУскорение относительно {args.workers[0]} воркеров:")
+    for workers, by_scenario in results.items():
+        speedups = [f"{name} {result['rps'] / baseline[name]['rps']:.2f}x"
+                    for name, result in by_scenario.items()]
+        print(f"  {workers:>3}: " + ', '.join(speedups))
+
+    if args.json:
+        params = {'workers': args.workers, 'threads': args.threads, 'rows': args.rows,
+                  'requests': args.requests, 'concurrency': args.concurrency, 'gunicorn': args.gunicorn}
+        write_results(args.json, 'workers', params, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Общие функции бенчмарков: локальная БД-стенд и сохранение результатов"""
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any
+
+
+def use_database(url: str = None, sqlite_path: str = None) -> str:
+    """
+    Выбирает БД для бенчмарка до импорта database
+    По умолчанию — новый файл SQLite, чтобы не трогать рабочую БД
+    """
+    if url is None:
+        path = Path(sqlite_path or 'bench_data/bench.db')
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.unlink(missing_ok=True)
+        url = f"sqlite:///{path}"
+
+    os.environ['DATABASE_URL'] = url
+    return url
+
+
+def reset_schema():
+    """Пересоздает схему БД из моделей"""
+    from database import engine
+    from models import Base
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def write_results(path: str, suite: str, params: Dict[str, Any], results: Dict[str, Any]):
+    """Сохраняет результаты в JSON для сравнения между коммитами"""
+    report = {
+        'suite': suite,
+        'commit': _commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': params,
+        'results': results,
+    }
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Path(path).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f"\nРезультаты сохранены в {path}")
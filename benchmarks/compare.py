@@ -0,0 +1,51 @@
+"""
+Сравнение двух JSON-результатов бенчмарков (например, до и после коммита)
+
+Запуск из корня репозитория:
+    python -m benchmarks.compare bench_data/etl_old.json bench_data/etl_new.json
+"""
+import argparse
+import json
+from pathlib import Path
+
+# Метрики, для которых больше — лучше; для остальных лучше меньше
+HIGHER_IS_BETTER = {'rps', 'rows_per_second'}
+IGNORED = {'rows', 'requests'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Сравнение результатов бенчмарков')
+    parser.add_argument('baseline', help='JSON базовой версии')
+    parser.add_argument('candidate', help='JSON проверяемой версии')
+    parser.add_argument('--threshold', type=float, default=10.0, help='Порог регрессии, %%')
+    args = parser.parse_args()
+
+    baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+    candidate = json.loads(Path(args.candidate).read_text(encoding='utf-8'))
+
+    print(f"{baseline['suite']}: {baseline['commit']} → {candidate['commit']}\n")
+
+    regressions = 0
+    for name, metrics in candidate['results'].items():
+        old_metrics = baseline['results'].get(name)
+        if old_metrics is None:
+            continue
+        for metric, new in metrics.items():
+            old = old_metrics.get(metric)
+            if metric in IGNORED or not isinstance(new, (int, float)) or not old:
+                continue
+
+            change = (new - old) / old * 100
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            mark = ''
+            if worse > args.threshold:
+                mark = '  РЕГРЕССИЯ'
+                regressions += 1
+            print(f"  {name:22} {metric:16} {old:>12} → {new:>12}  {change:+7.1f}%{mark}")
+
+    print(f"\nРегрессий: {regressions}")
+    exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""
+Генератор согласованных синтетических данных для всех таблиц
+
+Масштаб задается числом услуг (самая большая таблица), остальные таблицы
+пропорциональны ему, все внешние ключи ссылаются на существующие строки.
+
+Запуск из корня репозитория:
+    python -m benchmarks.generate --rows 100000 --output bench_data/100k --format csv
+"""
+import argparse
+import csv
+import random
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+FIRST_NAMES = ['Олег', 'Глеб', 'Борис', 'Анна', 'Мария', 'Ирина', 'Павел', 'Денис', 'Ольга', 'Елена']
+LAST_NAMES = ['Иванов', 'Петров', 'Смирнов', 'Кузнецов', 'Попов', 'Соколов', 'Лебедев', 'Козлов']
+PATRONYMICS = ['Дмитриевич', 'Сергеевич', 'Андреевич', 'Игоревич', 'Олегович']
+
+COLUMNS = {
+    'должности': ['должность', 'обязанности'],
+    'тематики': ['тематика', 'ожидаемая_аудитория'],
+    'сотрудники': ['id', 'фио', 'email', 'телефон', 'дата_найма', 'должность', 'уволен'],
+    'команды': ['id', 'лидер_команды'],
+    'клиент': ['id', 'контактное_лицо', 'телефон', 'email'],
+    'оплата': ['id', 'сумма', 'оплачено'],
+    'договор': ['id', 'дата_подписания', 'срок_реализации', 'обрабатывающий_сотрудник', 'клиент', 'оплата'],
+    'проект': ['договор', 'название', 'описание', 'проектная_команда', 'тематика', 'клиент'],
+    'участие_в_команде': ['последнее_обновление', 'активен', 'сотрудник', 'команда'],
+    'услуга': ['id', 'обрабатывающий_сотрудник', 'дата_обращения', 'оплата', 'проект',
+               'реализующая_команда', 'выполнена'],
+}
+
+
+def scale(rows: int) -> Dict[str, int]:
+    """Размеры таблиц для заданного числа услуг"""
+    contracts = max(10, rows // 10)
+    return {
+        'должности': 20,
+        'тематики': 50,
+        'сотрудники': max(10, rows // 100),
+        'команды': max(2, rows // 1000),
+        'клиент': max(10, rows // 20),
+        'договор': contracts,
+        'оплата': contracts + rows,
+        'услуга': rows,
+    }
+
+
+class _Dataset:
+    """Детерминированный генератор строк всех таблиц"""
+
+    def __init__(self, rows: int, seed: int = 42):
+        self.sizes = scale(rows)
+        self.rnd = random.Random(seed)
+        self.start = date(2020, 1, 1)
+        # Оплата договора i — оплата с id i, оплачена каждая вторая
+        self.paid_contracts = range(2, self.sizes['договор'] + 1, 2)
+
+    def _date(self) -> str:
+        return (self.start + timedelta(days=self.rnd.randint(0, 2000))).isoformat()
+
+    def _phone(self) -> str:
+        return '8' + ''.join(self.rnd.choices('0123456789', k=10))
+
+    def _person(self) -> str:
+        rnd = self.rnd
+        return f"{rnd.choice(FIRST_NAMES)} {rnd.choice(PATRONYMICS)} {rnd.choice(LAST_NAMES)}"
+
+    def rows(self, table: str) -> Iterator[List]:
+        generators = {
+            'должности': self._positions,
+            'тематики': self._topics,
+            'сотрудники': self._employees,
+            'команды': self._teams,
+            'клиент': self._clients,
+            'оплата': self._payments,
+            'договор': self._contracts,
+            'проект': self._projects,
+            'участие_в_команде': self._participations,
+            'услуга': self._services,
+        }
+        return generators[table]()
+
+    def _positions(self):
+        for i in range(1, self.sizes['должности'] + 1):
+            yield [f"Должность {i}", f"Обязанности должности {i}"]
+
+    def _topics(self):
+        for i in range(1, self.sizes['тематики'] + 1):
+            yield [f"Тематика {i}", f"Аудитория тематики {i}"]
+
+    def _employees(self):
+        for i in range(1, self.sizes['сотрудники'] + 1):
+            yield [i, self._person(), f"emp{i}@example.com", self._phone(), self._date(),
+                   f"Должность {self.rnd.randint(1, self.sizes['должности'])}",
+                   self.rnd.random() < 0.1]
+
+    def _teams(self):
+        for i in range(1, self.sizes['команды'] + 1):
+            yield [i, self.rnd.randint(1, self.sizes['сотрудники'])]
+
+    def _clients(self):
+        for i in range(1, self.sizes['клиент'] + 1):
+            yield [i, self._person(), self._phone(), f"client{i}@example.com"]
+
+    def _payments(self):
+        contracts = self.sizes['договор']
+        for i in range(1, self.sizes['оплата'] + 1):
+            paid = i % 2 == 0 if i <= contracts else self.rnd.random() < 0.7
+            yield [i, f"{self.rnd.randint(1000, 500000)}.00", paid]
+
+    def _contracts(self):
+        for i in range(1, self.sizes['договор'] + 1):
+            signed = self._date()
+            deadline = (date.fromisoformat(signed) + timedelta(days=90)).isoformat()
+            yield [i, signed, deadline, self.rnd.randint(1, self.sizes['сотрудники']),
+                   self._client_of(i), i]
+
+    def _client_of(self, contract_id: int) -> int:
+        # Клиент договора вычисляется, чтобы проект ссылался на того же клиента
+        return (contract_id * 7919) % self.sizes['клиент'] + 1
+
+    def _projects(self):
+        for contract_id in self.paid_contracts:
+            yield [contract_id, f"Проект {contract_id}", f"Описание проекта {contract_id}",
+                   self.rnd.randint(1, self.sizes['команды']),
+                   f"Тематика {self.rnd.randint(1, self.sizes['тематики'])}",
+                   self._client_of(contract_id)]
+
+    def _participations(self):
+        teams = self.sizes['команды']
+        moment = datetime(2024, 1, 1)
+        for employee_id in range(1, self.sizes['сотрудники'] + 1):
+            for team_id in sorted(self.rnd.sample(range(1, teams + 1), min(teams, 2))):
+                yield [moment.isoformat(sep=' '), self.rnd.random() < 0.8, employee_id, team_id]
+
+    def _services(self):
+        contracts = self.sizes['договор']
+        paid = self.paid_contracts
+        for i in range(1, self.sizes['услуга'] + 1):
+            yield [i, self.rnd.randint(1, self.sizes['сотрудники']), self._date(), contracts + i,
+                   self.rnd.choice(paid), self.rnd.randint(1, self.sizes['команды']),
+                   self.rnd.random() < 0.5]
+
+
+def _write_csv(path: Path, columns: List[str], rows: Iterator[List]) -> int:
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def _write_xlsx(path: Path, columns: List[str], rows: Iterator[List]) -> int:
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(path.stem)
+    sheet.append(columns)
+    count = 0
+    for row in rows:
+        sheet.append(row)
+        count += 1
+    workbook.save(path)
+    return count
+
+
+def generate(output_dir: str, rows: int, file_format: str = 'csv', seed: int = 42) -> Dict[str, int]:
+    """
+    Пишет файлы всех таблиц в каталог
+    Возвращает: {таблица: число строк}
+    """
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    dataset = _Dataset(rows, seed)
+    write = _write_csv if file_format == 'csv' else _write_xlsx
+
+    counts = {}
+    for table, columns in COLUMNS.items():
+        counts[table] = write(output_path / f"{table}.{file_format}", columns, dataset.rows(table))
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Генератор синтетических данных')
+    parser.add_argument('--rows', type=int, default=10_000, help='Число услуг (от 10k до 10M)')
+    parser.add_argument('--output', '-o', required=True, help='Каталог для файлов')
+    parser.add_argument('--format', '-fmt', default='csv', choices=['csv', 'xlsx'])
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    counts = generate(args.output, args.rows, args.format, args.seed)
+    for table, count in counts.items():
+        print(f"  {table:20} {count:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,21 @@
 import logging
+import math
+import os
+import time
 from contextlib import contextmanager
 
-import pyodbc
-from fastapi import HTTPException
-from sqlalchemy import create_engine
-from sqlalchemy.exc import IntegrityError, SQLAlchemyError
-from sqlalchemy.orm import sessionmaker
+from fastapi import Depends, HTTPException, Request
+from fastapi.exceptions import ValidationException
+from sqlalchemy import delete, event, inspect as sa_inspect, update
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError, TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session as OrmSession, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.elements import TextClause
+from starlette.exceptions import HTTPException as StarletteHTTPException
+
+from backends import get_backend
+from models import Base
+from replicas import ReplicaSet
 
 logging.basicConfig(
     level=logging.INFO,
@@ -13,29 +23,178 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-engine = create_engine(
+DATABASE_URL = os.getenv(
+    'DATABASE_URL',
     "mssql+pyodbc://(localdb)\\MSSQLLocalDB/WEB-STUDIO?"
     "driver=ODBC+Driver+18+for+SQL+Server&TrustServerCertificate=yes"
 )
-Session = sessionmaker(bind=engine)
+
+# Реплики для чтения — URL через запятую; без них все запросы идут к основной БД
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+# Retry-After ответа 503, когда в пуле не нашлось соединения за pool_timeout
+POOL_RETRY_AFTER = 5
+# Сколько секунд после записи клиент читает с основной БД (реплики могут отставать)
+REPLICA_STICKY_SECONDS = float(os.getenv('DATABASE_REPLICA_STICKY_SECONDS', 5))
+
+backend = get_backend(DATABASE_URL)
+engine = backend.create_engine()
+replicas = ReplicaSet(
+    [get_backend(url).create_engine() for url in DATABASE_REPLICA_URLS],
+    retry_seconds=float(os.getenv('DATABASE_REPLICA_RETRY_SECONDS', 30)),
+    max_lag=float(os.environ['DATABASE_REPLICA_MAX_LAG']) if os.getenv('DATABASE_REPLICA_MAX_LAG') else None,
+    lag=backend.replica_lag,
+)
+
+
+def _dispose_after_fork():
+    for db_engine in (engine, *replicas.engines):
+        db_engine.dispose(close=False)
+
+
+# Воркер, созданный fork (gunicorn --preload), не должен использовать соединения родителя:
+# пул отбрасывается без закрытия, чтобы не оборвать соединения родительского процесса
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_dispose_after_fork)
+
+
+class RoutingSession(OrmSession):
+    """
+    Сессия с выбором БД: только для чтения (info['read_only']) — запросы к реплике,
+    запись (flush, INSERT/UPDATE/DELETE) и все запросы сессии после нее — к основной БД.
+    Текстовый SQL (text(), например MERGE бэкенда MSSQL) считается записью
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or isinstance(clause, (UpdateBase, TextClause)):
+            self.info['wrote'] = True
+        if not self.info.get('read_only') or self.info.get('wrote'):
+            return engine
+        # Реплика выбирается один раз: все запросы сессии читают одну БД
+        if 'replica' not in self.info:
+            self.info['replica'] = self._connect_replica()
+        return self.info['replica']
+
+    def _connect_replica(self):
+        """Доступная реплика с открытым соединением; при ошибке подключения — следующая или основная БД"""
+        while (replica := replicas.pick()) is not None:
+            try:
+                self.connection(bind_arguments={'bind': replica})
+                return replica
+            except DBAPIError as e:
+                replicas.mark_down(replica, e)
+        return engine
+
+
+Session = sessionmaker(class_=RoutingSession, bind=engine)
+
+# Слушатели зафиксированных изменений: listener({класс модели: множество ключей или None})
+_commit_listeners = []
+# Слушатели изменений до записи: listener(session, класс модели, ключи или None, поля или None)
+_write_listeners = []
+
+
+def on_commit(listener):
+    """Регистрирует слушателя изменений, зафиксированных через вспомогательные функции"""
+    _commit_listeners.append(listener)
+    return listener
+
+
+def on_write(listener):
+    """Регистрирует слушателя, вызываемого до изменения или удаления строк (видит старое состояние)"""
+    _write_listeners.append(listener)
+    return listener
+
+
+def before_write(session, entity_class, keys=None, fields=None):
+    """
+    Сообщает слушателям on_write о предстоящем изменении строк
+    keys — ключи (None — неизвестные строки), fields — изменяемые атрибуты (None — удаление)
+    """
+    for listener in _write_listeners:
+        listener(session, entity_class, keys, fields)
+
+
+def mark_changed(session, entity_class, keys=None):
+    """
+    Запоминает в сессии ключи измененных сущностей до фиксации транзакции
+    None — изменены неизвестные строки (массовые операции)
+    """
+    changed = session.info.setdefault('changed', {})
+    if keys is None or (entity_class in changed and changed[entity_class] is None):
+        changed[entity_class] = None
+    else:
+        changed.setdefault(entity_class, set()).update(keys)
+
+
+def row_keys(entity_class, rows):
+    """
+    Первичные ключи строк-словарей (ключи — атрибуты модели), составные — кортежами
+    Возвращает: список ключей или None, если в строках нет ключа
+    """
+    mapper = sa_inspect(entity_class)
+    attrs = [mapper.get_property_by_column(column).key for column in mapper.primary_key]
+    if any(attr not in row for row in rows for attr in attrs):
+        return None
+    if len(attrs) == 1:
+        return [row[attrs[0]] for row in rows]
+    return [tuple(row[attr] for attr in attrs) for row in rows]
+
+
+@event.listens_for(Session, 'after_commit')
+def _notify_commit(session):
+    changed = session.info.pop('changed', None)
+    if not changed:
+        return
+    for listener in _commit_listeners:
+        try:
+            listener(changed)
+        except Exception as e:
+            # Транзакция уже зафиксирована — ошибка слушателя не должна дойти до клиента
+            logger.error(f"Ошибка обработки зафиксированных изменений: {e}")
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_changes(session, previous_transaction):
+    session.info.pop('changed', None)
+
+
+def init_db(force: bool = False):
+    """Создает недостающие таблицы из Base.metadata (для SQLite — всегда)"""
+    if force or backend.auto_create_schema:
+        Base.metadata.create_all(engine)
+        logger.info("Схема БД создана из моделей")
 
 
 @contextmanager
-def session_scope():
-    """Контекстный менеджер для управления сессиями БД"""
-    session = Session()
+def session_scope(read_only: bool = False, **options):
+    """
+    Контекстный менеджер для управления сессиями БД (options — параметры Session)
+    read_only — читать с реплики, если они настроены
+    """
+    session = Session(**options)
+    session.info['read_only'] = read_only
     try:
         yield session
-    except HTTPException:
+    except (StarletteHTTPException, ValidationException):
+        # Ответы FastAPI (404, 412, 422 при ошибке параметров запроса) передаются как есть
         session.rollback()
         raise
-    except (IntegrityError, pyodbc.IntegrityError) as e:
+    except backend.integrity_errors() as e:
         session.rollback()
         logger.error(f"IntegrityError: {e}")
         raise HTTPException(
             status_code=400,
             detail=f"Ошибка целостности данных: {e}"
         )
+    except PoolTimeoutError as e:
+        # Пул соединений исчерпан — перегрузка, а не ошибка сервера
+        session.rollback()
+        logger.warning(f"Нет свободных соединений с БД: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="БД перегружена, повторите позже",
+            headers={'Retry-After': str(POOL_RETRY_AFTER)}
+        )
     except SQLAlchemyError as e:
         session.rollback()
         logger.error(f"SQLAlchemyError: {e}")
@@ -54,31 +213,62 @@ def session_scope():
         session.close()
 
 
-def create_entity(entity):
-    with session_scope() as session:
-        return create_entity_s(session, entity)
+# Методы, которые читают с реплик
+READ_METHODS = ('GET', 'HEAD')
+# Cookie с временем (Unix), до которого клиент читает с основной БД после своей записи
+PRIMARY_COOKIE = 'db_primary_until'
+
+
+def _pinned(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
 
 
-def get_entities(entity_class, key=None):
-    with session_scope() as session:
-        return get_entities_s(session, entity_class, key)
+def get_session(request: Request):
+    """
+    Сессия запроса (зависимость FastAPI): одна на обработчик и все вызываемые им функции
+    Соединение берется из пула при первом обращении к БД, фиксация — после обработчика
+    Объекты не истекают при фиксации: ответ сериализуется уже после закрытия сессии
+    GET читает с реплики, кроме клиентов, недавно писавших (cookie PRIMARY_COOKIE)
+    """
+    read_only = request.method in READ_METHODS and not _pinned(request)
+    with session_scope(read_only=read_only, expire_on_commit=False) as session:
+        yield session
+        wrote = session.info.get('wrote') or bool(session.info.get('changed'))
+        session.commit()
+        if wrote:
+            request.state.wrote = True
 
 
-def update_entity(entity_class, key, update_data):
-    with session_scope() as session:
-        return update_entity_s(session, entity_class, key, update_data)
+async def pin_primary(request: Request, call_next):
+    """
+    Middleware чтения своих записей: после зафиксированной записи клиент получает cookie,
+    и его GET-запросы REPLICA_STICKY_SECONDS секунд читают с основной БД
+    Cookie ставится здесь: зависимость фиксирует транзакцию, когда ответ уже сформирован
+    """
+    response = await call_next(request)
+    if getattr(request.state, 'wrote', False):
+        until = math.ceil(time.time() + REPLICA_STICKY_SECONDS)
+        response.set_cookie(PRIMARY_COOKIE, str(until), max_age=math.ceil(REPLICA_STICKY_SECONDS), httponly=True)
+    return response
 
 
-def delete_entity(entity_class, key):
-    with session_scope() as session:
-        return delete_entity_s(session, entity_class, key)
+# Параметр обработчика: фиксация после обработчика, но до отправки ответа клиенту
+request_session = Depends(get_session, scope='function')
 
 
+# Функции *_s работают в переданной сессии и не фиксируют транзакцию:
+# фиксирует владелец сессии (get_session — в конце запроса)
 def create_entity_s(session, entity):
     """Создание сущности"""
     logger.info(f"Создание сущности {entity.__tablename__}")
     session.add(entity)
-    session.commit()
+    session.flush()
+    identity = sa_inspect(entity).identity
+    mark_changed(session, type(entity), [identity[0] if len(identity) == 1 else identity])
+    # Значения по умолчанию со стороны БД (версия и т.п.) читаются в той же транзакции
     session.refresh(entity)
     logger.info(f"Успешно создана сущность {entity.__tablename__}")
     return entity
@@ -100,34 +290,119 @@ def get_entities_s(session, entity_class, key=None):
     return session.query(entity_class).all()
 
 
-def update_entity_s(session, entity_class, key, update_data):
-    """Обновление сущности"""
+def update_entity_s(session, entity_class, key, update_data, version=None):
+    """
+    Обновление сущности одной командой UPDATE ... WHERE pk [AND версия] RETURNING
+    При переданной версии несовпадение дает 412 (изменено другим запросом)
+    """
     logger.info(f"Обновление {entity_class.__tablename__} с ключом {key}, данные: {update_data}")
-    entity = session.get(entity_class, key)
-    if not entity:
+    pk = sa_inspect(entity_class).primary_key[0]
+    versioned = hasattr(entity_class, 'version')
+
+    values = {field: value for field, value in update_data.items() if field != 'version'}
+    stmt = update(entity_class).where(pk == key)
+    if versioned:
+        values['version'] = entity_class.version + 1
+        if version is not None:
+            stmt = stmt.where(entity_class.version == version)
+    stmt = stmt.values(**values)
+    before_write(session, entity_class, [key], set(values))
+
+    if engine.dialect.update_returning:
+        entity = session.scalars(stmt.returning(entity_class)).one_or_none()
+    else:
+        updated = session.execute(stmt).rowcount
+        entity = session.get(entity_class, key, populate_existing=True) if updated else None
+
+    if entity is None:
+        if version is not None and session.get(entity_class, key) is not None:
+            raise HTTPException(
+                status_code=412,
+                detail=f"{entity_class.__tablename__} с ID {key} изменен другим запросом "
+                       f"(ожидалась версия {version})"
+            )
         raise HTTPException(
             status_code=404,
             detail=f"{entity_class.__tablename__} с ID {key} не найден"
         )
 
-    for field, value in update_data.items():
-        setattr(entity, field, value)
-    session.commit()
+    mark_changed(session, entity_class, [key])
+    # Отсоединяем, чтобы вернуть значения из RETURNING без повторного SELECT
+    session.expunge(entity)
     logger.info(f"Успешно обновлена сущность {entity_class.__tablename__} с ключом {key}")
     return entity
 
 
+def upsert_s(session, entity_class, rows, update, changed=()):
+    """
+    Вставка или обновление по первичному ключу одной командой (MERGE / ON CONFLICT)
+    Возвращает: вставленные и измененные строки (ключи — атрибуты модели)
+    """
+    logger.info(f"Upsert {len(rows)} записей {entity_class.__tablename__}")
+    columns = {attr.columns[0].name: attr.key for attr in sa_inspect(entity_class).column_attrs}
+    result = backend.upsert(session, entity_class, rows, update, changed, returning=True)
+    result = [{columns[name]: value for name, value in row.items()} for row in result]
+    mark_changed(session, entity_class, row_keys(entity_class, result))
+    return result
+
+
+def parse_etag(if_match):
+    """Версия из заголовка If-Match ('"3"', 'W/"3"'); None — без проверки версии"""
+    if if_match is None or if_match.strip() == '*':
+        return None
+    value = if_match.strip().removeprefix('W/').strip('"')
+    if not value.isdigit():
+        raise HTTPException(status_code=400, detail=f"Некорректный If-Match: {if_match}")
+    return int(value)
+
+
+def set_etag(response, entity):
+    """Заголовок ETag с версией сущности"""
+    version = getattr(entity, 'version', None)
+    if version is not None:
+        response.headers['ETag'] = f'"{version}"'
+    return entity
+
+
 def delete_entity_s(session, entity_class, key):
-    """Удаление сущности"""
+    """
+    Удаление сущности одной командой DELETE ... WHERE pk
+    Через ORM (загрузка + session.delete) — только если у связей есть каскадное удаление
+    """
     logger.info(f"Удаление {entity_class.__tablename__} с ключом {key}")
-    entity = session.get(entity_class, key)
-    if not entity:
+    mapper = sa_inspect(entity_class)
+
+    before_write(session, entity_class, [key])
+    if any(rel.cascade.delete for rel in mapper.relationships):
+        entity = session.get(entity_class, key)
+        deleted = 0
+        if entity:
+            session.delete(entity)
+            deleted = 1
+    else:
+        stmt = delete(entity_class).where(mapper.primary_key[0] == key)
+        deleted = session.execute(stmt, execution_options={'synchronize_session': False}).rowcount
+
+    if not deleted:
         raise HTTPException(
             status_code=404,
             detail=f"{entity_class.__tablename__} с ID {key} не найден"
         )
 
-    session.delete(entity)
-    session.commit()
+    mark_changed(session, entity_class, [key])
     logger.info(f"Успешно удалена сущность {entity_class.__tablename__} с ключом {key}")
     return True
+
+
+def delete_where_s(session, entity_class, *criteria):
+    """
+    Массовое удаление по условиям одной командой DELETE (для обслуживающих задач)
+    Возвращает: число удаленных строк
+    """
+    before_write(session, entity_class)
+    stmt = delete(entity_class).where(*criteria)
+    deleted = session.execute(stmt, execution_options={'synchronize_session': False}).rowcount
+    if deleted:
+        mark_changed(session, entity_class)
+    logger.info(f"Удалено {deleted} записей {entity_class.__tablename__}")
+    return deleted
@@ -0,0 +1,71 @@
+from array import array
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Tuple
+
+
+class RecordBatch:
+    """
+    Пакет записей ETL: общая схема колонок и строки-кортежи
+    Ключи хранятся один раз на пакет, а не в словаре каждой строки
+    """
+    __slots__ = ('columns', 'rows', 'offset', 'numbers', 'errors', 'end')
+
+    def __init__(
+            self,
+            columns: List[str],
+            rows: List[tuple],
+            offset: int = 0,
+            numbers: Optional[Sequence[int]] = None,
+            end: Optional[int] = None
+    ):
+        self.columns = columns
+        self.rows = rows
+        # Смещение пакета в исходном файле
+        self.offset = offset
+        # Номера строк в файле (1..N), если строки отфильтрованы
+        self.numbers = numbers
+        # Позиция в файле после пакета (контрольная точка): пропущенные пустые строки тоже считаются
+        self.end = offset + len(rows) if end is None else end
+        # Отклоненные при трансформации строки: (номер строки в файле, сообщение)
+        self.errors: List[Tuple[int, str]] = []
+
+    @classmethod
+    def from_frame(cls, df, offset: int = 0) -> 'RecordBatch':
+        """
+        Создает пакет из DataFrame
+        Индекс части из extract_frames — позиции строк в файле; с пропусками (пустые строки
+        CSV) номера строк берутся из индекса
+        """
+        numbers, end = None, None
+        if len(df) and (df.index[0] != offset or df.index[-1] != offset + len(df) - 1):
+            numbers = array('q', (position + 1 for position in df.index))
+            end = numbers[-1]
+        return cls(
+            df.columns.tolist(),
+            list(df.itertuples(index=False, name=None)),
+            offset,
+            numbers,
+            end
+        )
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __iter__(self) -> Iterator[tuple]:
+        return iter(self.rows)
+
+    def number(self, idx: int) -> int:
+        """Номер строки в исходном файле"""
+        if self.numbers is not None:
+            return self.numbers[idx]
+        return self.offset + idx + 1
+
+    def subset(self, columns: List[str], rows: List[tuple], kept: List[int]) -> 'RecordBatch':
+        """Новый пакет из части строк с сохранением исходной нумерации"""
+        numbers = array('q', (self.number(idx) for idx in kept))
+        return RecordBatch(columns, rows, self.offset, numbers, self.end)
+
+    def iter_dicts(self) -> Iterator[Dict[str, Any]]:
+        """Строки как словари без пустых значений (создаются по одной)"""
+        columns = self.columns
+        for row in self.rows:
+            yield {key: value for key, value in zip(columns, row) if value is not None}
@@ -0,0 +1,67 @@
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_DIR = Path(os.getenv('ETL_CHECKPOINT_DIR', '.etl_checkpoints'))
+
+
+def checkpoint_path(file_path: str) -> Path:
+    """Путь к файлу контрольной точки для импортируемого файла"""
+    key = hashlib.sha1(str(Path(file_path).resolve()).encode('utf-8')).hexdigest()[:16]
+    return CHECKPOINT_DIR / f"{key}.json"
+
+
+def _fingerprint(file_path: str) -> Dict[str, Any]:
+    """Размер и время изменения файла, чтобы не продолжить импорт другого файла"""
+    stat = Path(file_path).stat()
+    return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def save_checkpoint(file_path: str, table_name: str, offset: int, batch_id: int):
+    """Сохраняет контрольную точку после зафиксированного пакета"""
+    path = checkpoint_path(file_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    checkpoint = {
+        'file': str(Path(file_path).resolve()),
+        'table': table_name,
+        'offset': offset,
+        'batch_id': batch_id,
+        'updated': datetime.now().isoformat(),
+        **_fingerprint(file_path),
+    }
+
+    # Атомарная запись: сбой не оставит поврежденный файл
+    tmp_path = path.with_suffix('.tmp')
+    tmp_path.write_text(json.dumps(checkpoint, ensure_ascii=False), encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(file_path: str) -> Optional[Dict[str, Any]]:
+    """Загружает контрольную точку, если она есть и файл не менялся"""
+    path = checkpoint_path(file_path)
+    if not path.exists():
+        return None
+
+    checkpoint = json.loads(path.read_text(encoding='utf-8'))
+    fingerprint = _fingerprint(file_path)
+    if any(checkpoint.get(key) != value for key, value in fingerprint.items()):
+        logger.warning(f"Файл {file_path} изменился после контрольной точки, она игнорируется")
+        return None
+
+    logger.info(
+        f"Найдена контрольная точка {file_path}: "
+        f"пакет {checkpoint['batch_id']}, смещение {checkpoint['offset']}"
+    )
+    return checkpoint
+
+
+def clear_checkpoint(file_path: str):
+    """Удаляет контрольную точку после успешного завершения импорта"""
+    checkpoint_path(file_path).unlink(missing_ok=True)
@@ -1,43 +1,346 @@
-import pandas as pd
+import importlib.util
+import itertools
+import os
+import time
+from datetime import date, datetime
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Dict, Iterator
 import logging
 
+from etl.batch import RecordBatch
+
 logger = logging.getLogger(__name__)
 
-SUPPORTED_FORMATS = {'.csv', '.xls', '.xlsx', '.ods'}
+# CSV со сжатием распаковывается pandas по расширению (zstd — при установленном zstandard)
+CSV_FORMATS = {'.csv', '.csv.gz', '.csv.zst'}
+WORKBOOK_FORMATS = {'.xls', '.xlsx', '.ods'}
+SUPPORTED_FORMATS = CSV_FORMATS | WORKBOOK_FORMATS
+COMPRESSION_SUFFIXES = {'.gz', '.zst'}
 
+# Движки чтения по форматам, в порядке предпочтения при автовыборе
+CSV_ENGINES = ['pyarrow', 'c', 'python']
+EXCEL_ENGINES = {
+    '.xlsx': ['calamine', 'openpyxl'],
+    '.xls': ['calamine', 'xlrd'],
+    '.ods': ['calamine', 'odf'],
+}
 
-def extract(file_path: str) -> tuple[List[Dict[str, Any]], List[str]]:
-    """
-    Извлекает данные из файла
-    Возвращает: (список строк как словарей, список колонок)
-    """
+# Движки, читающие лист книги по строкам; xlrd и odf читают лист только целиком
+STREAMING_EXCEL_ENGINES = {'calamine', 'openpyxl'}
+
+# Модули, без которых движок недоступен
+_ENGINE_MODULES = {
+    'pyarrow': 'pyarrow',
+    'calamine': 'python_calamine',
+    'openpyxl': 'openpyxl',
+    'xlrd': 'xlrd',
+    'odf': 'odf',
+}
+
+
+def file_format(file_path) -> str:
+    """Формат по расширению с учетом сжатия: data.csv.gz → '.csv.gz'"""
+    suffixes = [suffix.lower() for suffix in Path(file_path).suffixes]
+    if len(suffixes) >= 2 and suffixes[-1] in COMPRESSION_SUFFIXES:
+        return ''.join(suffixes[-2:])
+    return suffixes[-1] if suffixes else ''
+
+
+def _check_path(file_path: str) -> Path:
+    """Проверяет существование и формат файла"""
     path = Path(file_path)
 
     if not path.exists():
         raise FileNotFoundError(f"Файл не найден: {file_path}")
 
-    if path.suffix.lower() not in SUPPORTED_FORMATS:
+    if file_format(path) not in SUPPORTED_FORMATS:
         raise ValueError(
             f"Неподдерживаемый формат файла. "
-            f"Поддерживаются: {', '.join(SUPPORTED_FORMATS)}"
+            f"Поддерживаются: {', '.join(sorted(SUPPORTED_FORMATS))}"
         )
 
-    logger.info(f"Извлечение данных из {file_path}")
+    if file_format(path) == '.csv.zst' and importlib.util.find_spec('zstandard') is None:
+        raise ValueError("Для файлов .csv.zst нужен модуль zstandard")
+
+    return path
+
+
+def engine_available(engine: str) -> bool:
+    """Проверяет, установлен ли модуль движка чтения"""
+    module = _ENGINE_MODULES.get(engine)
+    return module is None or importlib.util.find_spec(module) is not None
+
+
+def resolve_engine(suffix: str, engine: str = None) -> str:
+    """
+    Выбирает движок чтения для формата файла (suffix — результат file_format)
+    Порядок: аргумент, переменные ETL_CSV_ENGINE / ETL_EXCEL_ENGINE, автовыбор
+    """
+    suffix = suffix.lower()
+    is_csv = suffix in CSV_FORMATS
+    candidates = CSV_ENGINES if is_csv else EXCEL_ENGINES[suffix]
+
+    if engine is None or engine == 'auto':
+        env_name = 'ETL_CSV_ENGINE' if is_csv else 'ETL_EXCEL_ENGINE'
+        engine = os.getenv(env_name, 'auto')
+
+    if engine == 'auto':
+        return next((e for e in candidates if engine_available(e)), candidates[-1])
+
+    if engine not in candidates:
+        raise ValueError(
+            f"Движок {engine} не поддерживает формат {suffix}. "
+            f"Доступные: {', '.join(candidates)}"
+        )
+
+    if not engine_available(engine):
+        raise ValueError(f"Движок {engine} не установлен")
+
+    return engine
+
+
+def extract(file_path: str, engine: str = None) -> RecordBatch:
+    """
+    Извлекает данные из файла
+    Возвращает: пакет записей (колонки и строки-кортежи)
+    """
+    import pandas as pd
+
+    path = _check_path(file_path)
+    engine = resolve_engine(file_format(path), engine)
+
+    logger.info(f"Извлечение данных из {file_path} (движок {engine})")
+    started = time.perf_counter()
 
     # Чтение файла
-    if path.suffix.lower() == '.csv':
-        df = pd.read_csv(file_path)
-    elif path.suffix.lower() in {'.xls', '.xlsx'}:
-        df = pd.read_excel(file_path)
+    if file_format(path) in CSV_FORMATS:
+        df = pd.read_csv(file_path, engine=engine)
     else:
-        df = pd.read_excel(file_path, engine='odf')
+        df = pd.read_excel(file_path, engine=engine)
+
+    # Преобразование в пакет строк-кортежей
+    batch = RecordBatch.from_frame(df)
+
+    logger.info(
+        f"Извлечено {len(batch)} записей, {len(batch.columns)} колонок "
+        f"за {time.perf_counter() - started:.2f} с"
+    )
+
+    return batch
+
+
+def extract_workbook(file_path: str, engine: str = None) -> Dict[str, RecordBatch]:
+    """
+    Извлекает данные со всех листов книги, открывая файл один раз
+    Возвращает: {имя листа: пакет записей}
+    """
+    import pandas as pd
+
+    path = _check_path(file_path)
+
+    if file_format(path) not in WORKBOOK_FORMATS:
+        raise ValueError(f"Файл не является книгой: {file_path}")
+
+    engine = resolve_engine(file_format(path), engine)
+
+    logger.info(f"Извлечение листов из {file_path} (движок {engine})")
+    started = time.perf_counter()
 
-    # Преобразование в список словарей
-    records = df.to_dict('records')
-    columns = df.columns.tolist()
+    sheets = {}
 
-    logger.info(f"Извлечено {len(records)} записей, {len(columns)} колонок")
+    with pd.ExcelFile(file_path, engine=engine) as workbook:
+        for sheet_name in workbook.sheet_names:
+            df = workbook.parse(sheet_name)
+            if df.empty and not len(df.columns):
+                logger.info(f"Лист {sheet_name} пуст, пропускаем")
+                continue
 
-    return records, columns
+            sheets[sheet_name] = RecordBatch.from_frame(df)
+            logger.info(
+                f"Лист {sheet_name}: {len(df)} записей, {len(df.columns)} колонок"
+            )
+
+    logger.info(
+        f"Извлечено листов: {len(sheets)} за {time.perf_counter() - started:.2f} с"
+    )
+
+    return sheets
+
+
+def _excel_cell(value):
+    """Значение ячейки как в pandas.read_excel: пустая — '', целое число — int, дата — datetime"""
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else value
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    return value
+
+
+def _sheet_rows(path: Path, engine: str) -> Iterator[list]:
+    """Строки первого листа книги по одной, начиная с заголовка"""
+    if engine == 'calamine':
+        from python_calamine import CalamineWorkbook
+
+        # Лист разбирается calamine в компактные ячейки Rust, объекты Python создаются по строке
+        workbook = CalamineWorkbook.from_path(str(path))
+        rows = workbook.get_sheet_by_index(0).iter_rows()
+        errors = ()
+    else:
+        from openpyxl import load_workbook
+        from openpyxl.cell.cell import ERROR_CODES
+
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        errors = ERROR_CODES
+    try:
+        for row in rows:
+            yield [float('nan') if value in errors else _excel_cell(value) for value in row]
+    finally:
+        workbook.close()
+
+
+def _excel_chunks(path: Path, engine: str, batch_size: int, start: int) -> Iterator:
+    """
+    Части DataFrame книги без чтения листа целиком (движки STREAMING_EXCEL_ENGINES)
+    Каждая часть разбирается парсером pandas, как в read_excel, поэтому типы столбцов
+    определяются по части — как у CSV, читаемого частями
+    """
+    import pandas as pd
+    from pandas.io.parsers import TextParser
+
+    rows = _sheet_rows(path, engine)
+    header = next(rows, None)
+    if header is None:
+        return
+    # Пустые ячейки справа от заголовка (оформление листа) в части не попадают
+    while header and header[-1] == '':
+        header.pop()
+    width = len(header)
+    # Строки до start пропускаются, как skiprows в read_excel
+    rows = itertools.islice(rows, start, None)
+    position = start
+    while True:
+        chunk = [row[:width] for row in itertools.islice(rows, batch_size)]
+        if not chunk:
+            return
+        # Пустые строки листа остаются строками без значений, как в read_excel
+        frame = TextParser([header, *chunk], header=0, skip_blank_lines=False).read()
+        frame.index = pd.RangeIndex(position, position + len(frame))
+        position += len(chunk)
+        yield frame
+
+
+def _drop_blank(chunk):
+    """Отбрасывает пустые строки CSV, сохраняя позиции остальных в индексе"""
+    blank = chunk.isna().all(axis=1)
+    if blank.any():
+        chunk = chunk[~blank]
+        # Пустые строки делают целые столбцы дробными (NaN) — возвращаем целый тип, как без них
+        for column in chunk.select_dtypes('float').columns:
+            values = chunk[column]
+            if values.notna().all() and (values % 1 == 0).all():
+                chunk[column] = values.astype('int64')
+    return chunk
+
+
+def _csv_chunks(file_path: str, engine: str, batch_size: int, start: int, skiprows) -> Iterator:
+    """
+    Части CSV с позициями строк в индексе
+    Пустые строки читаются (skip_blank_lines=False) и отбрасываются после разбора:
+    иначе skiprows при продолжении считал бы их, а смещение частей — нет
+    """
+    import pandas as pd
+
+    chunks = pd.read_csv(file_path, engine=engine, skiprows=skiprows, chunksize=batch_size,
+                         skip_blank_lines=False)
+    for chunk in chunks:
+        chunk.index += start
+        yield _drop_blank(chunk)
+
+
+def _arrow_csv_chunks(file_path: str, batch_size: int, start: int) -> Iterator:
+    """
+    Части CSV потоковым читателем pyarrow (read_csv с engine='pyarrow' частями не читает)
+    Пустые строки, как и в _csv_chunks, читаются строками без значений и отбрасываются
+    после разбора; skip_rows_after_names их считает, как skiprows.
+    Типы столбцов определяются по первому блоку файла и дальше не меняются
+    """
+    import pandas as pd
+    import pyarrow as pa
+    from pyarrow import csv
+
+    reader = csv.open_csv(
+        file_path,
+        read_options=csv.ReadOptions(skip_rows_after_names=start),
+        parse_options=csv.ParseOptions(ignore_empty_lines=False),
+        # Пустое поле — пропуск значения, как у парсера pandas
+        convert_options=csv.ConvertOptions(strings_can_be_null=True),
+    )
+    position = start
+    pending = pa.Table.from_batches([], schema=reader.schema)
+    for record_batch in itertools.chain(reader, [None]):
+        if record_batch is not None:
+            pending = pa.concat_tables([pending, pa.Table.from_batches([record_batch])])
+        # Полные части из накопленных блоков, в конце файла — и остаток
+        while pending.num_rows >= batch_size or (record_batch is None and pending.num_rows):
+            chunk = pending.slice(0, batch_size).to_pandas()
+            pending = pending.slice(batch_size)
+            chunk.index = pd.RangeIndex(position, position + len(chunk))
+            position += len(chunk)
+            yield _drop_blank(chunk)
+
+
+def extract_frames(
+        file_path: str,
+        batch_size: int,
+        start: int = 0,
+        engine: str = None
+) -> Iterator[tuple]:
+    """
+    Потоково читает файл частями DataFrame, начиная со строки start
+    Индекс части — позиции строк в файле (0 — первая после заголовка): пустые строки CSV
+    отбрасываются, но считаются, поэтому start из контрольной точки совпадает со skiprows
+    Возвращает: итератор (смещение части в файле, DataFrame)
+    """
+    import pandas as pd
+
+    path = _check_path(file_path)
+    engine = resolve_engine(file_format(path), engine)
+
+    # Строки до start пропускаются парсером, заголовок сохраняется
+    skiprows = range(1, start + 1) if start else None
+
+    if file_format(path) in CSV_FORMATS:
+        if engine == 'pyarrow':
+            chunks = _arrow_csv_chunks(file_path, batch_size, start)
+        else:
+            chunks = _csv_chunks(file_path, engine, batch_size, start, skiprows)
+    elif engine in STREAMING_EXCEL_ENGINES:
+        chunks = _excel_chunks(path, engine, batch_size, start)
+    else:
+        # xlrd и odf не читают лист по строкам: файл читается целиком и режется на части
+        df = pd.read_excel(file_path, engine=engine, skiprows=skiprows)
+        df.index = pd.RangeIndex(start, start + len(df))
+        chunks = (df.iloc[i:i + batch_size] for i in range(0, len(df), batch_size))
+
+    logger.info(f"Потоковое извлечение из {file_path} с записи {start + 1} (движок {engine})")
+
+    for chunk in chunks:
+        if len(chunk):
+            yield int(chunk.index[0]), chunk
+
+
+def extract_batches(
+        file_path: str,
+        batch_size: int,
+        start: int = 0,
+        engine: str = None
+) -> Iterator[RecordBatch]:
+    """
+    Потоково извлекает данные из файла пакетами, начиная со строки start
+    Возвращает: итератор пакетов записей со смещением в файле
+    """
+    for offset, chunk in extract_frames(file_path, batch_size, start, engine):
+        yield RecordBatch.from_frame(chunk, offset)
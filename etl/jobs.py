@@ -0,0 +1,310 @@
+"""
+Очередь фоновых задач ETL для API
+
+Задачи выполняются в пуле процессов (spawn), чтобы разбор файлов и загрузка не
+занимали GIL и потоки процесса API. Пул создается при первой задаче. Прогресс
+из процессов передается через общую очередь multiprocessing, ее разбирает
+поток в процессе API. Модули ETL и pandas импортируются только в процессах пула.
+Завершенные задачи хранятся ETL_JOB_TTL секунд и не более ETL_MAX_FINISHED штук,
+затем удаляются вместе со своими файлами (загрузка для импорта, результат экспорта).
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Callable, Dict, Any, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Процессов в пуле и задач в очереди и в работе одновременно
+ETL_WORKERS = int(os.getenv('ETL_WORKERS', 2))
+ETL_MAX_JOBS = int(os.getenv('ETL_MAX_JOBS', 8))
+# Сколько ошибок строк хранить в результате задачи
+MAX_REPORTED_ERRORS = 100
+# Срок хранения завершенных задач и их файлов (секунды) и предел числа завершенных задач
+ETL_JOB_TTL = int(os.getenv('ETL_JOB_TTL', 3600))
+ETL_MAX_FINISHED = int(os.getenv('ETL_MAX_FINISHED', 100))
+
+FINISHED = ('done', 'failed')
+
+
+class QueueFull(Exception):
+    """Очередь задач заполнена"""
+
+
+class Job:
+    """Состояние фоновой задачи ETL"""
+
+    def __init__(self, kind: str, params: Dict[str, Any], files: Iterable[str] = ()):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        # Файлы задачи на сервере: удаляются вместе с задачей
+        self.files = list(files)
+        self.status = 'queued'
+        self.progress: Dict[str, Any] = {'batches': 0, 'rows': 0, 'success': 0, 'failed': 0}
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        # Номер изменения состояния для SSE
+        self.revision = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'params': self.params,
+            'status': self.status,
+            'progress': self.progress,
+            'result': self.result,
+            'error': self.error,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+        }
+
+
+# Очередь прогресса внутри процесса пула (задается инициализатором)
+_progress = None
+
+
+def _init_worker(progress_queue):
+    global _progress
+    _progress = progress_queue
+
+
+def _report(job_id: str, event: str, payload: Dict[str, Any] = None):
+    if _progress is not None:
+        _progress.put((job_id, event, payload or {}))
+
+
+def _import_job(job_id: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Импорт файла пакетами; после каждого пакета отправляется прогресс"""
+    from etl.extractor import extract_batches, extract_workbook, file_format, WORKBOOK_FORMATS
+    from etl.loader import load, merge_stats, rebuild_counters
+    from etl.transformer import transform, detect_sheet_table, LOAD_ORDER
+
+    file_path, table_name = params['path'], params.get('table')
+    stats = {'total': 0, 'success': 0, 'failed': 0, 'errors': []}
+    tables = []
+
+    if table_name is None and file_format(file_path) in WORKBOOK_FORMATS:
+        sheets = extract_workbook(file_path)
+        batches = []
+        for sheet_name, batch in sheets.items():
+            sheet_table = detect_sheet_table(sheet_name, batch.columns)
+            batches.append((sheet_table, batch))
+        batches.sort(key=lambda item: LOAD_ORDER.index(item[0]))
+    else:
+        batches = ((table_name, batch) for batch in extract_batches(file_path, params['batch_size']))
+
+    try:
+        for batch_table, batch in batches:
+            model_class, transformed = transform(batch, table_name=batch_table)
+            table_name = table_name or model_class.__tablename__.lower()
+            batch_stats = load(model_class, transformed)
+            # Невалидные строки не дошли до загрузки — тоже считаются ошибочными
+            batch_stats['failed'] += len(batch) - len(transformed)
+            batch_stats['total'] = len(batch)
+            merge_stats(stats, batch_stats)
+            if model_class.__tablename__ not in tables:
+                tables.append(model_class.__tablename__)
+
+            _report(job_id, 'progress', {
+                'batches': 1, 'rows': len(batch),
+                'success': batch_stats['success'], 'failed': batch_stats['failed'],
+            })
+    finally:
+        # Пакеты счетчики дашборда не обновляют — пересчет после загрузки
+        if stats['success']:
+            rebuild_counters()
+
+    stats['errors'] = stats['errors'][:MAX_REPORTED_ERRORS]
+    return {'tables': tables, **stats}
+
+
+def _export_job(job_id: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Экспорт таблицы в файл (вывод CLI не нужен)"""
+    import contextlib
+    import io
+
+    from etl_cli import export_data
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        exported = export_data(params['table'], params['path'])
+    return {'file': params['path'], 'exported': bool(exported)}
+
+
+JOB_KINDS = {
+    'import': _import_job,
+    'export': _export_job,
+}
+
+
+def _run_job(job_id: str, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Точка входа задачи в процессе пула"""
+    _report(job_id, 'running')
+    return JOB_KINDS[kind](job_id, params)
+
+
+class JobQueue:
+    """Ограниченная очередь задач ETL поверх пула процессов"""
+
+    def __init__(self, workers: int = ETL_WORKERS, max_jobs: int = ETL_MAX_JOBS,
+                 ttl: float = ETL_JOB_TTL, max_finished: int = ETL_MAX_FINISHED):
+        self.workers = workers
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self.max_finished = max_finished
+        self.jobs: Dict[str, Job] = {}
+        # Каталоги файлов задач: файлы без задачи (например, после перезапуска) удаляются через ttl
+        self.directories: List[Path] = []
+        # Повторно входимая: отмена задач вызывает _finish в том же потоке
+        self._lock = threading.RLock()
+        self._executor = None
+        self._progress = None
+        self._reader = None
+        # Вызываются в процессе API после завершения каждой задачи
+        self.listeners: List[Callable[[Job], None]] = []
+
+    def _start(self):
+        # spawn: процесс API многопоточный, fork из него небезопасен
+        context = multiprocessing.get_context('spawn')
+        self._progress = context.Queue()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=context,
+            initializer=_init_worker, initargs=(self._progress,)
+        )
+        self._reader = threading.Thread(target=self._read_progress, name='etl-progress', daemon=True)
+        self._reader.start()
+        logger.info(f"Пул задач ETL запущен: процессов {self.workers}, задач не более {self.max_jobs}")
+
+    def _read_progress(self):
+        while True:
+            try:
+                item = self._progress.get()
+            except (EOFError, OSError):
+                return
+            if item is None:
+                return
+            job_id, event, payload = item
+            with self._lock:
+                job = self.jobs.get(job_id)
+                if job is None or job.status in FINISHED:
+                    continue
+                if event == 'running':
+                    job.status, job.started = 'running', time.time()
+                else:
+                    for key, value in payload.items():
+                        job.progress[key] += value
+                job.revision += 1
+
+    def _active(self) -> int:
+        return sum(1 for job in self.jobs.values() if job.status not in FINISHED)
+
+    def submit(self, kind: str, params: Dict[str, Any], files: Iterable[str] = ()) -> Job:
+        """
+        Ставит задачу в очередь; при заполненной очереди — QueueFull
+        files — файлы задачи, удаляемые вместе с ней
+        """
+        self.prune()
+        with self._lock:
+            if self._active() >= self.max_jobs:
+                raise QueueFull(f"В очереди уже {self.max_jobs} задач")
+            if self._executor is None:
+                self._start()
+            job = Job(kind, params, files)
+            self.jobs[job.id] = job
+
+        try:
+            future = self._executor.submit(_run_job, job.id, kind, params)
+        except BrokenProcessPool:
+            # Процесс пула аварийно завершился (например, по нехватке памяти) — новый пул
+            logger.warning("Пул задач ETL поврежден, перезапуск")
+            with self._lock:
+                self._stop(wait=False)
+                self._start()
+            future = self._executor.submit(_run_job, job.id, kind, params)
+        future.add_done_callback(lambda done: self._finish(job, done))
+        logger.info(f"Задача ETL {job.id} ({kind}) поставлена в очередь")
+        return job
+
+    def _finish(self, job: Job, future):
+        with self._lock:
+            job.finished = time.time()
+            if future.cancelled():
+                job.error, job.status = 'Задача отменена при остановке сервера', 'failed'
+            elif future.exception() is not None:
+                job.error, job.status = str(future.exception()), 'failed'
+                logger.error(f"Задача ETL {job.id} завершилась ошибкой: {job.error}")
+            else:
+                job.result, job.status = future.result(), 'done'
+                # Последние события прогресса могут прийти позже результата
+                if job.kind == 'import':
+                    job.progress.update(rows=job.result['total'], success=job.result['success'],
+                                        failed=job.result['failed'])
+            job.revision += 1
+        logger.info(f"Задача ETL {job.id} завершена: {job.status}")
+        for listener in self.listeners:
+            try:
+                listener(job)
+            except Exception as e:
+                logger.error(f"Ошибка обработки завершения задачи ETL {job.id}: {e}")
+
+    def prune(self):
+        """Удаляет задачи, завершенные раньше ttl или сверх max_finished, и их файлы"""
+        now = time.time()
+        with self._lock:
+            finished = sorted((job for job in self.jobs.values() if job.status in FINISHED),
+                              key=lambda job: job.finished)
+            excess = len(finished) - self.max_finished
+            expired = [job for position, job in enumerate(finished)
+                       if position < excess or now - job.finished > self.ttl]
+            for job in expired:
+                del self.jobs[job.id]
+            kept = {Path(path) for job in self.jobs.values() for path in job.files}
+
+        for job in expired:
+            for path in job.files:
+                Path(path).unlink(missing_ok=True)
+        if expired:
+            logger.info(f"Удалено завершенных задач ETL: {len(expired)}")
+
+        for directory in self.directories:
+            if not directory.is_dir():
+                continue
+            for path in directory.iterdir():
+                try:
+                    if path not in kept and path.is_file() and now - path.stat().st_mtime > self.ttl:
+                        path.unlink()
+                except FileNotFoundError:
+                    continue
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        return sorted(self.jobs.values(), key=lambda job: job.created, reverse=True)
+
+    def shutdown(self):
+        """Останавливает пул: выполняемые задачи дожидаются окончания, ожидающие отменяются"""
+        # Без блокировки: завершение задач при ожидании тоже берет ее
+        if self._executor is not None:
+            self._stop(wait=True)
+
+    def _stop(self, wait: bool):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        self._progress.put(None)
+        if wait:
+            self._reader.join(timeout=5)
+        self._executor = None
+
+
+job_queue = JobQueue()
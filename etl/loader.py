@@ -1,39 +1,58 @@
 import logging
-from typing import List, Dict, Any, Type
+from typing import Dict, Any, Type
 
-from database import session_scope, create_entity_s
+from database import backend, engine, session_scope, create_entity_s, mark_changed, row_keys
+from etl.batch import RecordBatch
+import search_index  # noqa: F401 — ключи загруженных записей попадают в журнал поиска
+import summary
 
 logger = logging.getLogger(__name__)
 
 
 def load(
         model_class: Type,
-        records: List[Dict[str, Any]]
+        batch: RecordBatch
 ) -> Dict[str, Any]:
     """
-    Загружает данные в БД
+    Загружает данные в БД одним пакетом (одна транзакция)
+    Словари и объекты моделей создаются только здесь, по одной строке
+    Если пакет отклонен, записи загружаются по одной, чтобы найти ошибочные
     Возвращает статистику загрузки
     """
-    logger.info(f"Загрузка {len(records)} записей в {model_class.__tablename__}")
+    logger.info(f"Загрузка {len(batch)} записей в {model_class.__tablename__}")
 
     stats = {
-        'total': len(records),
+        'total': len(batch),
         'success': 0,
         'failed': 0,
         'errors': []
     }
 
-    with session_scope() as session:
-        for idx, record_data in enumerate(records):
-            try:
-                entity = model_class(**record_data)
-                create_entity_s(session, entity)
-                stats['success'] += 1
-            except Exception as e:
-                stats['failed'] += 1
-                error_msg = f"Запись {idx + 1}: {e}"
-                stats['errors'].append(error_msg)
-                logger.error(error_msg)
+    # Счетчики дашборда пакет не обновляет: после загрузки — rebuild_counters
+    with session_scope(info={summary.DEFERRED: True}) as session:
+        try:
+            if len(batch):
+                rows = list(batch.iter_dicts())
+                backend.bulk_insert(session, model_class, rows)
+                mark_changed(session, model_class, row_keys(model_class, rows))
+            session.commit()
+            stats['success'] = len(batch)
+        except Exception as e:
+            session.rollback()
+            logger.warning(f"Пакет отклонен, построчная загрузка: {e}")
+
+            for idx, record_data in enumerate(batch.iter_dicts()):
+                try:
+                    entity = model_class(**record_data)
+                    create_entity_s(session, entity)
+                    session.commit()
+                    stats['success'] += 1
+                except Exception as e:
+                    session.rollback()
+                    stats['failed'] += 1
+                    error_msg = f"Запись {batch.number(idx)}: {e}"
+                    stats['errors'].append(error_msg)
+                    logger.error(error_msg)
 
     logger.info(
         f"Загрузка завершена: {stats['success']} успешно, "
@@ -43,8 +62,25 @@ def load(
     return stats
 
 
-def visualize_stats(stats: Dict[str, Any], model_class: Type) -> str:
-    """Создает текстовую сводку результатов загрузки"""
+def rebuild_counters() -> Dict[str, int]:
+    """Пересчет счетчиков дашборда одной транзакцией после загрузки"""
+    with engine.begin() as connection:
+        counts = summary.rebuild(connection)
+    logger.info(f"Счетчики дашборда пересчитаны: {counts}")
+    return counts
+
+
+def merge_stats(total: Dict[str, Any], stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Добавляет статистику пакета к общей статистике"""
+    total['total'] += stats['total']
+    total['success'] += stats['success']
+    total['failed'] += stats['failed']
+    total['errors'].extend(stats['errors'])
+    return total
+
+
+def visualize_stats(stats: Dict[str, Any], model_class: Type, profile=None) -> str:
+    """Создает текстовую сводку результатов загрузки (и профиля прогона, если передан)"""
     lines = [
         "=" * 60,
         f"РЕЗУЛЬТАТЫ ЗАГРУЗКИ: {model_class.__tablename__}",
@@ -52,7 +88,7 @@ def visualize_stats(stats: Dict[str, Any], model_class: Type) -> str:
         f"Всего записей:      {stats['total']}",
         f"Загружено успешно:  {stats['success']}",
         f"Ошибок:             {stats['failed']}",
-        f"Процент успеха:     {stats['success'] / stats['total'] * 100:.1f}%",
+        f"Процент успеха:     {stats['success'] / stats['total'] * 100 if stats['total'] else 100:.1f}%",
     ]
 
     if stats['errors']:
@@ -64,6 +100,9 @@ def visualize_stats(stats: Dict[str, Any], model_class: Type) -> str:
         if len(stats['errors']) > 10:
             lines.append(f"  ... и еще {len(stats['errors']) - 10} ошибок")
 
+    if profile is not None:
+        lines.extend(profile.summary_lines())
+
     lines.append("=" * 60)
 
     return "\n".join(lines)
@@ -0,0 +1,153 @@
+"""
+Параллельная трансформация одного большого файла в пуле процессов
+
+Части файла (DataFrame из extract_frames) передаются процессам без построчного
+Python в основном процессе: часть записывается как Arrow IPC в разделяемую память
+(multiprocessing.shared_memory), процесс пула читает ее через pyarrow прямо из блока,
+без копирования и сериализации объектов Python.
+Без pyarrow или для частей, которые Arrow не представляет (смешанные типы в колонке),
+часть передается как pickle DataFrame — буферами NumPy, а не словарями строк.
+Результаты возвращаются по порядку частей, поэтому номера строк в ошибках,
+контрольные точки и порядок загрузки те же, что при обработке в одном процессе.
+"""
+import importlib.util
+import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait
+from typing import Iterator, Optional
+
+from etl.batch import RecordBatch
+from etl.transformer import transform, detect_table
+
+logger = logging.getLogger(__name__)
+
+# Частей в работе на процесс: пока основной процесс загружает часть, следующие уже готовятся
+PREFETCH_PER_WORKER = 2
+HANDOFFS = ('arrow', 'pickle')
+
+
+def default_handoff() -> str:
+    """Способ передачи частей: ETL_HANDOFF или arrow, если установлен pyarrow"""
+    handoff = os.getenv('ETL_HANDOFF')
+    if handoff:
+        return handoff
+    return 'arrow' if importlib.util.find_spec('pyarrow') else 'pickle'
+
+
+def _to_shared_memory(frame):
+    """Часть как поток Arrow IPC в новом блоке разделяемой памяти; None — Arrow ее не представляет"""
+    import pyarrow as pa
+    from multiprocessing.shared_memory import SharedMemory
+
+    try:
+        # Индекс части — позиции строк в файле; RangeIndex хранится только в метаданных
+        table = pa.Table.from_pandas(frame, preserve_index=None)
+    except (pa.ArrowException, TypeError, ValueError):
+        return None
+
+    # Размер потока считается без записи данных, затем поток пишется прямо в блок
+    counter = pa.MockOutputStream()
+    _write_stream(counter, table)
+    size = counter.size()
+
+    shm = SharedMemory(create=True, size=max(size, 1))
+    _write_stream(pa.FixedSizeBufferWriter(pa.py_buffer(shm.buf)), table)
+    return shm, size
+
+
+def _write_stream(sink, table):
+    """Пишет таблицу потоком Arrow IPC и закрывает приемник (освобождая ссылку на блок)"""
+    import pyarrow as pa
+
+    with sink, pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _read_shared_memory(shm, size: int):
+    """DataFrame из потока Arrow IPC в блоке разделяемой памяти, без копирования блока"""
+    import pyarrow as pa
+
+    with pa.ipc.open_stream(pa.py_buffer(shm.buf)[:size]) as reader:
+        return reader.read_all().to_pandas()
+
+
+def _transform_shared(name: str, size: int, offset: int, table_name: str):
+    """Трансформирует часть из разделяемой памяти; колонки части ссылаются на блок до ее удаления"""
+    from multiprocessing.shared_memory import SharedMemory
+
+    shm = SharedMemory(name=name)
+    try:
+        frame = _read_shared_memory(shm, size)
+        batch = RecordBatch.from_frame(frame, offset)
+        del frame
+        return transform(batch, table_name=table_name)
+    finally:
+        try:
+            shm.close()
+        except BufferError:
+            # Исключение удерживает ссылки на колонки части: блок закроется при их сборке
+            pass
+
+
+def _transform_part(payload, offset: int, table_name: str):
+    """Трансформирует часть файла (выполняется в процессе пула)"""
+    if isinstance(payload, tuple):
+        return _transform_shared(*payload, offset, table_name)
+    return transform(RecordBatch.from_frame(payload, offset), table_name=table_name)
+
+
+def transform_parallel(
+        frames: Iterator[tuple],
+        table_name: Optional[str],
+        workers: int,
+        handoff: str = None
+) -> Iterator[tuple]:
+    """
+    Трансформирует части (смещение, DataFrame) в workers процессах
+    Возвращает: итератор (смещение, число строк части, класс модели, пакет) в порядке частей
+    """
+    handoff = handoff or default_handoff()
+    if handoff not in HANDOFFS:
+        raise ValueError(f"Неизвестный способ передачи: {handoff}. Доступные: {', '.join(HANDOFFS)}")
+    logger.info(f"Параллельная трансформация: {workers} процессов, передача {handoff}")
+
+    pending = deque()
+
+    def submit(executor, offset, frame):
+        shm = _to_shared_memory(frame) if handoff == 'arrow' else None
+        payload = (shm[0].name, shm[1]) if shm else frame
+        future = executor.submit(_transform_part, payload, offset, table_name)
+        pending.append((offset, len(frame), shm[0] if shm else None, future))
+
+    def result():
+        offset, size, shm, future = pending.popleft()
+        try:
+            model_class, transformed = future.result()
+        finally:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+        return offset, size, model_class, transformed
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        try:
+            for offset, frame in frames:
+                # Таблица определяется по первой части, чтобы процессы не определяли ее заново
+                if table_name is None:
+                    table_name = detect_table(list(frame.columns))
+                submit(executor, offset, frame)
+                if len(pending) >= workers * PREFETCH_PER_WORKER:
+                    yield result()
+            while pending:
+                yield result()
+        finally:
+            # Прерванный импорт: ожидающие части отменяются, а уже выполняющиеся еще читают
+            # свои блоки — разделяемая память освобождается только после их завершения
+            for _, _, _, future in pending:
+                future.cancel()
+            wait([future for _, _, _, future in pending])
+            for _, _, shm, _ in pending:
+                if shm is not None:
+                    shm.close()
+                    shm.unlink()
@@ -0,0 +1,161 @@
+import json
+import logging
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, Iterator, Iterable, List, Optional
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Отчеты завершенных прогонов для --stats-json
+_reports: List[Dict[str, Any]] = []
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Пиковый резидентный объем памяти процесса, МБ"""
+    try:
+        import resource
+    except ImportError:
+        # Windows: только через psutil, если установлен
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return psutil.Process().memory_info().peak_wset / 1024 / 1024
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдает килобайты, macOS — байты
+    if sys.platform == 'darwin':
+        return peak / 1024 / 1024
+    return peak / 1024
+
+
+def _item_rows(value) -> int:
+    return value if isinstance(value, int) else len(value)
+
+
+class RunProfile:
+    """Метрики одного прогона ETL: время и строки по этапам, память, запросы к БД"""
+
+    def __init__(self, command: str, target: str, engine=None):
+        self.command = command
+        self.target = target
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.started = time.perf_counter()
+        self.elapsed = None
+        self.result: Dict[str, Any] = {}
+        self._current = None
+        # Открытые этапы: [имя, начало незасчитанного отрезка]
+        self._open: List[list] = []
+        # Запросы считаются только внутри этапов: обработчик движка снимается при выходе
+        # из внешнего этапа, в том числе по исключению, и не копится между прогонами
+        self._engine = engine
+
+    def _count_statement(self, *args):
+        stage = self.stages.get(self._current)
+        if stage is not None:
+            stage['statements'] += 1
+
+    def _stage(self, name: str) -> Dict[str, Any]:
+        return self.stages.setdefault(name, {'seconds': 0.0, 'rows': 0, 'statements': 0})
+
+    @contextmanager
+    def stage(self, name: str, rows: int = 0):
+        """
+        Замеряет время этапа; запросы к БД внутри относятся к нему
+        Время вложенного этапа относится только к нему, а не к внешнему
+        """
+        stage = self._stage(name)
+        started = time.perf_counter()
+        if self._open:
+            outer_name, outer_started = self._open[-1]
+            self._stage(outer_name)['seconds'] += started - outer_started
+        elif self._engine is not None:
+            event.listen(self._engine, 'before_cursor_execute', self._count_statement)
+        self._open.append([name, started])
+        previous, self._current = self._current, name
+        try:
+            yield stage
+        finally:
+            finished = time.perf_counter()
+            stage['seconds'] += finished - self._open.pop()[1]
+            stage['rows'] += rows
+            if self._open:
+                self._open[-1][1] = finished
+            elif self._engine is not None:
+                event.remove(self._engine, 'before_cursor_execute', self._count_statement)
+            self._current = previous
+
+    def timed_iter(self, name: str, iterable: Iterable, rows: bool = True) -> Iterator:
+        """
+        Итератор, время получения каждого элемента которого относится к этапу
+        rows — элементы это пакеты строк (len) или кортежи (смещение, части или число строк, ...)
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name) as stage:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                stage['rows'] += len(item) if rows else _item_rows(item[1])
+            yield item
+
+    def finish(self, result: Dict[str, Any] = None):
+        """Завершает прогон и сохраняет отчет"""
+        self.elapsed = time.perf_counter() - self.started
+        self.result = result or {}
+        _reports.append(self.to_dict())
+
+    def to_dict(self) -> Dict[str, Any]:
+        stages = {}
+        for name, stage in self.stages.items():
+            seconds = stage['seconds']
+            stages[name] = {
+                'seconds': round(seconds, 4),
+                'rows': stage['rows'],
+                'rows_per_second': round(stage['rows'] / seconds, 1) if seconds else None,
+                'statements': stage['statements'],
+            }
+
+        peak = peak_rss_mb()
+        return {
+            'command': self.command,
+            'target': self.target,
+            'seconds': round(self.elapsed, 4) if self.elapsed is not None else None,
+            'peak_rss_mb': round(peak, 1) if peak is not None else None,
+            'stages': stages,
+            'result': self.result,
+        }
+
+    def summary_lines(self) -> List[str]:
+        """Строки профиля для текстовой сводки"""
+        report = self.to_dict()
+        lines = [
+            "\nПРОФИЛЬ:",
+            "-" * 60,
+            f"  {'Этап':12} {'Время, с':>10} {'Строк':>10} {'Строк/с':>12} {'Запросов':>10}",
+        ]
+        for name, stage in report['stages'].items():
+            rate = f"{stage['rows_per_second']:.0f}" if stage['rows_per_second'] else '—'
+            lines.append(
+                f"  {name:12} {stage['seconds']:>10.3f} {stage['rows']:>10} "
+                f"{rate:>12} {stage['statements']:>10}"
+            )
+
+        seconds = report['seconds'] if report['seconds'] is not None else time.perf_counter() - self.started
+        peak = f"{report['peak_rss_mb']} МБ" if report['peak_rss_mb'] is not None else 'н/д'
+        lines.append(f"  Всего: {seconds:.3f} с, пик RSS: {peak}")
+        return lines
+
+
+def write_reports(path: str):
+    """Сохраняет отчеты всех прогонов в JSON"""
+    Path(path).write_text(
+        json.dumps(_reports, ensure_ascii=False, indent=2, default=str),
+        encoding='utf-8'
+    )
+    logger.info(f"Статистика сохранена в {path}")
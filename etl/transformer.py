@@ -1,11 +1,10 @@
 import logging
 from datetime import datetime, date
-from typing import List, Dict, Any, Type
-
-import pandas as pd
+from typing import List, Any, Type
 
+from etl.batch import RecordBatch
 from models import (
-    Position, Topic, Employee, Team, Project,
+    Base, Position, Topic, Employee, Team, Project,
     TeamParticipation, Service, Client, Payment, Contract
 )
 
@@ -25,6 +24,12 @@ TABLE_MAPPING = {
     'договор': Contract,
 }
 
+# Порядок загрузки таблиц с учетом внешних ключей
+LOAD_ORDER = [
+    table.name.lower() for table in Base.metadata.sorted_tables
+    if table.name.lower() in TABLE_MAPPING
+]
+
 # Маппинг колонок на атрибуты моделей
 COLUMN_MAPPING = {
     'должность': 'position',
@@ -58,6 +63,7 @@ COLUMN_MAPPING = {
     'оплачено': 'paid',
     'дата_подписания': 'signing_date',
     'срок_реализации': 'implementation_deadline',
+    'версия': 'version',
 }
 
 
@@ -71,7 +77,7 @@ def detect_table(columns: List[str]) -> str:
         'тематики': {'тематика', 'ожидаемая_аудитория'},
         'сотрудники': {'фио', 'дата_найма'},
         'команды': {'лидер_команды'},
-        'проект': {'название', 'проект'},
+        'проект': {'название', 'проектная_команда'},
         'участие_в_команде': {'сотрудник', 'команда', 'активен'},
         'услуга': {'дата_обращения', 'выполнена'},
         'клиент': {'контактное_лицо'},
@@ -89,19 +95,27 @@ def detect_table(columns: List[str]) -> str:
     )
 
 
+def detect_sheet_table(sheet_name: str, columns: List[str]) -> str:
+    """Определяет тип таблицы листа по колонкам, затем по имени листа"""
+    try:
+        return detect_table(columns)
+    except ValueError:
+        if sheet_name.lower() in TABLE_MAPPING:
+            logger.info(f"Определена таблица по имени листа: {sheet_name}")
+            return sheet_name.lower()
+        raise
+
+
 def transform(
-        records: List[Dict[str, Any]],
-        table_name: str = None,
-        columns: List[str] = None
-) -> tuple[Type, List[Dict[str, Any]]]:
+        batch: RecordBatch,
+        table_name: str = None
+) -> tuple[Type, RecordBatch]:
     """
     Трансформирует и валидирует данные
-    Возвращает: (класс модели, список валидированных данных)
+    Возвращает: (класс модели, пакет валидированных строк по атрибутам модели)
     """
     if table_name is None:
-        if columns is None:
-            raise ValueError("Необходимо указать table_name или columns")
-        table_name = detect_table(columns)
+        table_name = detect_table(batch.columns)
 
     table_name = table_name.lower()
     model_class = TABLE_MAPPING.get(table_name)
@@ -114,52 +128,72 @@ def transform(
 
     logger.info(f"Трансформация данных для таблицы {table_name}")
 
+    # Маппинг имен колонок выполняется один раз на пакет
+    attrs = [
+        COLUMN_MAPPING.get(col_name.lower(), col_name.lower())
+        for col_name in batch.columns
+    ]
+
     transformed = []
+    kept = []
     errors = []
 
-    for idx, record in enumerate(records):
+    for idx, row in enumerate(batch.rows):
         try:
-            validated = _transform_record(record)
-            transformed.append(validated)
+            transformed.append(_transform_row(row, attrs))
+            kept.append(idx)
         except Exception as e:
-            errors.append(f"Запись {idx + 1}: {e}")
-            logger.warning(f"Ошибка валидации записи {idx + 1}: {e}")
+            number = batch.number(idx)
+            errors.append((number, str(e)))
+            logger.warning(f"Ошибка валидации записи {number}: {e}")
 
     if errors:
-        logger.warning(f"Обнаружено ошибок: {len(errors)}/{len(records)}")
+        logger.warning(f"Обнаружено ошибок: {len(errors)}/{len(batch)}")
 
     logger.info(
-        f"Трансформировано {len(transformed)} записей из {len(records)}"
+        f"Трансформировано {len(transformed)} записей из {len(batch)}"
     )
 
-    return model_class, transformed
+    result = batch.subset(attrs, transformed, kept)
+    result.errors = errors
+    return model_class, result
 
 
-def _transform_record(
-        record: Dict[str, Any]
-) -> Dict[str, Any]:
-    """Трансформирует одну запись"""
-    transformed = {}
-
-    for col_name, value in record.items():
+def _transform_row(
+        row: tuple,
+        attrs: List[str]
+) -> tuple:
+    """Трансформирует одну строку, пустые значения становятся None"""
+    return tuple(
         # Пропуск NaN/None значений
-        if pd.isna(value):
-            continue
-
-        # Маппинг имени колонки
-        col_lower = col_name.lower()
-        attr_name = COLUMN_MAPPING.get(col_lower, col_lower)
+        None if _is_missing(value) else _convert_value(value, attr_name)
+        for value, attr_name in zip(row, attrs)
+    )
 
-        # Преобразование типов
-        transformed[attr_name] = _convert_value(value, attr_name)
 
-    return transformed
+def _is_missing(value: Any) -> bool:
+    """None, NaN, NaT или pd.NA — как pd.isna для скаляра, но без импорта pandas"""
+    if value is None:
+        return True
+    try:
+        # Только NaN и NaT не равны сами себе
+        return bool(value != value)
+    except TypeError:
+        # pd.NA: сравнение дает NA, который нельзя привести к bool
+        return True
 
 
 def _convert_value(value: Any, attr_name: str) -> Any:
     """Преобразует значение в нужный тип"""
+    # DateTime (проверяется до дат: last_update тоже содержит 'date')
+    if 'update' in attr_name or 'обновление' in attr_name:
+        if isinstance(value, str):
+            return datetime.fromisoformat(value)
+        elif isinstance(value, datetime):
+            return value
+
     # Даты
-    if 'date' in attr_name or 'дата' in attr_name:
+    if 'date' in attr_name or 'дата' in attr_name or attr_name == 'implementation_deadline':
         if isinstance(value, str):
             try:
                 return datetime.strptime(value, '%Y-%m-%d').date()
@@ -170,13 +204,6 @@ def _convert_value(value: Any, attr_name: str) -> Any:
         elif isinstance(value, date):
             return value
 
-    # DateTime
-    if 'update' in attr_name or 'обновление' in attr_name:
-        if isinstance(value, str):
-            return datetime.fromisoformat(value)
-        elif isinstance(value, datetime):
-            return value
-
     # Boolean
     if isinstance(value, (bool, int)) and attr_name in [
         'dismissed', 'active', 'completed', 'paid',
@@ -189,7 +216,7 @@ def _convert_value(value: Any, attr_name: str) -> Any:
         return float(value)
 
     # Int для ID
-    if attr_name == 'id' or 'id' in attr_name or attr_name.endswith('_id'):
+    if attr_name in ('id', 'version') or 'id' in attr_name or attr_name.endswith('_id'):
         return int(value)
 
     # String по умолчанию
@@ -0,0 +1,316 @@
+"""
+Проверка файла без загрузки (etl_cli import --dry-run)
+
+После extract и transform пакет проверяется по описанию столбцов в models.py:
+    type         тип значения столбца (целое, строка, число, дата, логическое)
+    length       длина строки Unicode(n)
+    range        целое вне Integer, число вне Numeric(p, s)
+    required     пустое значение в обязательном столбце
+    duplicate    повтор первичного ключа внутри файла
+    foreign_key  ссылка на ключ, которого нет ни в БД, ни в проверенных ранее файлах
+    column       колонка файла, которой нет в модели
+    transform    строка не прошла трансформацию
+Проверки идут по столбцам пакета (встроенные функции над кортежем значений), построчный
+разбор — только для столбцов с нарушениями. Ключи для внешних ссылок читаются из БД один раз
+на столбец (KeySnapshot, движок только для чтения: SQLite открывается с mode=ro, отсутствующий
+файл БД не создается); в БД ничего не пишется.
+"""
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Set, Tuple, Type
+
+from sqlalchemy import Boolean, Date, DateTime, Integer, Numeric, String, inspect as sa_inspect, select
+
+from etl.batch import RecordBatch
+
+logger = logging.getLogger(__name__)
+
+# Диапазон Integer (INTEGER в PostgreSQL, INT в MySQL)
+INT_MIN, INT_MAX = -2 ** 31, 2 ** 31 - 1
+
+CHECKS = ('type', 'length', 'range', 'required', 'duplicate', 'foreign_key', 'column', 'transform')
+
+
+def _error(row: Optional[int], column: Optional[str], check: str, message: str, value=None) -> dict:
+    error = {'row': row, 'column': column, 'check': check, 'message': message}
+    if value is not None:
+        error['value'] = value
+    return error
+
+
+def _has_none(key) -> bool:
+    return key is None or (isinstance(key, tuple) and None in key)
+
+
+def _converts(convert, value) -> bool:
+    if convert is None or not isinstance(value, str):
+        return False
+    try:
+        convert(value)
+    except (ValueError, ArithmeticError):
+        return False
+    return True
+
+
+class KeySnapshot:
+    """
+    Ключи, на которые ссылаются внешние ключи: снимок из БД и ключи проверенных файлов
+    Таблица БД читается при первой ссылке на ее столбец, повторно не читается
+    """
+
+    def __init__(self, backend=None):
+        self._backend = backend
+        self._engine = None
+        self._db: Dict[Tuple[str, str], Set] = {}
+        self._files: Dict[Tuple[str, str], Set] = {}
+        self._tables = None
+
+    def _read(self, table, column_name: str) -> Set:
+        if self._backend is None:
+            return set()
+        if self._tables is None:
+            self._engine = self._backend.read_only_engine()
+            if self._engine is None:
+                logger.warning("БД еще нет: ссылки проверяются только по файлам")
+                self._tables = set()
+            else:
+                with self._engine.connect() as connection:
+                    self._tables = set(sa_inspect(connection).get_table_names())
+        if table.name not in self._tables:
+            if self._engine is not None:
+                logger.warning(f"Таблицы {table.name} нет в БД: ссылки проверяются только по файлам")
+            return set()
+
+        keys = set()
+        stmt = select(table.c[column_name]).distinct().execution_options(yield_per=50_000)
+        with self._engine.connect() as connection:
+            for partition in connection.execute(stmt).scalars().partitions():
+                keys.update(partition)
+        logger.info(f"Снимок ключей {table.name}.{column_name}: {len(keys)}")
+        return keys
+
+    def close(self):
+        """Закрывает соединения движка снимка"""
+        if self._engine is not None:
+            self._engine.dispose()
+            self._engine = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def missing(self, table, column_name: str, values: Set) -> Set:
+        """Значения, которых нет среди ключей столбца"""
+        key = (table.name, column_name)
+        if key not in self._db:
+            self._db[key] = self._read(table, column_name)
+        return values - self._db[key] - self._files.get(key, set())
+
+    def add(self, table_name: str, column_name: str, values):
+        """Ключи проверенного файла: их строки загрузились бы раньше ссылающихся"""
+        self._files.setdefault((table_name, column_name), set()).update(values)
+
+
+def _referenced_columns(model_class: Type) -> List[str]:
+    """Столбцы таблицы, на которые ссылаются внешние ключи других таблиц"""
+    table = model_class.__table__
+    return sorted({
+        fk.column.name
+        for other in table.metadata.tables.values()
+        for fk in other.foreign_keys
+        if fk.column.table is table
+    })
+
+
+class Validator:
+    """Проверки пакетов одной таблицы; ключи и счетчики накапливаются по всему файлу"""
+
+    def __init__(self, model_class: Type, snapshot: KeySnapshot):
+        self.model_class = model_class
+        self.snapshot = snapshot
+        self.attrs = {attr.key: attr.columns[0] for attr in sa_inspect(model_class).column_attrs}
+        self.primary_key = [attr.key for attr in sa_inspect(model_class).column_attrs
+                            if attr.columns[0].primary_key]
+        self.referenced = _referenced_columns(model_class)
+        # Первичный ключ -> номер первой строки с ним
+        self._seen: Dict = {}
+        self._unknown_reported = False
+        self.rows = 0
+        self.valid = 0
+
+    def check(self, source_rows: int, batch: RecordBatch) -> List[dict]:
+        """
+        Проверяет трансформированный пакет (source_rows — строк в исходной части файла)
+        Возвращает: ошибки пакета по номерам строк
+        """
+        errors = [_error(number, None, 'transform', message) for number, message in batch.errors]
+        self.rows += source_rows
+
+        attrs = batch.columns
+        values_by_attr = dict(zip(attrs, zip(*batch.rows))) if batch.rows else {attr: () for attr in attrs}
+        unknown = [attr for attr in attrs if attr not in self.attrs]
+        if unknown and not self._unknown_reported:
+            self._unknown_reported = True
+            errors.append(_error(None, ', '.join(unknown), 'column',
+                                 f"Колонок нет в модели {self.model_class.__name__}"))
+
+        invalid = set()
+        for attr, values in values_by_attr.items():
+            column = self.attrs.get(attr)
+            if column is not None:
+                values_by_attr[attr] = self._check_column(batch, column, values, errors, invalid)
+
+        self._check_primary_key(batch, values_by_attr, errors, invalid)
+
+        # Ключи строк без ошибок доступны ссылкам следующих файлов
+        for attr, column in self.attrs.items():
+            if column.name in self.referenced and attr in values_by_attr:
+                self.snapshot.add(column.table.name, column.name, (
+                    value for idx, value in enumerate(values_by_attr[attr])
+                    if value is not None and idx not in invalid
+                ))
+
+        self.valid += len(batch) - len(invalid)
+        errors.sort(key=lambda error: error['row'] or 0)
+        return errors
+
+    def _check_column(self, batch: RecordBatch, column, values: tuple, errors: List[dict], invalid: Set[int]):
+        """Проверяет столбец пакета; возвращает значения, приведенные к типу столбца"""
+        name = column.name
+
+        def report(check: str, message: str, bad):
+            for idx, value in enumerate(values):
+                if value is not None and bad(value):
+                    invalid.add(idx)
+                    errors.append(_error(batch.number(idx), name, check, message, value))
+
+        present = values
+        if None in values:
+            if self._required(column):
+                for idx, value in enumerate(values):
+                    if value is None:
+                        invalid.add(idx)
+                        errors.append(_error(batch.number(idx), name, 'required', "Пустое значение"))
+            present = [value for value in values if value is not None]
+        if not present:
+            return values
+
+        expected = self._python_types(column)
+        if expected is not None:
+            wrong = {kind for kind in set(map(type, present)) if not self._is_kind(kind, expected)}
+            convert = self._converter(column)
+            if wrong == {str} and convert is not None:
+                # Числа, которые transform оставляет строками (внешние ключи), БД приводит сама
+                try:
+                    if len(present) == len(values):
+                        values = list(map(convert, values))
+                    else:
+                        values = [None if value is None else convert(value) for value in values]
+                    wrong = set()
+                except (ValueError, ArithmeticError):
+                    pass
+                present = [value for value in values if value is not None]
+            if wrong:
+                report('type', f"Ожидается {column.type}",
+                       lambda value: type(value) in wrong and not _converts(convert, value))
+                return values
+
+        column_type = column.type
+        if isinstance(column_type, String) and column_type.length:
+            if max(map(len, present)) > column_type.length:
+                report('length', f"Длиннее {column_type.length} символов",
+                       lambda value: len(value) > column_type.length)
+        elif isinstance(column_type, Integer):
+            if min(present) < INT_MIN or max(present) > INT_MAX:
+                report('range', "Вне диапазона Integer", lambda value: not INT_MIN <= value <= INT_MAX)
+        elif isinstance(column_type, Numeric) and column_type.precision:
+            limit = 10 ** (column_type.precision - (column_type.scale or 0))
+            if max(map(abs, present)) >= limit:
+                report('range', f"Вне диапазона {column_type}", lambda value: abs(value) >= limit)
+
+        for fk in column.foreign_keys:
+            missing = self.snapshot.missing(fk.column.table, fk.column.name, set(present))
+            if missing:
+                report('foreign_key', f"Нет ключа в {fk.column.table.name}.{fk.column.name}",
+                       lambda value: value in missing)
+        return values
+
+    def _check_primary_key(self, batch: RecordBatch, values_by_attr: dict, errors: List[dict], invalid: Set[int]):
+        if not self.primary_key or any(attr not in values_by_attr for attr in self.primary_key):
+            return
+        name = ', '.join(self.attrs[attr].name for attr in self.primary_key)
+        # Составной ключ — кортеж, простой — само значение (меньше памяти на файл в миллионы строк)
+        if len(self.primary_key) == 1:
+            keys = values_by_attr[self.primary_key[0]]
+        else:
+            keys = list(zip(*(values_by_attr[attr] for attr in self.primary_key)))
+        seen = self._seen
+        # Обычный случай — все ключи новые: словарь пополняется без цикла Python
+        unique = set(keys)
+        if len(unique) == len(keys) and unique.isdisjoint(seen) and not any(map(_has_none, unique)):
+            numbers = batch.numbers if batch.numbers is not None else range(batch.offset + 1,
+                                                                            batch.offset + len(keys) + 1)
+            seen.update(zip(keys, numbers))
+            return
+        for idx, key in enumerate(keys):
+            if _has_none(key):
+                continue
+            first = seen.setdefault(key, batch.number(idx))
+            if first != batch.number(idx):
+                invalid.add(idx)
+                errors.append(_error(batch.number(idx), name, 'duplicate', f"Ключ повторяет запись {first}", key))
+
+    @staticmethod
+    def _required(column) -> bool:
+        # Пустой целый первичный ключ выдаст БД, пустую версию — значение по умолчанию
+        if column.nullable or column.default is not None or column.server_default is not None:
+            return False
+        return not (column.primary_key and column.autoincrement in (True, 'auto')
+                    and isinstance(column.type, Integer))
+
+    @staticmethod
+    def _python_types(column) -> Optional[tuple]:
+        column_type = column.type
+        if isinstance(column_type, Boolean):
+            return bool,
+        if isinstance(column_type, Integer):
+            return int,
+        if isinstance(column_type, Numeric):
+            return float, int, Decimal
+        if isinstance(column_type, DateTime):
+            return datetime,
+        if isinstance(column_type, Date):
+            return date,
+        if isinstance(column_type, String):
+            return str,
+        return None
+
+    @staticmethod
+    def _converter(column):
+        if isinstance(column.type, Integer):
+            return int
+        if isinstance(column.type, Numeric):
+            return Decimal
+        return None
+
+    @staticmethod
+    def _is_kind(kind: type, expected: tuple) -> bool:
+        # Подклассы подходят (Timestamp pandas — datetime), но bool — не число
+        return issubclass(kind, expected) and (kind is not bool or bool in expected)
+
+    def summary(self, errors: List[dict]) -> dict:
+        """Отчет по файлу для JSON"""
+        by_check = {check: 0 for check in CHECKS}
+        for error in errors:
+            by_check[error['check']] += 1
+        return {
+            'table': self.model_class.__tablename__,
+            'rows': self.rows,
+            'valid': self.valid,
+            'invalid': self.rows - self.valid,
+            'errors_by_check': {check: count for check, count in by_check.items() if count},
+            'errors': errors,
+        }
@@ -0,0 +1,201 @@
+"""
+Потоковая запись таблиц в файлы экспорта
+
+Строки передаются пачками прямо с курсора БД, документ целиком в памяти не строится:
+CSV пишется построчно (сжатие gzip/zstd — по расширению .csv.gz / .csv.zst),
+XLSX — книгой openpyxl в режиме write_only, ODS — потоковой записью content.xml в zip.
+Листы книги добавляются по очереди, так все таблицы пишутся в один файл за один проход.
+"""
+import csv
+import gzip
+import importlib.util
+import io
+import zipfile
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Iterable, Sequence
+from xml.sax.saxutils import escape, quoteattr
+
+from etl.extractor import CSV_FORMATS, file_format
+
+# Кодировка CSV как у прежнего экспорта через pandas (с BOM для Excel)
+CSV_ENCODING = 'utf-8-sig'
+
+
+def open_csv(path, mode: str = 'r'):
+    """Текстовый файл CSV; .csv.gz и .csv.zst сжимаются и распаковываются прозрачно"""
+    fmt = file_format(path)
+    if fmt == '.csv.gz':
+        return gzip.open(path, f"{mode}t", encoding=CSV_ENCODING, newline='')
+    if fmt == '.csv.zst':
+        if importlib.util.find_spec('zstandard') is None:
+            raise ValueError("Для файлов .csv.zst нужен модуль zstandard")
+        import zstandard
+
+        raw = open(path, f"{mode}b")
+        if mode == 'w':
+            stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding=CSV_ENCODING, newline='')
+    return open(path, mode, encoding=CSV_ENCODING, newline='')
+
+
+class TableWriter(ABC):
+    """Запись листов по очереди: add_sheet, затем пачки строк append_rows"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    @abstractmethod
+    def add_sheet(self, name: str, columns: Sequence[str]):
+        """Начинает лист с заголовком columns"""
+
+    @abstractmethod
+    def append_rows(self, rows: Iterable[Sequence]):
+        """Дописывает пачку строк в текущий лист"""
+
+    @abstractmethod
+    def close(self):
+        """Завершает файл"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CsvWriter(TableWriter):
+    """Один лист — CSV-файл, строки пишутся сразу"""
+
+    def __init__(self, path: Path):
+        super().__init__(path)
+        self._file = open_csv(path, 'w')
+        self._writer = None
+
+    def add_sheet(self, name: str, columns: Sequence[str]):
+        if self._writer is not None:
+            raise ValueError(f"CSV содержит одну таблицу: {self.path}")
+        # Переводы строк как у прежнего экспорта через pandas
+        self._writer = csv.writer(self._file, lineterminator='\n')
+        self._writer.writerow(columns)
+
+    def append_rows(self, rows: Iterable[Sequence]):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class XlsxWriter(TableWriter):
+    """Книга openpyxl write_only: строки уходят во временные файлы, а не в дерево ячеек"""
+
+    def __init__(self, path: Path):
+        super().__init__(path)
+        from openpyxl import Workbook
+
+        self._workbook = Workbook(write_only=True)
+        self._sheet = None
+
+    def add_sheet(self, name: str, columns: Sequence[str]):
+        self._sheet = self._workbook.create_sheet(title=name[:31])
+        self._sheet.append(list(columns))
+
+    def append_rows(self, rows: Iterable[Sequence]):
+        for row in rows:
+            self._sheet.append(list(row))
+
+    def close(self):
+        self._workbook.save(self.path)
+
+
+_ODS_NAMESPACES = (
+    'xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" '
+    'xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0" '
+    'xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0" '
+    'office:version="1.2"'
+)
+_ODS_MIMETYPE = 'application/vnd.oasis.opendocument.spreadsheet'
+_ODS_MANIFEST = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<manifest:manifest xmlns:manifest="urn:oasis:names:tc:opendocument:xmlns:manifest:1.0" '
+    'manifest:version="1.2">'
+    f'<manifest:file-entry manifest:full-path="/" manifest:media-type="{_ODS_MIMETYPE}"/>'
+    '<manifest:file-entry manifest:full-path="content.xml" manifest:media-type="text/xml"/>'
+    '</manifest:manifest>'
+)
+
+
+def _ods_cell(value) -> str:
+    if value is None:
+        return '<table:table-cell/>'
+    if isinstance(value, bool):
+        return (f'<table:table-cell office:value-type="boolean" office:boolean-value="{str(value).lower()}">'
+                f'<text:p>{str(value).upper()}</text:p></table:table-cell>')
+    if isinstance(value, (int, float, Decimal)):
+        return (f'<table:table-cell office:value-type="float" office:value="{value}">'
+                f'<text:p>{value}</text:p></table:table-cell>')
+    if isinstance(value, (date, datetime)):
+        return (f'<table:table-cell office:value-type="date" office:date-value="{value.isoformat()}">'
+                f'<text:p>{value.isoformat(sep=" ") if isinstance(value, datetime) else value}</text:p>'
+                f'</table:table-cell>')
+    return f'<table:table-cell office:value-type="string"><text:p>{escape(str(value))}</text:p></table:table-cell>'
+
+
+class OdsWriter(TableWriter):
+    """ODS без дерева документа: content.xml пишется в архив по мере поступления строк"""
+
+    def __init__(self, path: Path):
+        super().__init__(path)
+        self._zip = zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED)
+        # mimetype — первым и без сжатия, по спецификации OpenDocument
+        self._zip.writestr(zipfile.ZipInfo('mimetype'), _ODS_MIMETYPE, compress_type=zipfile.ZIP_STORED)
+        self._zip.writestr('META-INF/manifest.xml', _ODS_MANIFEST)
+        self._content = io.TextIOWrapper(self._zip.open('content.xml', 'w'), encoding='utf-8')
+        self._content.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<office:document-content {_ODS_NAMESPACES}><office:body><office:spreadsheet>'
+        )
+        self._open = False
+
+    def _row(self, values) -> str:
+        return f"<table:table-row>{''.join(_ods_cell(value) for value in values)}</table:table-row>"
+
+    def add_sheet(self, name: str, columns: Sequence[str]):
+        if self._open:
+            self._content.write('</table:table>')
+        self._content.write(f'<table:table table:name={quoteattr(name)}>')
+        self._content.write(self._row(columns))
+        self._open = True
+
+    def append_rows(self, rows: Iterable[Sequence]):
+        self._content.write(''.join(self._row(row) for row in rows))
+
+    def close(self):
+        if self._open:
+            self._content.write('</table:table>')
+        self._content.write('</office:spreadsheet></office:body></office:document-content>')
+        self._content.close()
+        self._zip.close()
+
+
+WRITERS = {
+    '.xlsx': XlsxWriter,
+    # Как и прежний экспорт через openpyxl: содержимое .xls — книга XLSX
+    '.xls': XlsxWriter,
+    '.ods': OdsWriter,
+    **{fmt: CsvWriter for fmt in CSV_FORMATS},
+}
+
+
+def open_writer(path) -> TableWriter:
+    """Писатель по формату файла (расширению)"""
+    fmt = file_format(path)
+    if fmt not in WRITERS:
+        raise ValueError(f"Неподдерживаемый формат файла: {fmt}. Поддерживаются: {', '.join(WRITERS)}")
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    return WRITERS[fmt](path)
+
@@ -1,14 +1,20 @@
 import argparse
+import cProfile
 import logging
+import os
+import sys
 from pathlib import Path
 
-import pandas as pd
 from sqlalchemy import inspect as sa_inspect
 
-from database import session_scope, get_entities_s
-from etl.extractor import extract, SUPPORTED_FORMATS
-from etl.loader import load, visualize_stats
-from etl.transformer import transform, TABLE_MAPPING
+# database (драйвер БД), etl.loader и pandas импортируются в командах, которым они нужны:
+# справка и tables не должны платить за их загрузку
+from etl.batch import RecordBatch
+from etl.checkpoint import load_checkpoint, save_checkpoint, clear_checkpoint
+from etl.extractor import extract_batches, extract_frames, extract_workbook, file_format, SUPPORTED_FORMATS, \
+    WORKBOOK_FORMATS
+from etl.profiling import RunProfile, write_reports
+from etl.transformer import transform, detect_sheet_table, TABLE_MAPPING, LOAD_ORDER
 
 logging.basicConfig(
     level=logging.INFO,
@@ -16,37 +22,116 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+DEFAULT_BATCH_SIZE = 1000
+# Строк в одной выборке с курсора при экспорте
+EXPORT_BATCH_SIZE = 1000
 
-def import_data(file_path: str, table_name: str = None):
-    """Импорт данных из файла в БД"""
-    print(f"\n{'=' * 60}")
-    print(f"ИМПОРТ ДАННЫХ")
-    print(f"{'=' * 60}")
 
-    # Extract
-    print(f"\nИзвлечение данных из {file_path}")
-    records, columns = extract(file_path)
-    print(f"   Извлечено {len(records)} записей, {len(columns)} колонок")
+def _load_position(path: Path):
+    """Файлы с именами таблиц — в порядке внешних ключей, остальные — в конце"""
+    table_name = path.name.split('.')[0].lower()
+    order = LOAD_ORDER.index(table_name) if table_name in LOAD_ORDER else len(LOAD_ORDER)
+    return order, path.name
 
-    # Transform
-    print(f"\nТрансформация и валидация")
-    model_class, transformed = transform(
-        records,
-        table_name=table_name,
-        columns=columns
-    )
-    print(f"   Таблица: {model_class.__tablename__}")
-    print(f"   Валидировано {len(transformed)}/{len(records)} записей")
 
-    if len(transformed) < len(records):
-        print(f"   Пропущено невалидных записей: {len(records) - len(transformed)}")
+def _transform_batches(profile: RunProfile, file_path: str, table_name: str, engine: str,
+                       batch_size: int, start: int, workers: int):
+    """
+    Extract и Transform по пакетам: в этом процессе или, при workers > 1, в пуле процессов
+    Возвращает: итератор (смещение, строк в пакете, класс модели, валидированный пакет)
+    """
+    if workers > 1:
+        from etl.parallel import transform_parallel
 
-    # Load
-    print(f"\nЗагрузка в БД")
-    stats = load(model_class, transformed)
+        frames = profile.timed_iter('extract', extract_frames(file_path, batch_size, start, engine), rows=False)
+        # Время ожидания готовых пакетов из пула
+        yield from profile.timed_iter('transform', transform_parallel(frames, table_name, workers), rows=False)
+        return
+
+    for batch in profile.timed_iter('extract', extract_batches(file_path, batch_size, start, engine)):
+        with profile.stage('transform', len(batch)):
+            model_class, transformed = transform(batch, table_name=table_name)
+        table_name = model_class.__tablename__.lower()
+        yield batch.offset, len(batch), model_class, transformed
+
+
+def import_data(file_path: str, table_name: str = None, engine: str = None,
+                batch_size: int = DEFAULT_BATCH_SIZE, resume: bool = False, workers: int = 1,
+                summary: bool = True):
+    """
+    Импорт данных из файла в БД пакетами с контрольными точками
+    workers > 1 — трансформация в пуле процессов, загрузка по порядку в этом процессе
+    summary — пересчитать счетчики дашборда после загрузки (import_all делает это один раз)
+    """
+    if table_name is None and file_format(file_path) in WORKBOOK_FORMATS:
+        return import_workbook(file_path, engine, summary)
+
+    from database import engine as db_engine
+    from etl.loader import load, merge_stats, rebuild_counters, visualize_stats
+
+    print(f"\n{'=' * 60}")
+    print(f"ИМПОРТ ДАННЫХ")
+    print(f"{'=' * 60}")
+
+    profile = RunProfile('import', file_path, db_engine)
+
+    start, batch_id = 0, 0
+    if resume:
+        checkpoint = load_checkpoint(file_path)
+        if checkpoint:
+            start, batch_id = checkpoint['offset'], checkpoint['batch_id']
+            table_name = table_name or checkpoint['table']
+            print(f"\nПродолжение с записи {start + 1} (пакет {batch_id})")
+        else:
+            print(f"\nКонтрольная точка не найдена, импорт с начала")
+
+    # Extract → Transform → Load по пакетам
+    print(f"\nИмпорт из {file_path} пакетами по {batch_size} записей")
+    model_class = None
+    extracted = 0
+    validated = 0
+    stats = {'total': 0, 'success': 0, 'failed': 0, 'errors': []}
+
+    batches = _transform_batches(profile, file_path, table_name, engine, batch_size, start, workers)
+    try:
+        for offset, size, model_class, transformed in batches:
+            table_name = model_class.__tablename__.lower()
+
+            with profile.stage('load', len(transformed)):
+                batch_stats = load(model_class, transformed)
+            merge_stats(stats, batch_stats)
+
+            # Пакет зафиксирован: сохраняем позицию после него (с пропущенными пустыми строками)
+            batch_id += 1
+            save_checkpoint(file_path, table_name, transformed.end, batch_id)
+
+            extracted += size
+            validated += len(transformed)
+            print(f"   Пакет {batch_id}: записи {offset + 1}–{transformed.end}, "
+                  f"загружено {batch_stats['success']}/{size}")
+    finally:
+        # Пакеты счетчики не обновляют — пересчет и после прерванного импорта
+        if summary and stats['success']:
+            with profile.stage('summary'):
+                rebuild_counters()
+
+    if model_class is None:
+        print(f"   Нет записей для импорта")
+        clear_checkpoint(file_path)
+        profile.finish(stats)
+        return True
+
+    print(f"\n   Таблица: {model_class.__tablename__}")
+    print(f"   Извлечено {extracted} записей, валидировано {validated}")
+
+    if validated < extracted:
+        print(f"   Пропущено невалидных записей: {extracted - validated}")
+
+    clear_checkpoint(file_path)
+    profile.finish({'table': model_class.__tablename__, **stats})
 
     # Визуализация
-    print("\n" + visualize_stats(stats, model_class))
+    print("\n" + visualize_stats(stats, model_class, profile))
 
     if stats['failed'] > 0:
         print(f"\nЗагрузка завершена с ошибками!", file=sys.stderr)
@@ -56,71 +141,345 @@ def import_data(file_path: str, table_name: str = None):
     return True
 
 
-def export_data(table_name: str, output_path: str):
-    """Экспорт данных из БД в файл"""
+def _transform_sheet(sheet_name: str, batch: RecordBatch):
+    """Трансформирует один лист книги (выполняется в отдельном процессе)"""
+    table_name = detect_sheet_table(sheet_name, batch.columns)
+    model_class, transformed = transform(batch, table_name=table_name)
+    return table_name, model_class, transformed
+
+
+def import_workbook(file_path: str, engine: str = None, summary: bool = True):
+    """Импорт всех листов книги в БД"""
+    from concurrent.futures import ProcessPoolExecutor
+
+    from database import engine as db_engine
+    from etl.loader import load, rebuild_counters, visualize_stats
+
     print(f"\n{'=' * 60}")
-    print(f"ЭКСПОРТ ДАННЫХ")
+    print(f"ИМПОРТ КНИГИ")
+    print(f"{'=' * 60}")
+
+    profile = RunProfile('import', file_path, db_engine)
+
+    # Extract: книга открывается один раз
+    print(f"\nИзвлечение листов из {file_path}")
+    with profile.stage('extract') as stage:
+        sheets = extract_workbook(file_path, engine)
+        stage['rows'] += sum(len(batch) for batch in sheets.values())
+
+    if not sheets:
+        print(f"   В книге нет листов с данными")
+        profile.finish()
+        return False
+
+    for sheet_name, batch in sheets.items():
+        print(f"   {sheet_name}: {len(batch)} записей, {len(batch.columns)} колонок")
+
+    # Transform: листы обрабатываются параллельно
+    print(f"\nТрансформация и валидация")
+    workers = min(len(sheets), os.cpu_count() or 1)
+    with profile.stage('transform', sum(len(batch) for batch in sheets.values())):
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    sheet_name: executor.submit(_transform_sheet, sheet_name, batch)
+                    for sheet_name, batch in sheets.items()
+                }
+                results = {sheet_name: future.result() for sheet_name, future in futures.items()}
+        else:
+            results = {
+                sheet_name: _transform_sheet(sheet_name, batch)
+                for sheet_name, batch in sheets.items()
+            }
+
+    for sheet_name, (table_name, model_class, transformed) in results.items():
+        total = len(sheets[sheet_name])
+        print(f"   {sheet_name} → {model_class.__tablename__}: "
+              f"валидировано {len(transformed)}/{total} записей")
+
+    # Load: в порядке внешних ключей
+    print(f"\nЗагрузка в БД")
+    ordered = sorted(results.values(), key=lambda result: LOAD_ORDER.index(result[0]))
+
+    failed = False
+    tables = []
+    try:
+        for table_name, model_class, transformed in ordered:
+            with profile.stage('load', len(transformed)):
+                stats = load(model_class, transformed)
+            print("\n" + visualize_stats(stats, model_class))
+            failed = failed or stats['failed'] > 0
+            tables.append({'table': model_class.__tablename__, **stats})
+    finally:
+        if summary and any(table['success'] for table in tables):
+            with profile.stage('summary'):
+                rebuild_counters()
+
+    profile.finish({'tables': tables})
+    print("\n".join(profile.summary_lines()))
+
+    if failed:
+        print(f"\nЗагрузка завершена с ошибками!", file=sys.stderr)
+        return False
+
+    print("\nИмпорт книги успешно завершен!")
+    return True
+
+
+def validate_data(file_path: str, table_name: str = None, engine: str = None,
+                  batch_size: int = DEFAULT_BATCH_SIZE, workers: int = 1, snapshot=None):
+    """
+    Проверка файла без записи в БД: extract, transform и проверки по моделям (etl.validator)
+    snapshot — общий снимок ключей для файлов одного прогона
+    Возвращает: отчеты по таблицам файла
+    """
+    from database import backend, engine as db_engine
+    from etl.validator import KeySnapshot, Validator
+
+    if snapshot is None:
+        with KeySnapshot(backend) as snapshot:
+            return validate_data(file_path, table_name, engine, batch_size, workers, snapshot)
+    profile = RunProfile('dry-run', file_path, db_engine)
+    reports = []
+
+    print(f"\nПроверка {file_path}")
+    if table_name is None and file_format(file_path) in WORKBOOK_FORMATS:
+        with profile.stage('extract') as stage:
+            sheets = extract_workbook(file_path, engine)
+            stage['rows'] += sum(len(batch) for batch in sheets.values())
+        tables = {sheet_name: detect_sheet_table(sheet_name, batch.columns) for sheet_name, batch in sheets.items()}
+        # Листы в порядке внешних ключей: ключи листа доступны ссылкам следующих
+        for sheet_name in sorted(sheets, key=lambda name: LOAD_ORDER.index(tables[name])):
+            batch = sheets[sheet_name]
+            with profile.stage('transform', len(batch)):
+                model_class, transformed = transform(batch, table_name=tables[sheet_name])
+            validator = Validator(model_class, snapshot)
+            with profile.stage('validate', len(batch)):
+                errors = validator.check(len(batch), transformed)
+            reports.append({'sheet': sheet_name, **validator.summary(errors)})
+    else:
+        validator, errors = None, []
+        for offset, size, model_class, transformed in _transform_batches(
+                profile, file_path, table_name, engine, batch_size, 0, workers):
+            validator = validator or Validator(model_class, snapshot)
+            with profile.stage('validate', size):
+                errors.extend(validator.check(size, transformed))
+        if validator is not None:
+            reports.append(validator.summary(errors))
+
+    for report in reports:
+        print(f"   {report['table']}: записей {report['rows']}, без ошибок {report['valid']}, "
+              f"ошибок {len(report['errors'])}")
+    if not reports:
+        print(f"   Нет записей для проверки")
+
+    profile.finish({'tables': [{key: value for key, value in report.items() if key != 'errors'}
+                               for report in reports]})
+    return [{'file': str(file_path), **report} for report in reports]
+
+
+def visualize_report(reports: list) -> str:
+    """Текстовая сводка проверки: итоги по таблицам и первые ошибки"""
+    errors = [(report['file'], error) for report in reports for error in report['errors']]
+    lines = [
+        "=" * 60,
+        "РЕЗУЛЬТАТЫ ПРОВЕРКИ (без записи в БД)",
+        "=" * 60,
+        f"Таблиц:             {len(reports)}",
+        f"Всего записей:      {sum(report['rows'] for report in reports)}",
+        f"Без ошибок:         {sum(report['valid'] for report in reports)}",
+        f"Ошибок:             {len(errors)}",
+    ]
+    by_check = {}
+    for report in reports:
+        for check, count in report['errors_by_check'].items():
+            by_check[check] = by_check.get(check, 0) + count
+    for check, count in sorted(by_check.items(), key=lambda item: -item[1]):
+        lines.append(f"  {check:18} {count}")
+
+    if errors:
+        lines.append("\nОШИБКИ:")
+        lines.append("-" * 60)
+        for file_path, error in errors[:10]:
+            row = f"запись {error['row']}" if error['row'] else 'файл'
+            column = f" [{error['column']}]" if error['column'] else ''
+            value = f": {error['value']!r}" if 'value' in error else ''
+            lines.append(f"  • {Path(file_path).name}, {row}{column} {error['message']}{value}")
+        if len(errors) > 10:
+            lines.append(f"  ... и еще {len(errors) - 10} ошибок (полный список — --report)")
+
+    lines.append("=" * 60)
+    return "\n".join(lines)
+
+
+def dry_run(path: str, table_name: str = None, engine: str = None, batch_size: int = DEFAULT_BATCH_SIZE,
+            workers: int = 1, report_path: str = None):
+    """
+    Проверка файла или директории без записи в БД (import --dry-run)
+    report_path — полный отчет об ошибках в JSON
+    """
+    import json
+    from database import backend
+    from etl.validator import KeySnapshot
+
+    print(f"\n{'=' * 60}")
+    print(f"ПРОВЕРКА ДАННЫХ")
     print(f"{'=' * 60}")
 
-    # Получаем модель
-    table_name_lower = table_name.lower()
-    model_class = TABLE_MAPPING.get(table_name_lower)
+    input_path = Path(path)
+    if input_path.is_dir():
+        files = sorted((file for ext in SUPPORTED_FORMATS for file in input_path.glob(f"*{ext}")),
+                       key=_load_position)
+        if not files:
+            print(f"В директории {path} не найдено поддерживаемых файлов")
+            return False
+        table_name = None
+    else:
+        files = [input_path]
+
+    # Один снимок ключей на прогон: файлы проверяются в порядке загрузки
+    reports = []
+    failed_files = []
+    with KeySnapshot(backend) as snapshot:
+        for file_path in files:
+            try:
+                reports.extend(validate_data(str(file_path), table_name, engine, batch_size, workers, snapshot))
+            except Exception as e:
+                failed_files.append({'file': str(file_path), 'message': str(e)})
+                print(f"\nОшибка проверки {file_path.name}: {e}")
+                logger.exception(f"Ошибка проверки {file_path}")
+
+    print("\n" + visualize_report(reports))
+    for failed in failed_files:
+        print(f"  Файл не проверен: {failed['file']}: {failed['message']}")
+
+    ok = not failed_files and not any(report['errors'] for report in reports)
+    if report_path:
+        report = {
+            'valid': ok,
+            'rows': sum(report['rows'] for report in reports),
+            'invalid': sum(report['invalid'] for report in reports),
+            'tables': reports,
+            'failed_files': failed_files,
+        }
+        Path(report_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+        print(f"\nОтчет об ошибках сохранен в {report_path}")
+
+    if not ok:
+        print(f"\nПроверка выявила ошибки!", file=sys.stderr)
+        return False
+
+    print("\nПроверка пройдена: файл можно загружать")
+    return True
+
 
+def _export_model(table_name: str):
+    """Модель таблицы экспорта по имени"""
+    model_class = TABLE_MAPPING.get(table_name.lower())
     if not model_class:
         raise ValueError(
             f"Неизвестная таблица: {table_name}. "
             f"Доступные: {', '.join(TABLE_MAPPING.keys())}"
         )
+    return model_class
 
-    print(f"\nИзвлечение данных из таблицы: {model_class.__tablename__}")
 
-    # Получаем данные из БД
-    with session_scope() as session:
-        entities = get_entities_s(session, model_class)
+def _table_partitions(session, model_class):
+    """
+    Имена столбцов таблицы и пачки строк с серверного курсора
+    Столбцы вместо объектов моделей: память не растет с размером таблицы
+    """
+    from sqlalchemy import select
 
-    if not entities:
-        print(f"   Таблица {model_class.__tablename__} пуста")
-        return False
+    attrs = sa_inspect(model_class).column_attrs
+    stmt = select(*[getattr(model_class, attr.key) for attr in attrs])
+    result = session.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    return [attr.columns[0].name for attr in attrs], result.partitions()
+
+
+def export_data(table_name: str, output_path: str):
+    """Экспорт таблицы в файл: строки пишутся с курсора БД, без DataFrame и дерева книги"""
+    from database import engine as db_engine, session_scope
+    from etl.writers import open_writer
 
-    print(f"   Извлечено {len(entities)} записей")
-
-    # Преобразуем в словари
-    records = []
-    for entity in entities:
-        record = {}
-        # Получаем инспектор для правильного маппинга атрибутов
-        state = sa_inspect(entity)
-        for attr in state.mapper.column_attrs:
-            # attr.key - это имя Python атрибута (topic)
-            value = getattr(entity, attr.key)
-            # attr.columns[0].name - имя колонки в БД (тематика)
-            record[attr.columns[0].name] = value
-        records.append(record)
-
-    # Создаем DataFrame
-    df = pd.DataFrame(records)
-
-    # Определяем формат по расширению
+    print(f"\n{'=' * 60}")
+    print(f"ЭКСПОРТ ДАННЫХ")
+    print(f"{'=' * 60}")
+
+    profile = RunProfile('export', table_name, db_engine)
+    model_class = _export_model(table_name)
     output_path = Path(output_path)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
 
-    print(f"\nСохранение в файл: {output_path}")
+    print(f"\nИзвлечение данных из таблицы: {model_class.__tablename__}")
+    print(f"Сохранение в файл: {output_path}")
 
-    if output_path.suffix.lower() == '.csv':
-        df.to_csv(output_path, index=False, encoding='utf-8-sig')
-    elif output_path.suffix.lower() in {'.xls', '.xlsx'}:
-        df.to_excel(output_path, index=False, engine='openpyxl')
-    elif output_path.suffix.lower() == '.ods':
-        df.to_excel(output_path, index=False, engine='odf')
-    else:
-        raise ValueError(f"Неподдерживаемый формат файла: {output_path.suffix}")
+    rows = 0
+    writer = None
+    try:
+        with session_scope(read_only=True) as session:
+            columns, partitions = _table_partitions(session, model_class)
+            for partition in profile.timed_iter('query', partitions):
+                with profile.stage('write', len(partition)):
+                    # Файл создается с первой пачкой: пустая таблица файла не дает
+                    if writer is None:
+                        writer = open_writer(output_path)
+                        writer.add_sheet(table_name.lower(), columns)
+                    writer.append_rows(partition)
+                rows += len(partition)
+    finally:
+        if writer is not None:
+            with profile.stage('write'):
+                writer.close()
+
+    if not rows:
+        print(f"   Таблица {model_class.__tablename__} пуста")
+        profile.finish({'table': model_class.__tablename__, 'rows': 0})
+        return False
 
-    print(f"   Сохранено {len(records)} записей")
+    profile.finish({'table': model_class.__tablename__, 'rows': rows, 'file': str(output_path)})
+    print(f"   Сохранено {rows} записей")
+    print("\n".join(profile.summary_lines()))
     print(f"\nЭкспорт успешно завершен!")
     return True
 
 
-def import_all(input_dir: str):
+def export_workbook(output_path: str):
+    """Экспорт всех таблиц листами одной книги (xlsx/ods) за один проход"""
+    from database import engine as db_engine, session_scope
+    from etl.writers import open_writer
+
+    output_path = Path(output_path)
+    if file_format(output_path) not in WORKBOOK_FORMATS:
+        raise ValueError(f"Книга должна быть в формате {', '.join(sorted(WORKBOOK_FORMATS))}: {output_path}")
+
+    print(f"\n{'=' * 60}")
+    print(f"ЭКСПОРТ В КНИГУ: {output_path}")
+    print(f"{'=' * 60}")
+
+    profile = RunProfile('export', 'all', db_engine)
+    counts = {}
+    # Листы в порядке внешних ключей — так книгу можно сразу загрузить обратно
+    with open_writer(output_path) as writer, session_scope(read_only=True) as session:
+        for table_name in LOAD_ORDER:
+            columns, partitions = _table_partitions(session, TABLE_MAPPING[table_name])
+            writer.add_sheet(table_name, columns)
+            counts[table_name] = 0
+            for partition in profile.timed_iter('query', partitions):
+                with profile.stage('write', len(partition)):
+                    writer.append_rows(partition)
+                counts[table_name] += len(partition)
+            print(f"  {table_name:20} {counts[table_name]} записей")
+
+    profile.finish({'tables': counts, 'rows': sum(counts.values()), 'file': str(output_path)})
+    print("\n".join(profile.summary_lines()))
+    print(f"{'=' * 60}\n")
+    return True
+
+
+def import_all(input_dir: str, engine: str = None, batch_size: int = DEFAULT_BATCH_SIZE,
+               resume: bool = False, workers: int = 1):
     """Импорт всех файлов из директории"""
     input_path = Path(input_dir)
 
@@ -147,10 +506,11 @@ def import_all(input_dir: str):
     success_count = 0
     failed_count = 0
 
-    for file_path in sorted(files):
+    for file_path in sorted(files, key=_load_position):
         try:
             print(f"\n{'─' * 60}")
-            result = import_data(str(file_path))
+            result = import_data(str(file_path), engine=engine, batch_size=batch_size, resume=resume,
+                                 workers=workers, summary=False)
             if result:
                 success_count += 1
             else:
@@ -160,6 +520,11 @@ def import_all(input_dir: str):
             print(f"\nОшибка импорта {file_path.name}: {e}")
             logger.exception(f"Ошибка импорта {file_path}")
 
+    # Счетчики дашборда — один пересчет на все файлы
+    from etl.loader import rebuild_counters
+
+    rebuild_counters()
+
     print(f"\n{'=' * 60}")
     print(f"ИТОГО:")
     print(f"  Успешно: {success_count}")
@@ -169,9 +534,11 @@ def import_all(input_dir: str):
     return failed_count == 0
 
 
-def export_all(output_dir: str, file_format: str = 'csv'):
-    """Экспорт всех таблиц в директорию"""
+def export_all(output_dir: str, file_format: str = 'csv', single_workbook: bool = False):
+    """Экспорт всех таблиц в директорию (single_workbook — одной книгой export.<формат>)"""
     output_path = Path(output_dir)
+    if single_workbook:
+        return export_workbook(str(output_path / f"export.{file_format}"))
     output_path.mkdir(parents=True, exist_ok=True)
 
     print(f"\n{'=' * 60}")
@@ -206,6 +573,24 @@ def export_all(output_dir: str, file_format: str = 'csv'):
     return failed_count == 0
 
 
+def rebuild_summary():
+    """Полный пересчет счетчиков дашборда (после загрузки мимо API или расхождений)"""
+    from database import engine as db_engine
+    from summary import rebuild
+
+    print(f"\n{'=' * 60}")
+    print(f"ПЕРЕСЧЕТ СЧЕТЧИКОВ")
+    print(f"{'=' * 60}")
+
+    with db_engine.begin() as connection:
+        counts = rebuild(connection)
+
+    for metric, count in counts.items():
+        print(f"  {metric:20} {count} ключей")
+    print(f"{'=' * 60}\n")
+    return True
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='CLI для ETL процессов',
@@ -214,51 +599,103 @@ def main():
 
     subparsers = parser.add_subparsers(dest='command', help='Команда для выполнения')
 
+    # Общие параметры профилирования для import и export
+    profile_parser = argparse.ArgumentParser(add_help=False)
+    profile_parser.add_argument('--stats-json', help='Сохранить статистику и профиль этапов в JSON')
+    profile_parser.add_argument('--profile', help='Сохранить профиль cProfile (pstats) в файл')
+
     # Команда import
-    import_parser = subparsers.add_parser('import', help='Импорт данных из файла в БД')
+    import_parser = subparsers.add_parser('import', parents=[profile_parser], help='Импорт данных из файла в БД')
     import_parser.add_argument('--file', '-f', required=True, help='Путь к файлу для импорта или директория для массового импорта')
     import_parser.add_argument('--table', '-t', help='Название таблицы (опционально, автоопределение)')
+    import_parser.add_argument('--engine', '-e', default='auto',
+                               choices=['auto', 'pyarrow', 'c', 'python', 'calamine', 'openpyxl', 'xlrd', 'odf'],
+                               help='Движок чтения файла (по умолчанию: auto — самый быстрый из установленных)')
+    import_parser.add_argument('--batch-size', '-b', type=int, default=DEFAULT_BATCH_SIZE,
+                               help=f'Записей в пакете (транзакции) (по умолчанию: {DEFAULT_BATCH_SIZE}); '
+                                    f'CSV и книги calamine/openpyxl читаются частями, '
+                                    f'с движками xlrd и odf файл читается целиком')
+    import_parser.add_argument('--resume', '-r', action='store_true',
+                               help='Продолжить прерванный импорт с последней контрольной точки')
+    import_parser.add_argument('--workers', '-w', type=int, default=1,
+                               help='Процессов для трансформации пакетов одного файла (по умолчанию: 1)')
+    import_parser.add_argument('--dry-run', action='store_true',
+                               help='Только проверить файл: трансформация, типы, длины, ключи — без записи в БД')
+    import_parser.add_argument('--report', help='Полный отчет об ошибках проверки (--dry-run) в JSON')
 
     # Команда export
-    export_parser = subparsers.add_parser('export', help='Экспорт данных из БД в файл')
+    export_parser = subparsers.add_parser('export', parents=[profile_parser], help='Экспорт данных из БД в файл')
     export_group = export_parser.add_mutually_exclusive_group(required=True)
     export_group.add_argument('--table', '-t', help='Название таблицы для экспорта')
-    export_group.add_argument('--all', '-a', default=True, action='store_true', help='Экспорт всех таблиц')
+    export_group.add_argument('--all', '-a', action='store_true', help='Экспорт всех таблиц')
     export_parser.add_argument('--output', '-o', required=True, help='Путь для сохранения (файл или директория)')
-    export_parser.add_argument('--format', '-fmt', default='csv', choices=['csv', 'xlsx', 'xls', 'ods'],
+    export_parser.add_argument('--format', '-fmt', default='csv',
+                               choices=['csv', 'csv.gz', 'csv.zst', 'xlsx', 'xls', 'ods'],
                                help='Формат файла при экспорте всех таблиц (по умолчанию: csv)')
+    export_parser.add_argument('--single-workbook', action='store_true',
+                               help='Все таблицы листами одной книги export.<формат> (xlsx, xls, ods)')
 
     # Команда tables
     tables_parser = subparsers.add_parser('tables', help='Показать список доступных таблиц')
 
+    # Команда init-db
+    subparsers.add_parser('init-db', help='Создать недостающие таблицы БД из моделей')
+
+    # Команда rebuild-summary
+    subparsers.add_parser('rebuild-summary', help='Пересчитать счетчики дашборда по всем данным')
+
     args = parser.parse_args()
 
     if not args.command:
         parser.print_help()
         return
 
+    profiler = None
+    if getattr(args, 'profile', None):
+        profiler = cProfile.Profile()
+        profiler.enable()
+
     try:
-        if args.command == 'import':
+        if args.command in ('import', 'export', 'init-db', 'rebuild-summary'):
+            from database import init_db
+
+        # Проверка без записи: схема БД не создается
+        if args.command in ('import', 'export', 'rebuild-summary') and not getattr(args, 'dry_run', False):
+            init_db()
+
+        if args.command == 'import' and args.dry_run:
+            success = dry_run(args.file, args.table, args.engine, args.batch_size, args.workers, args.report)
+            exit(0 if success else 1)
+
+        elif args.command == 'import':
             file_path = Path(args.file)
             if file_path.is_dir():
                 # Массовый импорт
-                success = import_all(str(file_path))
+                success = import_all(str(file_path), args.engine, args.batch_size, args.resume, args.workers)
                 exit(0 if success else 1)
             else:
                 # Импорт одного файла
-                success = import_data(args.file, args.table)
+                success = import_data(args.file, args.table, args.engine, args.batch_size, args.resume,
+                                      args.workers)
                 exit(0 if success else 1)
 
         elif args.command == 'export':
             if args.all:
                 # Массовый экспорт
-                success = export_all(args.output, args.format)
+                success = export_all(args.output, args.format, args.single_workbook)
                 exit(0 if success else 1)
             else:
                 # Экспорт одной таблицы
                 success = export_data(args.table, args.output)
                 exit(0 if success else 1)
 
+        elif args.command == 'init-db':
+            init_db(force=True)
+            print("\nТаблицы созданы\n")
+
+        elif args.command == 'rebuild-summary':
+            rebuild_summary()
+
         elif args.command == 'tables':
             print("\nДоступные таблицы:\n")
             for table_name in sorted(TABLE_MAPPING.keys()):
@@ -271,8 +708,15 @@ def main():
         logger.exception("Ошибка выполнения команды")
         exit(1)
 
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print(f"Профиль cProfile сохранен в {args.profile}")
+
+        if getattr(args, 'stats_json', None):
+            write_reports(args.stats_json)
 
-if __name__ == '__main__':
-    import sys
 
+if __name__ == '__main__':
     main()
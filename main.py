@@ -1,21 +1,60 @@
+import os
+from contextlib import asynccontextmanager
+
+from anyio import to_thread
 from fastapi import FastAPI
+from sqlalchemy.orm import configure_mappers
+
+import search_index
+from admission import admit, admit_entities
+import summary  # noqa: F401 — счетчики дашборда обновляются в транзакциях записи
+from database import init_db, pin_primary, replicas
+from etl.jobs import job_queue
 from routers import (
     positions, topics, employees, teams, clients,
-    contracts, projects, services, payments
+    contracts, projects, services, payments, etl, search, dashboard, admission
 )
 
-app = FastAPI(title="Web Studio API", version="1.0.0")
-
-# Подключаем все роутеры
-app.include_router(positions.router)
-app.include_router(topics.router)
-app.include_router(employees.router)
-app.include_router(teams.router)
-app.include_router(clients.router)
-app.include_router(contracts.router)
-app.include_router(projects.router)
-app.include_router(services.router)
-app.include_router(payments.router)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Пул потоков для синхронных обработчиков (по умолчанию в anyio — 40)
+    threadpool_size = os.getenv('THREADPOOL_SIZE')
+    if threadpool_size:
+        to_thread.current_default_thread_limiter().total_tokens = int(threadpool_size)
+    # Связи моделей настраиваются при старте воркера, а не на первом запросе
+    configure_mappers()
+    init_db()
+    # Индексы поиска строятся в фоне; импорт в пуле ETL перестраивает индексы своих таблиц
+    search_index.start()
+    job_queue.listeners.append(search_index.rebuild_after_import)
+    # Проверка доступности реплик для чтения (если настроены)
+    replicas.start()
+    yield
+    replicas.stop()
+    search_index.stop()
+    job_queue.shutdown()
+
+
+app = FastAPI(title="Web Studio API", version="1.0.0", lifespan=lifespan)
+
+# С репликами клиент после своей записи какое-то время читает с основной БД
+if replicas:
+    app.middleware('http')(pin_primary)
+
+# Подключаем все роутеры; у маршрутов к БД — бюджет одновременных запросов своего класса
+for entity_router in (positions, topics, employees, teams, clients, contracts, projects, services, payments):
+    app.include_router(entity_router.router, dependencies=[admit_entities])
+app.include_router(etl.router)
+app.include_router(search.router, dependencies=[admit('reports')])
+app.include_router(dashboard.router, dependencies=[admit('reports')])
+app.include_router(admission.router)
+
+# Отладочные эндпоинты (планы запросов) — только для разработки
+if os.getenv('API_DEBUG') == '1':
+    from routers import debug
+
+    app.include_router(debug.router)
 
 
 @app.get("/")
@@ -0,0 +1,30 @@
+"""Столбец версии для оптимистичной блокировки
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+VERSIONED_TABLES = [
+    'Должности', 'Тематики', 'Сотрудники', 'Команды', 'Проект',
+    'Услуга', 'Клиент', 'Оплата', 'Договор',
+]
+
+
+def upgrade():
+    for table in VERSIONED_TABLES:
+        with op.batch_alter_table(table) as batch:
+            batch.add_column(sa.Column('версия', sa.Integer(), nullable=False, server_default=sa.text('1')))
+
+
+def downgrade():
+    for table in VERSIONED_TABLES:
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column('версия')
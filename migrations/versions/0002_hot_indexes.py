@@ -0,0 +1,28 @@
+"""Индексы по столбцам фильтрации роутеров и ETL
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Участие_в_команде_сотрудник_активен', 'Участие_в_команде', ['сотрудник', 'активен'])
+    op.create_index('ix_Услуга_проект', 'Услуга', ['проект'])
+    op.create_index('ix_Договор_клиент', 'Договор', ['клиент'])
+    op.create_index('ix_Проект_клиент', 'Проект', ['клиент'])
+    op.create_index('ix_Оплата_оплачено_сумма', 'Оплата', ['оплачено', 'сумма'])
+
+
+def downgrade():
+    op.drop_index('ix_Оплата_оплачено_сумма', table_name='Оплата')
+    op.drop_index('ix_Проект_клиент', table_name='Проект')
+    op.drop_index('ix_Договор_клиент', table_name='Договор')
+    op.drop_index('ix_Услуга_проект', table_name='Услуга')
+    op.drop_index('ix_Участие_в_команде_сотрудник_активен', table_name='Участие_в_команде')
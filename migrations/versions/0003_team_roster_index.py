@@ -0,0 +1,20 @@
+"""Индекс состава команды
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Участие_в_команде_команда_активен', 'Участие_в_команде', ['команда', 'активен'])
+
+
+def downgrade():
+    op.drop_index('ix_Участие_в_команде_команда_активен', table_name='Участие_в_команде')
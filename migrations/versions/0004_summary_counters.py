@@ -0,0 +1,69 @@
+"""Счетчики дашборда
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'Счетчики',
+        sa.Column('показатель', sa.Unicode(32), primary_key=True),
+        sa.Column('ключ', sa.Integer, primary_key=True),
+        sa.Column('значение', sa.Numeric(14, 2)),
+    )
+    op.create_index('ix_Счетчики_показатель_значение', 'Счетчики', ['показатель', 'значение'])
+
+    _fill()
+
+
+def _fill():
+    """
+    Начальные значения по существующим данным — те же агрегаты, что в summary.py,
+    но по описаниям таблиц на момент ревизии: миграция не зависит от кода приложения.
+    Нулевые значения не записываются (отсутствующий счетчик читается как 0)
+    """
+    counters = sa.table('Счетчики', sa.column('показатель'), sa.column('ключ'), sa.column('значение'))
+    payment = sa.table('Оплата', sa.column('id'), sa.column('сумма'), sa.column('оплачено'))
+    contract = sa.table('Договор', sa.column('клиент'), sa.column('оплата'))
+    project = sa.table('Проект', sa.column('договор'), sa.column('клиент'))
+    service = sa.table('Услуга', sa.column('оплата'), sa.column('проект'),
+                       sa.column('реализующая_команда'), sa.column('выполнена'))
+    participation = sa.table('Участие_в_команде', sa.column('команда'), sa.column('активен'))
+
+    unpaid = sa.union_all(
+        sa.select(contract.c.клиент.label('key'), payment.c.сумма.label('value'))
+        .select_from(contract.join(payment, payment.c.id == contract.c.оплата))
+        .where(payment.c.оплачено == sa.false()),
+        sa.select(project.c.клиент.label('key'), payment.c.сумма.label('value'))
+        .select_from(service.join(project, project.c.договор == service.c.проект)
+                     .join(payment, payment.c.id == service.c.оплата))
+        .where(payment.c.оплачено == sa.false()),
+    ).subquery()
+    aggregates = {
+        'unpaid_amount': sa.select(unpaid.c.key, sa.func.sum(unpaid.c.value)).group_by(unpaid.c.key),
+        'open_services': sa.select(service.c.реализующая_команда, sa.func.count())
+        .where(service.c.выполнена == sa.false(), service.c.реализующая_команда.is_not(None))
+        .group_by(service.c.реализующая_команда),
+        'active_members': sa.select(participation.c.команда, sa.func.count())
+        .where(participation.c.активен == sa.true())
+        .group_by(participation.c.команда),
+    }
+    for metric, aggregate in aggregates.items():
+        values = aggregate.subquery()
+        key, value = values.c
+        source = sa.select(sa.literal(metric, sa.Unicode(32)), key, value).where(key.is_not(None), value != 0)
+        op.execute(counters.insert().from_select(list(counters.c), source))
+
+
+def downgrade():
+    op.drop_index('ix_Счетчики_показатель_значение', table_name='Счетчики')
+    op.drop_table('Счетчики')
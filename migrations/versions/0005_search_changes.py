@@ -0,0 +1,29 @@
+"""Журнал изменений для индексов поиска
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'Изменения_поиска',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('таблица', sa.Unicode(32), nullable=False),
+        sa.Column('ключ', sa.Integer),
+        sa.Column('создано', sa.DateTime, nullable=False),
+    )
+    op.create_index('ix_Изменения_поиска_создано', 'Изменения_поиска', ['создано'])
+
+
+def downgrade():
+    op.drop_index('ix_Изменения_поиска_создано', table_name='Изменения_поиска')
+    op.drop_table('Изменения_поиска')
@@ -0,0 +1,22 @@
+"""Уникальный договор проекта (цель внешнего ключа Услуга.проект)
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ux_Проект_договор', 'Проект', ['договор'], unique=True,
+                    mssql_where=sa.text('договор IS NOT NULL'))
+
+
+def downgrade():
+    op.drop_index('ux_Проект_договор', table_name='Проект')
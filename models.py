@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, Date, DateTime, Boolean, Numeric, ForeignKey, Unicode
+from sqlalchemy import Integer, Date, DateTime, Boolean, Numeric, ForeignKey, Unicode, Index, text
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from typing import Optional
 from datetime import date, datetime
@@ -8,7 +8,13 @@ class Base(DeclarativeBase):
     pass
 
 
-class Position(Base):
+class Versioned:
+    """Версия строки для оптимистичной блокировки (If-Match / ETag)"""
+
+    version: Mapped[int] = mapped_column('версия', Integer, default=1, server_default=text('1'))
+
+
+class Position(Versioned, Base):
     __tablename__ = 'Должности'
 
     position: Mapped[str] = mapped_column('должность', Unicode(32), primary_key=True)
@@ -17,7 +23,7 @@ class Position(Base):
     employees: Mapped[list['Employee']] = relationship(back_populates="position_rel")
 
 
-class Topic(Base):
+class Topic(Versioned, Base):
     __tablename__ = 'Тематики'
 
     topic: Mapped[str] = mapped_column('тематика', Unicode(32), primary_key=True)
@@ -26,7 +32,7 @@ class Topic(Base):
     projects: Mapped[list['Project']] = relationship(back_populates="topic_rel")
 
 
-class Employee(Base):
+class Employee(Versioned, Base):
     __tablename__ = 'Сотрудники'
 
     id: Mapped[int] = mapped_column('id', Integer, primary_key=True)
@@ -44,7 +50,7 @@ class Employee(Base):
     processed_contracts: Mapped[list['Contract']] = relationship(back_populates="processing_employee_rel")
 
 
-class Team(Base):
+class Team(Versioned, Base):
     __tablename__ = 'Команды'
 
     id: Mapped[int] = mapped_column('id', Integer, primary_key=True)
@@ -56,8 +62,14 @@ class Team(Base):
     services: Mapped[list['Service']] = relationship(back_populates="implementing_team_rel")
 
 
-class Project(Base):
+class Project(Versioned, Base):
     __tablename__ = 'Проект'
+    __table_args__ = (
+        Index('ix_Проект_клиент', 'клиент'),
+        # На договор проекта ссылается Услуга.проект: внешний ключ требует уникальности
+        # (SQL Server: без пустых договоров, иначе уникальный индекс допускает один NULL)
+        Index('ux_Проект_договор', 'договор', unique=True, mssql_where=text('договор IS NOT NULL')),
+    )
 
     contract: Mapped[Optional[int]] = mapped_column('договор', Integer, ForeignKey('Договор.id'))
     name: Mapped[str] = mapped_column('название', Unicode(32), primary_key=True)
@@ -75,6 +87,12 @@ class Project(Base):
 
 class TeamParticipation(Base):
     __tablename__ = 'Участие_в_команде'
+    __table_args__ = (
+        # Участие сотрудника с фильтром по активности (GET /employees/{id}/teams)
+        Index('ix_Участие_в_команде_сотрудник_активен', 'сотрудник', 'активен'),
+        # Состав команды (GET/PUT /teams/{id}/members)
+        Index('ix_Участие_в_команде_команда_активен', 'команда', 'активен'),
+    )
 
     last_update: Mapped[datetime] = mapped_column('последнее_обновление', DateTime)
     active: Mapped[bool] = mapped_column('активен', Boolean)
@@ -85,8 +103,11 @@ class TeamParticipation(Base):
     team_rel: Mapped['Team'] = relationship(back_populates="team_participations")
 
 
-class Service(Base):
+class Service(Versioned, Base):
     __tablename__ = 'Услуга'
+    __table_args__ = (
+        Index('ix_Услуга_проект', 'проект'),
+    )
 
     id: Mapped[int] = mapped_column('id', Integer, primary_key=True)
     processing_employee: Mapped[int] = mapped_column('обрабатывающий_сотрудник', Integer, ForeignKey('Сотрудники.id'))
@@ -102,7 +123,7 @@ class Service(Base):
     implementing_team_rel: Mapped['Team'] = relationship(back_populates="services")
 
 
-class Client(Base):
+class Client(Versioned, Base):
     __tablename__ = 'Клиент'
 
     id: Mapped[int] = mapped_column('id', Integer, primary_key=True)
@@ -114,8 +135,13 @@ class Client(Base):
     contracts: Mapped[list['Contract']] = relationship(back_populates="client_rel")
 
 
-class Payment(Base):
+class Payment(Versioned, Base):
     __tablename__ = 'Оплата'
+    __table_args__ = (
+        # Покрывающий индекс: суммы оплаченных/неоплаченных без обращения к таблице
+        # (сумма в ключе, а не в INCLUDE — SQLite INCLUDE не поддерживает)
+        Index('ix_Оплата_оплачено_сумма', 'оплачено', 'сумма'),
+    )
 
     id: Mapped[int] = mapped_column('id', Integer, primary_key=True)
     amount: Mapped[float] = mapped_column('сумма', Numeric(10, 2))
@@ -125,8 +151,11 @@ class Payment(Base):
     contract_rel: Mapped[Optional['Contract']] = relationship(back_populates="payment_rel", uselist=False)
 
 
-class Contract(Base):
+class Contract(Versioned, Base):
     __tablename__ = 'Договор'
+    __table_args__ = (
+        Index('ix_Договор_клиент', 'клиент'),
+    )
 
     id: Mapped[int] = mapped_column('id', Integer, primary_key=True)
     signing_date: Mapped[date] = mapped_column('дата_подписания', Date)
@@ -138,4 +167,32 @@ class Contract(Base):
     processing_employee_rel: Mapped['Employee'] = relationship(back_populates="processed_contracts")
     client_rel: Mapped['Client'] = relationship(back_populates="contracts")
     payment_rel: Mapped['Payment'] = relationship(back_populates="contract_rel")
-    project_rel: Mapped[Optional['Project']] = relationship(back_populates="contract_rel", uselist=False)
\ No newline at end of file
+    project_rel: Mapped[Optional['Project']] = relationship(back_populates="contract_rel", uselist=False)
+
+
+class SearchChange(Base):
+    """Журнал изменений записей поиска: по нему обновляются индексы других процессов (search_index.py)"""
+    __tablename__ = 'Изменения_поиска'
+    __table_args__ = (
+        # Очистка старых записей журнала
+        Index('ix_Изменения_поиска_создано', 'создано'),
+    )
+
+    id: Mapped[int] = mapped_column('id', Integer, primary_key=True)
+    table_name: Mapped[str] = mapped_column('таблица', Unicode(32))
+    # None — перестроить индекс таблицы целиком
+    key: Mapped[Optional[int]] = mapped_column('ключ', Integer)
+    created: Mapped[datetime] = mapped_column('создано', DateTime)
+
+
+class SummaryCounter(Base):
+    """Счетчик дашборда: значение показателя по ключу (клиенту, команде); см. summary.py"""
+    __tablename__ = 'Счетчики'
+    __table_args__ = (
+        # Первые N ключей показателя по значению (GET /dashboard/{показатель})
+        Index('ix_Счетчики_показатель_значение', 'показатель', 'значение'),
+    )
+
+    metric: Mapped[str] = mapped_column('показатель', Unicode(32), primary_key=True)
+    key: Mapped[int] = mapped_column('ключ', Integer, primary_key=True)
+    value: Mapped[float] = mapped_column('значение', Numeric(14, 2))
@@ -0,0 +1,125 @@
+"""
+Реплики БД для чтения
+
+Сессии только для чтения (GET-запросы API, выгрузки ETL) берут соединение с реплики,
+запись и чтение после записи идут на основную БД (database.RoutingSession).
+Реплика выбирается по кругу среди доступных. Недоступная реплика исключается:
+    - сразу при ошибке соединения с ней (событие handle_error движка);
+    - по фоновой проверке SELECT 1 (start), которая и возвращает ее обратно;
+    - по той же проверке, если отставание реплики больше max_lag (когда БД его сообщает).
+Без фоновой проверки исключенная реплика снова пробуется через retry_seconds.
+Если реплика не отвечает при подключении сессии, сессия берет следующую;
+если доступных реплик нет, чтение идет с основной БД.
+
+Настройка — переменные окружения (database.py):
+    DATABASE_REPLICA_URLS=url1,url2       реплики (локально — копии файла SQLite)
+    DATABASE_REPLICA_STICKY_SECONDS=5     чтение с основной БД после записи клиента
+    DATABASE_REPLICA_RETRY_SECONDS=30     на сколько исключается недоступная реплика
+    DATABASE_REPLICA_MAX_LAG=10           наибольшее отставание реплики, с (без него не проверяется)
+"""
+import itertools
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+
+def _name(engine: Engine) -> str:
+    return engine.url.render_as_string(hide_password=True)
+
+
+class ReplicaSet:
+    """Движки реплик с учетом доступности"""
+
+    def __init__(self, engines: List[Engine], retry_seconds: float = 30.0, check_interval: float = 5.0,
+                 max_lag: Optional[float] = None, lag: Callable[[Connection], Optional[float]] = None):
+        self.engines = list(engines)
+        self.retry_seconds = retry_seconds
+        self.check_interval = check_interval
+        # Наибольшее отставание, с; lag(соединение) — отставание реплики или None, если неизвестно
+        self.max_lag = max_lag
+        self.lag = lag
+        # Движок -> время (time.monotonic), до которого реплика исключена
+        self._down: Dict[Engine, float] = {}
+        self._cycle = itertools.cycle(self.engines)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        for engine in self.engines:
+            event.listen(engine, 'handle_error', self._on_error)
+
+    def __bool__(self):
+        return bool(self.engines)
+
+    def pick(self) -> Optional[Engine]:
+        """Следующая доступная реплика; None — читать с основной БД"""
+        now = time.monotonic()
+        with self._lock:
+            for _ in self.engines:
+                engine = next(self._cycle)
+                if self._down.get(engine, 0) <= now:
+                    return engine
+        return None
+
+    def mark_down(self, engine: Engine, reason):
+        with self._lock:
+            was_up = self._down.get(engine, 0) <= time.monotonic()
+            self._down[engine] = time.monotonic() + self.retry_seconds
+        if was_up:
+            logger.warning(f"Реплика {_name(engine)} исключена на {self.retry_seconds:g} с: {reason}")
+
+    def mark_up(self, engine: Engine):
+        with self._lock:
+            was_down = self._down.pop(engine, None) is not None
+        if was_down:
+            logger.info(f"Реплика {_name(engine)} снова доступна")
+
+    def _on_error(self, context):
+        # Разрыв или неудачное подключение — реплика недоступна; ошибки запросов ее не исключают
+        if context.is_disconnect or context.connection is None:
+            self.mark_down(context.engine, context.original_exception)
+
+    def check(self):
+        """Проверка всех реплик запросом SELECT 1 и, при max_lag, их отставания"""
+        for engine in self.engines:
+            try:
+                with engine.connect() as connection:
+                    connection.execute(text('SELECT 1'))
+                    lag = self.lag(connection) if self.max_lag is not None and self.lag else None
+            except Exception as e:
+                self.mark_down(engine, e)
+                continue
+            if lag is not None and lag > self.max_lag:
+                self.mark_down(engine, f"отставание {lag:g} с больше {self.max_lag:g} с")
+            else:
+                self.mark_up(engine)
+
+    def _run(self):
+        while True:
+            self.check()
+            if self._stop.wait(self.check_interval):
+                return
+
+    def start(self):
+        """Фоновая проверка доступности: сразу и затем раз в check_interval секунд"""
+        if not self.engines or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='replica-check', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> List[dict]:
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                'url': _name(engine),
+                'available': self._down.get(engine, 0) <= now,
+                'retry_in': round(max(self._down.get(engine, 0) - now, 0), 1),
+            } for engine in self.engines]
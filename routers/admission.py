@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+
+from admission import limiters
+from database import engine, replicas
+
+router = APIRouter(prefix="/admission", tags=["admission"])
+
+
+@router.get("/")
+def admission_stats():
+    """Загрузка классов маршрутов (занято, в очереди, отклонено, ожидание) и пулов соединений"""
+    return {
+        "classes": {name: limiter.stats() for name, limiter in limiters.items()},
+        "pools": [db_engine.pool.status() for db_engine in (engine, *replicas.engines)],
+    }
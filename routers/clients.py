@@ -1,15 +1,18 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Header, Response
 from typing import Optional
-from database import create_entity, get_entities, update_entity, delete_entity
+from database import create_entity_s, get_entities_s, update_entity_s, delete_entity_s, parse_etag, set_etag, \
+    request_session
 from models import Client
+from schemas import ClientUpdate, changes
+from streaming import stream_entities, streaming_media_type
 
 router = APIRouter(prefix="/clients", tags=["clients"])
 
 
 @router.post("/")
-def create_client(contact_person: str, phone: str, email: str):
+def create_client(contact_person: str, phone: str, email: str, session=request_session):
     """Создание клиента"""
-    return create_entity(Client(
+    return create_entity_s(session, Client(
         contact_person=contact_person,
         phone=phone,
         email=email
@@ -17,27 +20,32 @@ def create_client(contact_person: str, phone: str, email: str):
 
 
 @router.get("/")
-def get_clients(client_id: Optional[int] = None):
-    """Получение клиентов (всех или по ID)"""
-    result = get_entities(Client, client_id)
+def get_clients(client_id: Optional[int] = None, accept: Optional[str] = Header(None), session=request_session):
+    """Получение клиентов (всех или по ID; Accept: application/x-ndjson или text/csv — потоком)"""
+    media_type = streaming_media_type(accept)
+    if client_id is None and media_type:
+        return stream_entities(Client, media_type, read_only=session.info['read_only'])
+    result = get_entities_s(session, Client, client_id)
     if client_id and not result:
         raise HTTPException(status_code=404, detail="Client not found")
     return result
 
 
 @router.put("/{client_id}")
-def update_client(client_id: int, update_data: dict):
-    """Обновление клиента"""
-    result = update_entity(Client, client_id, update_data)
+@router.patch("/{client_id}")
+def update_client(client_id: int, update_data: ClientUpdate, response: Response,
+                  if_match: Optional[str] = Header(None), session=request_session):
+    """Обновление клиента (If-Match: "версия" — защита от потерянных обновлений)"""
+    result = update_entity_s(session, Client, client_id, changes(update_data), parse_etag(if_match))
     if not result:
         raise HTTPException(status_code=404, detail="Client not found")
-    return result
+    return set_etag(response, result)
 
 
 @router.delete("/{client_id}")
-def delete_client(client_id: int):
+def delete_client(client_id: int, session=request_session):
     """Удаление клиента"""
-    result = delete_entity(Client, client_id)
+    result = delete_entity_s(session, Client, client_id)
     if not result:
         raise HTTPException(status_code=404, detail="Client not found")
     return {"message": "Client deleted successfully"}
@@ -1,11 +1,13 @@
 from datetime import datetime
 from typing import Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Header, Response
 
-from database import get_entities, update_entity, delete_entity, session_scope, \
-    create_entity_s
+from database import get_entities_s, update_entity_s, delete_entity_s, create_entity_s, parse_etag, set_etag, \
+    request_session
 from models import Contract, Payment
+from schemas import ContractUpdate, changes
+from streaming import stream_entities, streaming_media_type
 
 router = APIRouter(prefix="/contracts", tags=["contracts"])
 
@@ -13,47 +15,52 @@ router = APIRouter(prefix="/contracts", tags=["contracts"])
 @router.post("/")
 def create_contract(processing_employee: int,
                     client: int, amount: int,
-                    implementation_deadline: Optional[datetime] = None, signing_date: Optional[datetime] = None):
+                    implementation_deadline: Optional[datetime] = None, signing_date: Optional[datetime] = None,
+                    session=request_session):
     """Создание договора"""
 
     if signing_date is None:
         signing_date = datetime.now().date()
-    with session_scope() as session:
-        payment = create_entity_s(session, Payment(
-            amount=amount,
-            paid=False
-        ))
-        return create_entity_s(session, Contract(
-            signing_date=signing_date,
-            implementation_deadline=implementation_deadline,
-            processing_employee=processing_employee,
-            client=client,
-            payment=payment.id
-        ))
+    payment = create_entity_s(session, Payment(
+        amount=amount,
+        paid=False
+    ))
+    return create_entity_s(session, Contract(
+        signing_date=signing_date,
+        implementation_deadline=implementation_deadline,
+        processing_employee=processing_employee,
+        client=client,
+        payment=payment.id
+    ))
 
 
 @router.get("/")
-def get_contracts(contract_id: Optional[int] = None):
-    """Получение договоров (всех или по ID)"""
-    result = get_entities(Contract, contract_id)
+def get_contracts(contract_id: Optional[int] = None, accept: Optional[str] = Header(None), session=request_session):
+    """Получение договоров (всех или по ID; Accept: application/x-ndjson или text/csv — потоком)"""
+    media_type = streaming_media_type(accept)
+    if contract_id is None and media_type:
+        return stream_entities(Contract, media_type, read_only=session.info['read_only'])
+    result = get_entities_s(session, Contract, contract_id)
     if contract_id and not result:
         raise HTTPException(status_code=404, detail="Contract not found")
     return result
 
 
 @router.put("/{contract_id}")
-def update_contract(contract_id: int, update_data: dict):
-    """Обновление договора"""
-    result = update_entity(Contract, contract_id, update_data)
+@router.patch("/{contract_id}")
+def update_contract(contract_id: int, update_data: ContractUpdate, response: Response,
+                    if_match: Optional[str] = Header(None), session=request_session):
+    """Обновление договора (If-Match: "версия" — защита от потерянных обновлений)"""
+    result = update_entity_s(session, Contract, contract_id, changes(update_data), parse_etag(if_match))
     if not result:
         raise HTTPException(status_code=404, detail="Contract not found")
-    return result
+    return set_etag(response, result)
 
 
 @router.delete("/{contract_id}")
-def delete_contract(contract_id: int):
+def delete_contract(contract_id: int, session=request_session):
     """Удаление договора"""
-    result = delete_entity(Contract, contract_id)
+    result = delete_entity_s(session, Contract, contract_id)
     if not result:
         raise HTTPException(status_code=404, detail="Contract not found")
     return {"message": "Contract deleted successfully"}
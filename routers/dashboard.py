@@ -0,0 +1,47 @@
+from typing import Literal
+
+from fastapi import APIRouter, Query
+from sqlalchemy import select
+
+from database import request_session
+from models import SummaryCounter
+from summary import counter_value
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+
+CLIENT_METRICS = ('unpaid_amount',)
+TEAM_METRICS = ('open_services', 'active_members')
+
+
+def _counters(session, key: int, metrics) -> dict:
+    """Значения показателей по ключу — поиск по первичному ключу счетчиков"""
+    values = dict(session.execute(
+        select(SummaryCounter.metric, SummaryCounter.value)
+        .where(SummaryCounter.metric.in_(metrics), SummaryCounter.key == key)
+    ).all())
+    return {metric: counter_value(metric, values.get(metric)) for metric in metrics}
+
+
+@router.get("/clients/{client_id}")
+def client_counters(client_id: int, session=request_session):
+    """Счетчики клиента: неоплаченная сумма"""
+    return {"client": client_id, **_counters(session, client_id, CLIENT_METRICS)}
+
+
+@router.get("/teams/{team_id}")
+def team_counters(team_id: int, session=request_session):
+    """Счетчики команды: невыполненные услуги и активные участники"""
+    return {"team": team_id, **_counters(session, team_id, TEAM_METRICS)}
+
+
+@router.get("/{metric}")
+def top_counters(metric: Literal['unpaid_amount', 'open_services', 'active_members'],
+                 limit: int = Query(10, ge=1, le=100), session=request_session):
+    """Ключи с наибольшими значениями показателя (по индексу показатель, значение)"""
+    rows = session.execute(
+        select(SummaryCounter.key, SummaryCounter.value)
+        .where(SummaryCounter.metric == metric, SummaryCounter.value > 0)
+        .order_by(SummaryCounter.value.desc())
+        .limit(limit)
+    ).all()
+    return [{"key": key, "value": counter_value(metric, value)} for key, value in rows]
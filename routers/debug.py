@@ -0,0 +1,34 @@
+import re
+
+from fastapi import APIRouter, HTTPException
+
+from database import backend, engine, replicas
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+# Только одиночный SELECT (в том числе с CTE)
+SELECT_PATTERN = re.compile(r'^\s*(select|with)\b', re.IGNORECASE)
+
+
+@router.get("/explain")
+def explain_query(sql: str):
+    """План выполнения SELECT-запроса (сам запрос не выполняется)"""
+    sql = sql.strip().rstrip(';')
+    if not SELECT_PATTERN.match(sql) or ';' in sql:
+        raise HTTPException(status_code=400, detail="Разрешен только один запрос SELECT")
+
+    with engine.connect() as connection:
+        try:
+            plan = backend.explain(connection, sql)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Ошибка разбора запроса: {e}")
+        finally:
+            connection.rollback()
+
+    return {"backend": backend.name, "sql": sql, "plan": plan}
+
+
+@router.get("/replicas")
+def replica_status():
+    """Реплики для чтения и их доступность"""
+    return {"replicas": replicas.stats()}
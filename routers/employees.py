@@ -1,22 +1,25 @@
 from datetime import datetime
 from typing import Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Header, Response
 from sqlalchemy import select
 
-from database import create_entity, get_entities, update_entity, delete_entity, session_scope, \
-    create_entity_s
+from database import create_entity_s, get_entities_s, update_entity_s, delete_entity_s, upsert_s, parse_etag, \
+    set_etag, delete_where_s, request_session
 from models import Employee, TeamParticipation
+from schemas import EmployeeUpdate, changes
+from streaming import stream_entities, streaming_media_type
 
 router = APIRouter(prefix="/employees", tags=["employees"])
 
 
 @router.post("/")
-def create_employee(full_name: str, email: str, phone: str, position: str, hire_date: Optional[datetime] = None):
+def create_employee(full_name: str, email: str, phone: str, position: str, hire_date: Optional[datetime] = None,
+                    session=request_session):
     """Создание сотрудника"""
     if hire_date is None:
         hire_date = datetime.now().date()
-    return create_entity(Employee(
+    return create_entity_s(session, Employee(
         full_name=full_name,
         email=email,
         phone=phone,
@@ -27,68 +30,70 @@ def create_employee(full_name: str, email: str, phone: str, position: str, hire_
 
 
 @router.get("/")
-def get_employees(employee_id: Optional[int] = None):
-    """Получение сотрудников (всех или по ID)"""
-    result = get_entities(Employee, employee_id)
+def get_employees(employee_id: Optional[int] = None, accept: Optional[str] = Header(None), session=request_session):
+    """Получение сотрудников (всех или по ID; Accept: application/x-ndjson или text/csv — потоком)"""
+    media_type = streaming_media_type(accept)
+    if employee_id is None and media_type:
+        return stream_entities(Employee, media_type, read_only=session.info['read_only'])
+    result = get_entities_s(session, Employee, employee_id)
     if employee_id and not result:
         raise HTTPException(status_code=404, detail="Employee not found")
     return result
 
 
 @router.put("/{employee_id}")
-def update_employee(employee_id: int, update_data: dict):
-    """Обновление сотрудника"""
-    result = update_entity(Employee, employee_id, update_data)
+@router.patch("/{employee_id}")
+def update_employee(employee_id: int, update_data: EmployeeUpdate, response: Response,
+                    if_match: Optional[str] = Header(None), session=request_session):
+    """Обновление сотрудника (If-Match: "версия" — защита от потерянных обновлений)"""
+    result = update_entity_s(session, Employee, employee_id, changes(update_data), parse_etag(if_match))
     if not result:
         raise HTTPException(status_code=404, detail="Employee not found")
-    return result
+    return set_etag(response, result)
 
 
 @router.delete("/{employee_id}")
-def delete_employee(employee_id: int):
+def delete_employee(employee_id: int, session=request_session):
     """Удаление сотрудника"""
-    result = delete_entity(Employee, employee_id)
+    result = delete_entity_s(session, Employee, employee_id)
     if not result:
         raise HTTPException(status_code=404, detail="Employee not found")
     return {"message": "Employee deleted successfully"}
 
 
+@router.delete("/dismissed/teams")
+def purge_dismissed_participations(active: Optional[bool] = None, session=request_session):
+    """Удаление записей участия в командах уволенных сотрудников (обслуживание)"""
+    dismissed = select(Employee.id).where(Employee.dismissed.is_(True))
+    criteria = [TeamParticipation.employee.in_(dismissed)]
+    if active is not None:
+        criteria.append(TeamParticipation.active == active)
+    return {"deleted": delete_where_s(session, TeamParticipation, *criteria)}
+
+
 @router.post("/{employee_id}/teams/{team_id}")
-def set_employee_team_participation(employee_id: int, team_id: int, active: bool):
-    """Установка состояния участия сотрудника в команде"""
-    with session_scope() as session:
-        # Ищем существующую запись
-        stmt = select(TeamParticipation).where(
-            TeamParticipation.employee == employee_id,
-            TeamParticipation.team == team_id
-        )
-        existing_participation = session.scalar(stmt)
-
-        if existing_participation:
-            if existing_participation.active == active:
-                return existing_participation
-            else:
-                existing_participation.active = active
-                existing_participation.last_update = datetime.now()
-                session.commit()
-                return existing_participation
-        else:
-            return create_entity_s(session, TeamParticipation(
-                last_update=datetime.now(),
-                active=active,
-                employee=employee_id,
-                team=team_id
-            ))
+def set_employee_team_participation(employee_id: int, team_id: int, active: bool, session=request_session):
+    """Установка состояния участия сотрудника в команде (одной командой MERGE / ON CONFLICT)"""
+    # Запись обновляется, только если состояние участия изменилось
+    changed = upsert_s(session, TeamParticipation, [{
+        'last_update': datetime.now(),
+        'active': active,
+        'employee': employee_id,
+        'team': team_id,
+    }], update=['active', 'last_update'], changed=['active'])
+
+    if changed:
+        return changed[0]
+    return get_entities_s(session, TeamParticipation, (employee_id, team_id))
 
 
 @router.get("/{employee_id}/teams")
-def get_employee_team_participation(employee_id: int, active: Optional[bool] = None):
+def get_employee_team_participation(employee_id: int, active: Optional[bool] = None, session=request_session):
     """Получение состояния участия сотрудника в командах"""
-    with session_scope() as session:
-        stmt = select(TeamParticipation).where(TeamParticipation.employee == employee_id)
+    stmt = select(TeamParticipation).where(TeamParticipation.employee == employee_id)
 
-        if active is not None:
-            stmt = stmt.where(TeamParticipation.active == active)
+    if active is not None:
+        stmt = stmt.where(TeamParticipation.active == active)
 
-        participations = list(session.scalars(stmt).all())
-        return participations
+    participations = list(session.scalars(stmt).all())
+    return participations
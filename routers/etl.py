@@ -0,0 +1,161 @@
+import asyncio
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Optional
+
+import anyio
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, StreamingResponse
+
+from admission import admit
+from etl.extractor import SUPPORTED_FORMATS, file_format
+from etl.jobs import job_queue, QueueFull, FINISHED
+from etl.transformer import TABLE_MAPPING
+
+router = APIRouter(prefix="/etl", tags=["etl"])
+
+# Файлы на сервере, доступные для импорта по пути, и каталоги задач
+ETL_DATA_DIR = Path(os.getenv('ETL_DATA_DIR', 'data')).resolve()
+ETL_UPLOAD_DIR = Path(os.getenv('ETL_UPLOAD_DIR', '.etl_uploads')).resolve()
+ETL_EXPORT_DIR = Path(os.getenv('ETL_EXPORT_DIR', '.etl_exports')).resolve()
+
+# Файлы задач удаляются вместе с задачами, оставшиеся без задачи — через ETL_JOB_TTL
+job_queue.directories += [ETL_UPLOAD_DIR, ETL_EXPORT_DIR]
+
+EXPORT_FORMATS = ('csv', 'csv.gz', 'csv.zst', 'xlsx', 'ods')
+# Интервал опроса состояния задачи для SSE, с
+SSE_INTERVAL = 0.5
+
+
+def _submit(kind: str, params: dict, files=()) -> dict:
+    try:
+        job = job_queue.submit(kind, params, files)
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={'Retry-After': '30'})
+    return job.to_dict()
+
+
+def _get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+def _server_file(path: str) -> Path:
+    """Файл внутри ETL_DATA_DIR (пути за его пределами запрещены)"""
+    file_path = (ETL_DATA_DIR / path).resolve()
+    if not file_path.is_relative_to(ETL_DATA_DIR):
+        raise HTTPException(status_code=400, detail=f"Путь вне каталога данных: {path}")
+    if not file_path.is_file():
+        raise HTTPException(status_code=404, detail=f"Файл не найден: {path}")
+    return file_path
+
+
+async def _save_upload(request: Request, filename: str) -> Path:
+    """Сохраняет тело запроса в файл по частям, не держа его в памяти"""
+    suffix = file_format(filename)
+    if suffix not in SUPPORTED_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Неподдерживаемый формат файла: {suffix}")
+
+    ETL_UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    file_path = ETL_UPLOAD_DIR / f"{uuid.uuid4().hex}_{Path(filename).name}"
+    size = 0
+    with open(file_path, 'wb') as f:
+        async for chunk in request.stream():
+            size += len(chunk)
+            await anyio.to_thread.run_sync(f.write, chunk)
+
+    if not size:
+        file_path.unlink()
+        raise HTTPException(status_code=400, detail="Пустой файл")
+    return file_path
+
+
+@router.post("/imports", status_code=202, dependencies=[admit('etl')])
+async def create_import(request: Request, path: Optional[str] = None, filename: Optional[str] = None,
+                        table: Optional[str] = None, batch_size: int = 1000):
+    """
+    Фоновый импорт: файл на сервере (path относительно ETL_DATA_DIR)
+    или загрузка в теле запроса (filename — имя файла с расширением)
+    """
+    files = []
+    if path is not None:
+        file_path = _server_file(path)
+    elif filename is not None:
+        file_path = await _save_upload(request, filename)
+        # Загруженный файл принадлежит задаче, файл из ETL_DATA_DIR — нет
+        files.append(str(file_path))
+    else:
+        raise HTTPException(status_code=400, detail="Укажите path или filename с файлом в теле запроса")
+
+    # submit удаляет старые задачи и может запустить пул процессов — не в цикле событий
+    try:
+        return await anyio.to_thread.run_sync(_submit, 'import', {
+            'path': str(file_path),
+            'table': table.lower() if table else None,
+            'batch_size': batch_size,
+        }, files)
+    except HTTPException:
+        for upload in files:
+            Path(upload).unlink(missing_ok=True)
+        raise
+
+
+@router.post("/exports", status_code=202, dependencies=[admit('etl')])
+def create_export(table: str, format: str = 'csv'):
+    """Фоновый экспорт таблицы в файл (скачивание — /etl/jobs/{id}/file)"""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Формат: {', '.join(EXPORT_FORMATS)}")
+    # Имя таблицы попадает в имя файла: только известные таблицы
+    table = table.lower()
+    if table not in TABLE_MAPPING:
+        raise HTTPException(status_code=400, detail=f"Неизвестная таблица: {table}. "
+                                                    f"Доступные: {', '.join(TABLE_MAPPING)}")
+
+    ETL_EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    file_path = ETL_EXPORT_DIR / f"{uuid.uuid4().hex}_{table}.{format}"
+    return _submit('export', {'table': table, 'path': str(file_path)}, [str(file_path)])
+
+
+@router.get("/jobs")
+def get_jobs():
+    """Список задач ETL (новые первыми)"""
+    return [job.to_dict() for job in job_queue.list()]
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Состояние и результат задачи (для опроса)"""
+    return _get_job(job_id).to_dict()
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Прогресс задачи как Server-Sent Events до ее завершения"""
+    job = _get_job(job_id)
+
+    async def events():
+        revision = -1
+        while True:
+            if job.revision != revision:
+                revision = job.revision
+                yield f"event: {job.status}\ndata: {json.dumps(job.to_dict(), ensure_ascii=False)}\n\n"
+            if job.status in FINISHED:
+                return
+            await asyncio.sleep(SSE_INTERVAL)
+
+    return StreamingResponse(events(), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache'})
+
+
+@router.get("/jobs/{job_id}/file", dependencies=[admit('etl')])
+def get_job_file(job_id: str):
+    """Файл, созданный задачей экспорта"""
+    job = _get_job(job_id)
+    if job.kind != 'export' or job.status != 'done' or not job.result['exported']:
+        raise HTTPException(status_code=409, detail="Файл экспорта не готов")
+    file_path = Path(job.result['file'])
+    return FileResponse(file_path, filename=file_path.name.split('_', 1)[1])
@@ -1,24 +1,29 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Header, Response
 from typing import Optional
-from database import get_entities, update_entity
+from database import get_entities_s, update_entity_s, parse_etag, set_etag, request_session
 from models import Payment
+from streaming import stream_entities, streaming_media_type
 
 router = APIRouter(prefix="/payments", tags=["payments"])
 
 
 @router.get("/")
-def get_payments(payment_id: Optional[int] = None):
-    """Получение оплат (всех или по ID)"""
-    result = get_entities(Payment, payment_id)
+def get_payments(payment_id: Optional[int] = None, accept: Optional[str] = Header(None), session=request_session):
+    """Получение оплат (всех или по ID; Accept: application/x-ndjson или text/csv — потоком)"""
+    media_type = streaming_media_type(accept)
+    if payment_id is None and media_type:
+        return stream_entities(Payment, media_type, read_only=session.info['read_only'])
+    result = get_entities_s(session, Payment, payment_id)
     if payment_id and not result:
         raise HTTPException(status_code=404, detail="Payment not found")
     return result
 
 
 @router.put("/{payment_id}/status")
-def update_payment_status(payment_id: int, paid: bool):
-    """Обновление статуса оплаты"""
-    result = update_entity(Payment, payment_id, {'paid': paid})
+def update_payment_status(payment_id: int, paid: bool, response: Response,
+                          if_match: Optional[str] = Header(None), session=request_session):
+    """Обновление статуса оплаты (If-Match: "версия" — защита от потерянных обновлений)"""
+    result = update_entity_s(session, Payment, payment_id, {'paid': paid}, parse_etag(if_match))
     if not result:
         raise HTTPException(status_code=404, detail="Payment not found")
-    return result
+    return set_etag(response, result)
@@ -1,39 +1,45 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Header, Response
 from typing import Optional
-from database import create_entity, get_entities, update_entity, delete_entity
+from database import create_entity_s, get_entities_s, update_entity_s, delete_entity_s, parse_etag, set_etag, \
+    request_session
 from models import Position
+from streaming import stream_entities, streaming_media_type
 
 router = APIRouter(prefix="/positions", tags=["positions"])
 
 
 @router.post("/")
-def create_position(position: str, responsibilities: str):
+def create_position(position: str, responsibilities: str, session=request_session):
     """Создание должности"""
-    return create_entity(Position(position=position, responsibilities=responsibilities))
+    return create_entity_s(session, Position(position=position, responsibilities=responsibilities))
 
 
 @router.get("/")
-def get_positions(position: Optional[str] = None):
-    """Получение должностей (всех или по названию)"""
-    result = get_entities(Position, position)
+def get_positions(position: Optional[str] = None, accept: Optional[str] = Header(None), session=request_session):
+    """Получение должностей (всех или по названию; Accept: application/x-ndjson или text/csv — потоком)"""
+    media_type = streaming_media_type(accept)
+    if position is None and media_type:
+        return stream_entities(Position, media_type, read_only=session.info['read_only'])
+    result = get_entities_s(session, Position, position)
     if position and not result:
         raise HTTPException(status_code=404, detail="Position not found")
     return result
 
 
 @router.put("/{position}")
-def update_position(position: str, responsibilities: str):
-    """Обновление должности"""
-    result = update_entity(Position, position, {'responsibilities': responsibilities})
+def update_position(position: str, responsibilities: str, response: Response,
+                    if_match: Optional[str] = Header(None), session=request_session):
+    """Обновление должности (If-Match: "версия" — защита от потерянных обновлений)"""
+    result = update_entity_s(session, Position, position, {'responsibilities': responsibilities}, parse_etag(if_match))
     if not result:
         raise HTTPException(status_code=404, detail="Position not found")
-    return result
+    return set_etag(response, result)
 
 
 @router.delete("/{position}")
-def delete_position(position: str):
+def delete_position(position: str, session=request_session):
     """Удаление должности"""
-    result = delete_entity(Position, position)
+    result = delete_entity_s(session, Position, position)
     if not result:
         raise HTTPException(status_code=404, detail="Position not found")
     return {"message": "Position deleted successfully"}
@@ -1,61 +1,120 @@
 from typing import Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Header, Response
+from sqlalchemy import insert, select
 
-from database import get_entities, update_entity, delete_entity, session_scope, get_entities_s, \
-    create_entity_s
+from database import get_entities_s, update_entity_s, delete_entity_s, create_entity_s, mark_changed, \
+    parse_etag, set_etag, request_session
 from models import Project, Payment, Contract
+from schemas import ProjectUpdate, ProjectPromotionBatch, changes
+from streaming import stream_entities, streaming_media_type
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 
 
 @router.post("/")
 def contract_to_project(contract_id: int, name: str, description: str,
-                        project_team: int, topic: str):
+                        project_team: int, topic: str, session=request_session):
     """Повышение договора до проекта (только при оплаченной оплате)"""
-    with session_scope() as session:
-        # Получаем договор и проверяем оплату
-        contract = get_entities_s(session, Contract, contract_id)
-        if not contract:
-            raise HTTPException(status_code=404, detail="Contract not found")
-
-        payment = get_entities_s(session, Payment, contract.payment)
-        if not payment or not payment.paid:
-            raise HTTPException(status_code=400, detail="Payment not completed")
-
-        # Создаем проект
-        return create_entity_s(session, Project(
-            contract=contract_id,
-            name=name,
-            description=description,
-            project_team=project_team,
-            topic=topic,
-            client=contract.client
-        ))
+    # Получаем договор и проверяем оплату
+    contract = get_entities_s(session, Contract, contract_id)
+    if not contract:
+        raise HTTPException(status_code=404, detail="Contract not found")
+
+    payment = get_entities_s(session, Payment, contract.payment)
+    if not payment or not payment.paid:
+        raise HTTPException(status_code=400, detail="Payment not completed")
+
+    # Создаем проект
+    return create_entity_s(session, Project(
+        contract=contract_id,
+        name=name,
+        description=description,
+        project_team=project_team,
+        topic=topic,
+        client=contract.client
+    ))
+
+
+@router.post("/batch")
+def contracts_to_projects(batch: ProjectPromotionBatch, session=request_session):
+    """
+    Пакетное повышение договоров до проектов
+    Договоры с оплатой и существующими проектами выбираются одним запросом,
+    проекты вставляются одной командой. Статус по каждому договору:
+    promoted, not_found, unpaid, already_project, name_taken, duplicate
+    (duplicate — договор или название уже повышены выше в этом пакете)
+    Возвращает: число повышенных и пропущенных и статусы договоров
+    """
+    contract_ids = {item.contract_id for item in batch.projects}
+    names = {item.name for item in batch.projects}
+
+    contracts = {
+        row.id: row for row in session.execute(
+            select(Contract.id, Contract.client, Payment.paid, Project.name.label('project'))
+            .outerjoin(Payment, Payment.id == Contract.payment)
+            .outerjoin(Project, Project.contract == Contract.id)
+            .where(Contract.id.in_(contract_ids))
+        )
+    }
+    taken = set(session.scalars(select(Project.name).where(Project.name.in_(names))))
+
+    results, rows, seen_contracts, seen_names = [], [], set(), set()
+    for item in batch.projects:
+        contract = contracts.get(item.contract_id)
+        if item.contract_id in seen_contracts or item.name in seen_names:
+            status = 'duplicate'
+        elif contract is None:
+            status = 'not_found'
+        elif contract.project is not None:
+            status = 'already_project'
+        elif not contract.paid:
+            status = 'unpaid'
+        elif item.name in taken:
+            status = 'name_taken'
+        else:
+            status = 'promoted'
+            rows.append({**item.model_dump(exclude={'contract_id'}),
+                         'contract': item.contract_id, 'client': contract.client})
+            # Повтором считается только договор или название, принятые к вставке
+            seen_contracts.add(item.contract_id)
+            seen_names.add(item.name)
+        results.append({'contract_id': item.contract_id, 'name': item.name, 'status': status})
+
+    if rows:
+        session.execute(insert(Project), rows)
+        mark_changed(session, Project, [row['name'] for row in rows])
+
+    return {'promoted': len(rows), 'skipped': len(results) - len(rows), 'results': results}
 
 
 @router.get("/")
-def get_projects(project_name: Optional[str] = None):
-    """Получение проектов (всех или по названию)"""
-    result = get_entities(Project, project_name)
+def get_projects(project_name: Optional[str] = None, accept: Optional[str] = Header(None), session=request_session):
+    """Получение проектов (всех или по названию; Accept: application/x-ndjson или text/csv — потоком)"""
+    media_type = streaming_media_type(accept)
+    if project_name is None and media_type:
+        return stream_entities(Project, media_type, read_only=session.info['read_only'])
+    result = get_entities_s(session, Project, project_name)
     if project_name and not result:
         raise HTTPException(status_code=404, detail="Project not found")
     return result
 
 
 @router.put("/{project_name}")
-def update_project(project_name: str, update_data: dict):
-    """Обновление проекта"""
-    result = update_entity(Project, project_name, update_data)
+@router.patch("/{project_name}")
+def update_project(project_name: str, update_data: ProjectUpdate, response: Response,
+                   if_match: Optional[str] = Header(None), session=request_session):
+    """Обновление проекта (If-Match: "версия" — защита от потерянных обновлений)"""
+    result = update_entity_s(session, Project, project_name, changes(update_data), parse_etag(if_match))
     if not result:
         raise HTTPException(status_code=404, detail="Project not found")
-    return result
+    return set_etag(response, result)
 
 
 @router.delete("/{project_name}")
-def delete_project(project_name: str):
+def delete_project(project_name: str, session=request_session):
     """Удаление проекта"""
-    result = delete_entity(Project, project_name)
+    result = delete_entity_s(session, Project, project_name)
     if not result:
         raise HTTPException(status_code=404, detail="Project not found")
     return {"message": "Project deleted successfully"}
@@ -0,0 +1,60 @@
+from typing import Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from sqlalchemy import select
+
+from database import request_session
+from search_index import indexes, query_words, MATCHES
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+@router.get("/")
+def search(q: str = Query(min_length=1, max_length=128),
+           entity: Optional[Literal['employees', 'clients']] = None,
+           limit: int = Query(20, ge=1, le=100), fuzzy: bool = True, session=request_session):
+    """
+    Поиск сотрудников и клиентов по словам имени, email и телефону
+    Каждое слово запроса — префикс токена; при fuzzy=true допускаются опечатки в имени
+    Возвращает: записи с разделом и уровнем совпадения (exact, prefix, fuzzy)
+    """
+    words = query_words(q)
+    if not words:
+        raise HTTPException(status_code=400, detail="Пустой запрос")
+
+    found = []
+    for name in ([entity] if entity else list(indexes)):
+        index = indexes[name]
+        if not index.ready:
+            raise HTTPException(status_code=503, detail="Индекс поиска строится",
+                                headers={'Retry-After': '5'})
+        found += [(MATCHES.index(match), name, key, match) for key, match in index.search(words, limit, fuzzy)]
+    found = sorted(found)[:limit]
+
+    # Записи читаются из БД одним запросом на раздел
+    entities = {}
+    for name in {item[1] for item in found}:
+        model_class = indexes[name].model_class
+        keys = [key for _, section, key, _ in found if section == name]
+        for entity_row in session.scalars(select(model_class).where(model_class.id.in_(keys))):
+            entities[name, entity_row.id] = entity_row
+
+    # Запись могла быть удалена между поиском и чтением
+    return [
+        {'type': name, 'match': match, 'entity': entities[name, key]}
+        for _, name, key, match in found if (name, key) in entities
+    ]
+
+
+@router.get("/stats")
+def search_stats():
+    """Состояние индексов поиска"""
+    return {name: index.stats() for name, index in indexes.items()}
+
+
+@router.post("/rebuild", status_code=202)
+def rebuild_search():
+    """Перестроение индексов поиска (после импорта через etl_cli в другом процессе)"""
+    for index in indexes.values():
+        index.rebuild()
+    return {name: index.stats() for name, index in indexes.items()}
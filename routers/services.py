@@ -1,8 +1,11 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Header, Response
 from datetime import datetime
 from typing import Optional
-from database import create_entity, get_entities, update_entity, delete_entity, session_scope, create_entity_s
+from database import create_entity_s, get_entities_s, update_entity_s, delete_entity_s, parse_etag, set_etag, \
+    request_session
 from models import Service, Payment
+from schemas import ServiceUpdate, changes
+from streaming import stream_entities, streaming_media_type
 
 router = APIRouter(prefix="/services", tags=["services"])
 
@@ -10,48 +13,52 @@ router = APIRouter(prefix="/services", tags=["services"])
 @router.post("/")
 def create_service(processing_employee: int, amount: int, project: int,
                    implementing_team: int, completed: bool = False,
-                   application_date: Optional[datetime] = None):
+                   application_date: Optional[datetime] = None, session=request_session):
     """Создание услуги с автопометкой даты обращения (если не передана)"""
     if application_date is None:
         application_date = datetime.now().date()
 
-    with session_scope() as session:
-        payment = create_entity_s(session, Payment(
-            amount=amount,
-            paid=False
-        ))
-        return create_entity(Service(
-            processing_employee=processing_employee,
-            application_date=application_date,
-            payment=payment.id,
-            project=project,
-            implementing_team=implementing_team,
-            completed=completed
-        ))
+    payment = create_entity_s(session, Payment(
+        amount=amount,
+        paid=False
+    ))
+    return create_entity_s(session, Service(
+        processing_employee=processing_employee,
+        application_date=application_date,
+        payment=payment.id,
+        project=project,
+        implementing_team=implementing_team,
+        completed=completed
+    ))
 
 
 @router.get("/")
-def get_services(service_id: Optional[int] = None):
-    """Получение услуг (всех или по ID)"""
-    result = get_entities(Service, service_id)
+def get_services(service_id: Optional[int] = None, accept: Optional[str] = Header(None), session=request_session):
+    """Получение услуг (всех или по ID; Accept: application/x-ndjson или text/csv — потоком)"""
+    media_type = streaming_media_type(accept)
+    if service_id is None and media_type:
+        return stream_entities(Service, media_type, read_only=session.info['read_only'])
+    result = get_entities_s(session, Service, service_id)
     if service_id and not result:
         raise HTTPException(status_code=404, detail="Service not found")
     return result
 
 
 @router.put("/{service_id}")
-def update_service(service_id: int, update_data: dict):
-    """Обновление услуги"""
-    result = update_entity(Service, service_id, update_data)
+@router.patch("/{service_id}")
+def update_service(service_id: int, update_data: ServiceUpdate, response: Response,
+                   if_match: Optional[str] = Header(None), session=request_session):
+    """Обновление услуги (If-Match: "версия" — защита от потерянных обновлений)"""
+    result = update_entity_s(session, Service, service_id, changes(update_data), parse_etag(if_match))
     if not result:
         raise HTTPException(status_code=404, detail="Service not found")
-    return result
+    return set_etag(response, result)
 
 
 @router.delete("/{service_id}")
-def delete_service(service_id: int):
+def delete_service(service_id: int, session=request_session):
     """Удаление услуги"""
-    result = delete_entity(Service, service_id)
+    result = delete_entity_s(session, Service, service_id)
     if not result:
         raise HTTPException(status_code=404, detail="Service not found")
     return {"message": "Service deleted successfully"}
@@ -1,39 +1,111 @@
-from fastapi import APIRouter, HTTPException
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Header, Response
+from sqlalchemy import select, update
 from typing import Optional
-from database import create_entity, get_entities, update_entity, delete_entity
-from models import Team
+from database import create_entity_s, get_entities_s, update_entity_s, delete_entity_s, parse_etag, set_etag, \
+    upsert_s, mark_changed, backend, request_session
+from models import Team, TeamParticipation, Employee
+from schemas import TeamRoster
+from streaming import stream_entities, streaming_media_type
 
 router = APIRouter(prefix="/teams", tags=["teams"])
 
 
 @router.post("/")
-def create_team(team_leader: int):
+def create_team(team_leader: int, session=request_session):
     """Создание команды"""
-    return create_entity(Team(team_leader=team_leader))
+    return create_entity_s(session, Team(team_leader=team_leader))
 
 
 @router.get("/")
-def get_teams(team_id: Optional[int] = None):
-    """Получение команд (всех или по ID)"""
-    result = get_entities(Team, team_id)
+def get_teams(team_id: Optional[int] = None, accept: Optional[str] = Header(None), session=request_session):
+    """Получение команд (всех или по ID; Accept: application/x-ndjson или text/csv — потоком)"""
+    media_type = streaming_media_type(accept)
+    if team_id is None and media_type:
+        return stream_entities(Team, media_type, read_only=session.info['read_only'])
+    result = get_entities_s(session, Team, team_id)
     if team_id and not result:
         raise HTTPException(status_code=404, detail="Team not found")
     return result
 
 
 @router.put("/{team_id}")
-def update_team(team_id: int, team_leader: int):
-    """Обновление команды"""
-    result = update_entity(Team, team_id, {'team_leader': team_leader})
+def update_team(team_id: int, team_leader: int, response: Response,
+                if_match: Optional[str] = Header(None), session=request_session):
+    """Обновление команды (If-Match: "версия" — защита от потерянных обновлений)"""
+    result = update_entity_s(session, Team, team_id, {'team_leader': team_leader}, parse_etag(if_match))
     if not result:
         raise HTTPException(status_code=404, detail="Team not found")
-    return result
+    return set_etag(response, result)
 
 
 @router.delete("/{team_id}")
-def delete_team(team_id: int):
+def delete_team(team_id: int, session=request_session):
     """Удаление команды"""
-    result = delete_entity(Team, team_id)
+    result = delete_entity_s(session, Team, team_id)
     if not result:
         raise HTTPException(status_code=404, detail="Team not found")
     return {"message": "Team deleted successfully"}
+
+
+@router.get("/{team_id}/members")
+def get_team_members(team_id: int, active: Optional[bool] = None, session=request_session):
+    """Состав команды одним запросом (участники с данными сотрудников)"""
+    get_entities_s(session, Team, team_id)
+
+    stmt = select(
+        TeamParticipation.employee,
+        Employee.full_name,
+        Employee.position,
+        TeamParticipation.active,
+        TeamParticipation.last_update,
+    ).join(Employee, Employee.id == TeamParticipation.employee).where(TeamParticipation.team == team_id)
+
+    if active is not None:
+        stmt = stmt.where(TeamParticipation.active == active)
+
+    return [dict(row) for row in session.execute(stmt.order_by(TeamParticipation.employee)).mappings()]
+
+
+@router.put("/{team_id}/members")
+def set_team_members(team_id: int, roster: TeamRoster, session=request_session):
+    """
+    Установка полного состава команды: перечисленные сотрудники активны, остальные — нет
+    Возвращает: состав и число активированных и деактивированных участников
+    """
+    members = sorted(set(roster.members))
+    now = datetime.now()
+
+    get_entities_s(session, Team, team_id)
+
+    # Новые и вернувшиеся участники — одной командой MERGE / ON CONFLICT
+    activated = []
+    if members:
+        activated = upsert_s(session, TeamParticipation, [
+            {'last_update': now, 'active': True, 'employee': employee_id, 'team': team_id}
+            for employee_id in members
+        ], update=['active', 'last_update'], changed=['active'])
+
+    # Выбывшие — активные участники не из состава: список ключей не зависит от размера состава,
+    # UPDATE частями по лимиту параметров БД (NOT IN по всему составу превысил бы его)
+    current = session.scalars(select(TeamParticipation.employee).where(
+        TeamParticipation.team == team_id,
+        TeamParticipation.active.is_(True),
+    )).all()
+    leaving = sorted(set(current).difference(members))
+    deactivated = 0
+    for chunk in backend.chunks(leaving):
+        stmt = update(TeamParticipation).where(
+            TeamParticipation.team == team_id,
+            TeamParticipation.active.is_(True),
+            TeamParticipation.employee.in_(chunk),
+        ).values(active=False, last_update=now)
+        deactivated += session.execute(stmt, execution_options={'synchronize_session': False}).rowcount
+    mark_changed(session, TeamParticipation, [(employee_id, team_id) for employee_id in leaving])
+
+    return {
+        "team": team_id,
+        "members": members,
+        "activated": len(activated),
+        "deactivated": deactivated,
+    }
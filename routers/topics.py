@@ -1,39 +1,45 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Header, Response
 from typing import Optional
-from database import create_entity, get_entities, update_entity, delete_entity, logger
+from database import create_entity_s, get_entities_s, update_entity_s, delete_entity_s, logger, parse_etag, \
+    set_etag, request_session
 from models import Topic
+from streaming import stream_entities, streaming_media_type
 
 router = APIRouter(prefix="/topics", tags=["topics"])
 
 
 @router.post("/")
-def create_topic(topic: str, expected_audience: str):
+def create_topic(topic: str, expected_audience: str, session=request_session):
     """Создание тематики"""
-    return create_entity(Topic(topic=topic, expected_audience=expected_audience))
+    return create_entity_s(session, Topic(topic=topic, expected_audience=expected_audience))
 
 
 @router.get("/")
-def get_topics(topic: Optional[str] = None):
-    """Получение тематик (всех или по названию)"""
-    result = get_entities(Topic, topic)
+def get_topics(topic: Optional[str] = None, accept: Optional[str] = Header(None), session=request_session):
+    """Получение тематик (всех или по названию; Accept: application/x-ndjson или text/csv — потоком)"""
+    media_type = streaming_media_type(accept)
+    if topic is None and media_type:
+        return stream_entities(Topic, media_type, read_only=session.info['read_only'])
+    result = get_entities_s(session, Topic, topic)
     if topic and not result:
         raise HTTPException(status_code=404, detail="Topic not found")
     return result
 
 
 @router.put("/{topic}")
-def update_topic(topic: str, expected_audience: str):
-    """Обновление тематики"""
-    result = update_entity(Topic, topic, {'expected_audience': expected_audience})
+def update_topic(topic: str, expected_audience: str, response: Response,
+                 if_match: Optional[str] = Header(None), session=request_session):
+    """Обновление тематики (If-Match: "версия" — защита от потерянных обновлений)"""
+    result = update_entity_s(session, Topic, topic, {'expected_audience': expected_audience}, parse_etag(if_match))
     if not result:
         raise HTTPException(status_code=404, detail="Topic not found")
-    return result
+    return set_etag(response, result)
 
 
 @router.delete("/{topic}")
-def delete_topic(topic: str):
+def delete_topic(topic: str, session=request_session):
     """Удаление тематики"""
-    result = delete_entity(Topic, topic)
+    result = delete_entity_s(session, Topic, topic)
     if not result:
         raise HTTPException(status_code=404, detail="Topic not found")
     return {"message": "Topic deleted successfully"}
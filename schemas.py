@@ -0,0 +1,103 @@
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel, ConfigDict, Field, create_model
+from sqlalchemy import Boolean, Date, DateTime, Integer, Numeric, String, inspect as sa_inspect
+
+from models import Client, Contract, Employee, Project, Service
+
+
+def _field(column) -> tuple:
+    """Тип и ограничения поля pydantic по столбцу модели"""
+    column_type = column.type
+    constraints = {}
+    if isinstance(column_type, String):
+        python_type = str
+        if column_type.length:
+            # Длина в символах, как у NVARCHAR, а не в байтах
+            constraints['max_length'] = column_type.length
+    elif isinstance(column_type, Boolean):
+        python_type = bool
+    elif isinstance(column_type, Integer):
+        python_type = int
+    elif isinstance(column_type, Numeric):
+        python_type = Decimal
+        constraints['max_digits'] = column_type.precision
+        constraints['decimal_places'] = column_type.scale
+    elif isinstance(column_type, DateTime):
+        python_type = datetime
+    elif isinstance(column_type, Date):
+        python_type = date
+    else:
+        python_type = column_type.python_type
+
+    if column.nullable:
+        python_type = Optional[python_type]
+    # Значение по умолчанию не проверяется: отсутствующее поле просто не обновляется,
+    # а явный null для NOT NULL столбца отклоняется
+    return python_type, Field(None, **constraints)
+
+
+def update_schema(model_class: Type) -> Type[BaseModel]:
+    """
+    Схема частичного обновления по модели: все столбцы, кроме первичного ключа и версии
+    Возвращает: класс pydantic с запретом неизвестных полей
+    """
+    mapper = sa_inspect(model_class)
+    fields = {}
+    for attr in mapper.column_attrs:
+        column = attr.columns[0]
+        if column.primary_key or attr.key == 'version':
+            continue
+        fields[attr.key] = _field(column)
+
+    return create_model(
+        f"{model_class.__name__}Update",
+        __config__=ConfigDict(extra='forbid'),
+        **fields
+    )
+
+
+def changes(data: BaseModel) -> Dict[str, Any]:
+    """Только переданные поля схемы обновления; пустое обновление — 400"""
+    values = data.model_dump(exclude_unset=True)
+    if not values:
+        raise HTTPException(status_code=400, detail="Нет полей для обновления")
+    return values
+
+
+class TeamRoster(BaseModel):
+    """Полный состав команды: ID активных участников"""
+
+    model_config = ConfigDict(extra='forbid')
+
+    members: List[int]
+
+
+class ProjectPromotion(BaseModel):
+    """Договор, повышаемый до проекта, и данные нового проекта"""
+
+    model_config = ConfigDict(extra='forbid')
+
+    contract_id: int
+    name: str = Field(max_length=32)
+    description: Optional[str] = Field(None, max_length=256)
+    project_team: Optional[int] = None
+    topic: Optional[str] = Field(None, max_length=32)
+
+
+class ProjectPromotionBatch(BaseModel):
+    """Пакетное повышение договоров до проектов"""
+
+    model_config = ConfigDict(extra='forbid')
+
+    projects: List[ProjectPromotion] = Field(min_length=1)
+
+
+ClientUpdate = update_schema(Client)
+ContractUpdate = update_schema(Contract)
+EmployeeUpdate = update_schema(Employee)
+ProjectUpdate = update_schema(Project)
+ServiceUpdate = update_schema(Service)
@@ -0,0 +1,477 @@
+"""
+Поиск сотрудников и клиентов по ФИО (контактному лицу), email и телефону
+
+Индекс хранится в памяти процесса API: строится при старте в фоновом потоке и
+обновляется после фиксации изменений через вспомогательные функции database.py
+(слушатель on_commit передает ключи измененных строк фоновому потоку, запрос
+его не ждет — поиск видит изменение через доли секунды).
+
+Изменения других процессов (воркеры serve.py --workers N, etl_cli) приходят через
+журнал Изменения_поиска: транзакция записи добавляет в него ключи измененных строк
+(before_commit), каждый процесс API раз в SEARCH_POLL_SECONDS читает новые записи
+(ChangeFeed) и обновляет свой индекс. Поэтому в другом воркере поиск видит запись
+с задержкой до SEARCH_POLL_SECONDS. Индекс у каждого воркера свой: память на индекс
+умножается на число воркеров.
+
+Токены записи — слова имени, email целиком и телефон. Поиск по префиксу идет
+по отсортированному словарю токенов (bisect), нечеткий — по триграммам слов
+имени (опечатки в ФИО). Результаты ранжируются по уровням: точное совпадение
+всех слов запроса, совпадение по префиксу, нечеткое совпадение.
+"""
+import bisect
+import heapq
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, event, func, insert, or_, select
+
+from database import Session, engine, on_commit
+from models import Client, Employee, SearchChange
+
+logger = logging.getLogger(__name__)
+
+# Индексируемые поля по разделам поиска; первое поле — имя (по нему нечеткий поиск)
+SEARCH_FIELDS = {
+    'employees': (Employee, ('full_name', 'email', 'phone')),
+    'clients': (Client, ('contact_person', 'email', 'phone')),
+}
+# Уровни совпадения в порядке ранжирования
+MATCHES = ('exact', 'prefix', 'fuzzy')
+# Минимальное сходство по триграммам для нечеткого совпадения (как в pg_trgm)
+FUZZY_THRESHOLD = 0.4
+# Сколько токенов словаря разворачивается для одного префикса
+MAX_PREFIX_TOKENS = 10000
+# Размер пакета чтения строк при построении и ключей при обновлении
+BUILD_BATCH = 10000
+REFRESH_BATCH = 500
+
+# Журнал изменений: период опроса, срок хранения записей, ожидание пропущенных id
+SEARCH_POLL_SECONDS = float(os.getenv('SEARCH_POLL_SECONDS', 2))
+CHANGE_RETENTION = timedelta(hours=1)
+GAP_SECONDS = 30
+# От стольких ключей таблицы в транзакции (пакет импорта) в журнал пишется перестроение целиком
+CHANGE_FULL_KEYS = 100
+
+_WORD = re.compile(r'\w+')
+
+
+def normalize(text: str) -> str:
+    return text.lower().replace('ё', 'е')
+
+
+def trigrams(word: str) -> Set[str]:
+    """Триграммы слова с отступами по краям, как в pg_trgm"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def query_words(query: str) -> List[str]:
+    """Слова запроса: разделители — пробелы, email и телефон остаются целыми"""
+    return list(dict.fromkeys(normalize(word) for word in query.split()))
+
+
+class SearchIndex:
+    """Индекс токенов одной модели"""
+
+    def __init__(self, model_class, fields: Tuple[str, ...]):
+        self.model_class = model_class
+        self.fields = fields
+        self.ready = False
+        self._lock = threading.Lock()
+        self._building = False
+        self._rebuild_again = False
+        self._pending: Set[int] = set()
+        self._docs: Dict[int, Tuple[str, ...]] = {}
+        # Токен → ID записи или сортированный список ID (у email и телефона обычно одна запись)
+        self._postings: Dict[str, object] = {}
+        self._sorted: List[str] = []
+        # Триграмма → слова имени
+        self._grams: Dict[str, Set[str]] = {}
+
+    def _select(self):
+        pk = getattr(self.model_class, 'id')
+        return select(pk, *(getattr(self.model_class, field) for field in self.fields)).order_by(pk)
+
+    @staticmethod
+    def _tokens(row) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+        """Слова имени и остальные токены строки (id, имя, email, телефон)"""
+        _, name, *rest = row
+        words = tuple(dict.fromkeys(sys.intern(word) for word in _WORD.findall(normalize(name or ''))))
+        others = tuple(normalize(value) for value in rest if value)
+        return words, others
+
+    # --- изменение структур (под блокировкой или на новых структурах до подмены)
+
+    @staticmethod
+    def _add(docs, postings, grams, key, row, sorted_tokens=None):
+        words, others = SearchIndex._tokens(row)
+        tokens = tuple(dict.fromkeys(words + others))
+        docs[key] = tokens
+        for token in tokens:
+            ids = postings.get(token)
+            if ids is None:
+                postings[token] = key
+                if sorted_tokens is not None:
+                    bisect.insort(sorted_tokens, token)
+                if token in words:
+                    for gram in trigrams(token):
+                        grams.setdefault(gram, set()).add(token)
+            elif isinstance(ids, list):
+                position = bisect.bisect_left(ids, key)
+                if position == len(ids) or ids[position] != key:
+                    ids.insert(position, key)
+            elif ids != key:
+                postings[token] = sorted((ids, key))
+
+    def _remove(self, key):
+        for token in self._docs.pop(key, ()):
+            ids = self._postings[token]
+            if isinstance(ids, list):
+                position = bisect.bisect_left(ids, key)
+                if position < len(ids) and ids[position] == key:
+                    del ids[position]
+                if len(ids) == 1:
+                    self._postings[token] = ids[0]
+                if ids:
+                    continue
+            del self._postings[token]
+            position = bisect.bisect_left(self._sorted, token)
+            del self._sorted[position]
+            # Триграммы удаленных слов не чистятся: при поиске слово проверяется по словарю
+
+    # --- построение и обновление
+
+    def _load(self):
+        """Читает все строки модели и строит новые структуры индекса"""
+        started = time.perf_counter()
+        docs, postings, grams = {}, {}, {}
+        with engine.connect() as connection:
+            result = connection.execution_options(yield_per=BUILD_BATCH).execute(self._select())
+            for row in result:
+                self._add(docs, postings, grams, row[0], row)
+        logger.info(
+            f"Индекс поиска {self.model_class.__tablename__}: {len(docs)} записей, "
+            f"{len(postings)} токенов за {time.perf_counter() - started:.2f} с"
+        )
+        return docs, postings, sorted(postings), grams
+
+    def rebuild(self):
+        """Перестраивает индекс в фоновом потоке; поиск до первого построения недоступен"""
+        with self._lock:
+            if self._building:
+                self._rebuild_again = True
+                return
+            self._building = True
+        threading.Thread(target=self._build, name=f"search-{self.model_class.__tablename__}",
+                         daemon=True).start()
+
+    def _build(self):
+        pending = set()
+        while True:
+            try:
+                structures = self._load()
+            except Exception as e:
+                logger.error(f"Ошибка построения индекса поиска {self.model_class.__tablename__}: {e}")
+                structures = None
+            with self._lock:
+                if structures is not None:
+                    self._docs, self._postings, self._sorted, self._grams = structures
+                    self.ready = True
+                pending |= self._pending
+                self._pending = set()
+                again, self._rebuild_again = self._rebuild_again, False
+                if not again:
+                    self._building = False
+            if not again:
+                break
+        # Изменения, зафиксированные во время построения, могли не попасть в прочитанные строки
+        if pending:
+            self.refresh(pending)
+
+    def refresh(self, keys: Iterable[int]):
+        """Перечитывает строки по ключам: новые и измененные добавляются, удаленные — удаляются"""
+        keys = list(keys)
+        with self._lock:
+            if self._building:
+                self._pending.update(keys)
+                return
+        pk = getattr(self.model_class, 'id')
+        rows = {}
+        with engine.connect() as connection:
+            for start in range(0, len(keys), REFRESH_BATCH):
+                chunk = keys[start:start + REFRESH_BATCH]
+                rows.update((row[0], row) for row in connection.execute(self._select().where(pk.in_(chunk))))
+        with self._lock:
+            for key in keys:
+                self._remove(key)
+                if key in rows:
+                    self._add(self._docs, self._postings, self._grams, key, rows[key], self._sorted)
+
+    # --- поиск
+
+    def _ids(self, token: str) -> List[int]:
+        ids = self._postings.get(token)
+        if ids is None:
+            return []
+        return ids if isinstance(ids, list) else [ids]
+
+    def _exact(self, word: str) -> List[str]:
+        return [word] if word in self._postings else []
+
+    def _prefix(self, word: str) -> List[str]:
+        position = bisect.bisect_left(self._sorted, word)
+        tokens = []
+        for token in self._sorted[position:position + MAX_PREFIX_TOKENS]:
+            if not token.startswith(word):
+                break
+            tokens.append(token)
+        return tokens
+
+    def _fuzzy(self, word: str) -> List[str]:
+        """Слова имени, похожие на слово запроса, и токены с ним в качестве префикса"""
+        tokens = self._prefix(word)
+        if len(word) < 3 or word.isdigit():
+            return tokens
+        grams = trigrams(word)
+        shared = Counter(token for gram in grams for token in self._grams.get(gram, ()))
+        for token, count in shared.items():
+            if count / (len(grams) + len(trigrams(token)) - count) >= FUZZY_THRESHOLD \
+                    and token in self._postings:
+                tokens.append(token)
+        return tokens
+
+    def _candidates(self, tokens: List[str]) -> Iterator[int]:
+        """ID записей с любым из токенов по возрастанию"""
+        lists = [self._ids(token) for token in tokens]
+        if len(lists) == 1:
+            yield from lists[0]
+            return
+        previous = None
+        for key in heapq.merge(*lists):
+            if key != previous:
+                yield key
+                previous = key
+
+    def search(self, words: List[str], limit: int, fuzzy: bool = True) -> List[Tuple[int, str]]:
+        """
+        Поиск записей, у которых каждое слово запроса совпадает с одним из токенов
+        Перебираются записи самого редкого слова по возрастанию ID, остальные слова
+        проверяются по токенам записи; перебор останавливается на limit результатах
+        Возвращает: [(ID, уровень совпадения)] — по уровню и ID
+        """
+        levels = [('exact', self._exact), ('prefix', self._prefix)]
+        if fuzzy:
+            levels.append(('fuzzy', self._fuzzy))
+
+        found, seen = [], set()
+        with self._lock:
+            for match, word_tokens in levels:
+                tokens = [word_tokens(word) for word in words]
+                if not all(tokens):
+                    continue
+                tokens.sort(key=lambda options: sum(len(self._ids(token)) for token in options))
+                others = [set(options) for options in tokens[1:]]
+                for key in self._candidates(tokens[0]):
+                    if key in seen or not all(not options.isdisjoint(self._docs[key]) for options in others):
+                        continue
+                    found.append((key, match))
+                    seen.add(key)
+                    if len(found) >= limit:
+                        return found
+        return found
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                'ready': self.ready,
+                'building': self._building,
+                'documents': len(self._docs),
+                'tokens': len(self._postings),
+            }
+
+
+indexes = {name: SearchIndex(model_class, fields) for name, (model_class, fields) in SEARCH_FIELDS.items()}
+_by_model = {index.model_class: index for index in indexes.values()}
+_by_table = {index.model_class.__tablename__: index for index in indexes.values()}
+_started = False
+
+
+class ChangeFeed:
+    """
+    Чтение журнала изменений других процессов
+    Транзакции фиксируются не в порядке id: пропущенные id (еще не зафиксированные записи)
+    запрашиваются повторно GAP_SECONDS секунд, затем считаются откатанными
+    """
+
+    def __init__(self, poll_seconds: float = SEARCH_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self.last = 0
+        self._gaps: Dict[int, float] = {}
+        self._polls = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Позиция — конец журнала: все, что раньше, войдет в построение индексов"""
+        with engine.connect() as connection:
+            self.last = connection.execute(select(func.max(SearchChange.id))).scalar() or 0
+        self._thread = threading.Thread(target=self._run, name='search-changes', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Ошибка чтения журнала изменений поиска: {e}")
+
+    def poll(self):
+        """Применяет новые записи журнала к индексам"""
+        condition = SearchChange.id > self.last
+        if self._gaps:
+            condition = or_(condition, SearchChange.id.in_(list(self._gaps)))
+        stmt = select(SearchChange.id, SearchChange.table_name, SearchChange.key).where(condition)
+        with engine.connect() as connection:
+            rows = connection.execute(stmt.order_by(SearchChange.id)).all()
+
+        now = time.monotonic()
+        ids = {row[0] for row in rows}
+        for change_id in ids:
+            self._gaps.pop(change_id, None)
+        newest = max(ids, default=self.last)
+        if newest > self.last:
+            self._gaps.update((change_id, now) for change_id in range(self.last + 1, newest) if change_id not in ids)
+            self.last = newest
+        self._gaps = {change_id: seen for change_id, seen in self._gaps.items() if now - seen < GAP_SECONDS}
+
+        changes: Dict[str, Optional[Set[int]]] = {}
+        for _, table_name, key in rows:
+            if key is None or changes.get(table_name, set()) is None:
+                changes[table_name] = None
+            else:
+                changes.setdefault(table_name, set()).add(key)
+        for table_name, keys in changes.items():
+            index = _by_table.get(table_name)
+            if index is None:
+                continue
+            if keys is None:
+                index.rebuild()
+            else:
+                index.refresh(keys)
+
+        self._polls += 1
+        if self._polls % 100 == 1:
+            self.prune()
+
+    @staticmethod
+    def prune():
+        """Удаляет записи журнала старше CHANGE_RETENTION (делает любой из воркеров)"""
+        with engine.begin() as connection:
+            connection.execute(delete(SearchChange).where(SearchChange.created < datetime.now() - CHANGE_RETENTION))
+
+
+change_feed = ChangeFeed()
+
+
+class Refresher:
+    """Обновление индексов после фиксации в фоновом потоке; ключи нескольких фиксаций объединяются"""
+
+    def __init__(self):
+        self._pending: Dict[SearchIndex, Optional[Set]] = {}
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def submit(self, index: SearchIndex, keys: Optional[Iterable]):
+        """keys None — перестроение индекса целиком"""
+        with self._condition:
+            if keys is None or (index in self._pending and self._pending[index] is None):
+                self._pending[index] = None
+            else:
+                self._pending.setdefault(index, set()).update(keys)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='search-refresh', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                pending, self._pending = self._pending, {}
+            for index, keys in pending.items():
+                try:
+                    if keys is None:
+                        index.rebuild()
+                    else:
+                        index.refresh(keys)
+                except Exception as e:
+                    logger.error(f"Ошибка обновления индекса поиска {index.model_class.__tablename__}: {e}")
+
+
+refresher = Refresher()
+
+
+def start():
+    """Строит индексы поиска в фоне и начинает читать журнал изменений (при старте API)"""
+    global _started
+    _started = True
+    change_feed.start()
+    for index in indexes.values():
+        index.rebuild()
+
+
+def stop():
+    change_feed.stop()
+
+
+def rebuild_tables(table_names: Iterable[str]):
+    """Перестраивает индексы таблиц (после импорта в другом процессе)"""
+    for table_name in table_names:
+        index = _by_table.get(table_name)
+        if index is not None and _started:
+            index.rebuild()
+
+
+def rebuild_after_import(job):
+    """Слушатель очереди ETL: импорт в процессе пула меняет таблицы мимо on_commit"""
+    if job.kind == 'import' and job.status == 'done':
+        rebuild_tables(job.result['tables'])
+
+
+@event.listens_for(Session, 'before_commit')
+def _log_changes(session):
+    """Ключи измененных записей поиска — в журнал, в той же транзакции"""
+    now = datetime.now()
+    rows = []
+    for model_class, keys in (session.info.get('changed') or {}).items():
+        if model_class not in _by_model:
+            continue
+        table_name = model_class.__tablename__
+        if keys is None or len(keys) >= CHANGE_FULL_KEYS:
+            rows.append({'table_name': table_name, 'key': None, 'created': now})
+        else:
+            rows.extend({'table_name': table_name, 'key': int(key), 'created': now}
+                        for key in keys if key is not None)
+    if rows:
+        session.execute(insert(SearchChange), rows)
+
+
+@on_commit
+def _on_commit(changed: Dict[object, Optional[Set]]):
+    if not _started:
+        return
+    for model_class, keys in changed.items():
+        index = _by_model.get(model_class)
+        if index is not None:
+            refresher.submit(index, keys)
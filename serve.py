@@ -0,0 +1,97 @@
+"""
+Запуск API в production: несколько процессов-воркеров с настроенным сервером
+
+    python serve.py --workers 4 --threads 40
+    python serve.py --gunicorn --workers 4        # Linux: gunicorn + воркеры uvicorn
+
+Параметры по умолчанию берутся из окружения: HOST, PORT, WEB_CONCURRENCY,
+THREADPOOL_SIZE, BACKLOG, KEEP_ALIVE.
+
+Каждый воркер держит свой индекс поиска в памяти (search_index.py): память на индекс
+умножается на число воркеров, а записи других воркеров видны в поиске с задержкой
+до SEARCH_POLL_SECONDS (журнал изменений).
+"""
+import argparse
+import importlib.util
+import os
+import sys
+
+APP = 'main:app'
+
+
+def _default_workers() -> int:
+    return int(os.getenv('WEB_CONCURRENCY', os.cpu_count() or 1))
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def run_uvicorn(args):
+    """Мастер-процесс uvicorn: воркеры запускаются им самим (spawn, работает и на Windows)"""
+    import uvicorn
+
+    uvicorn.run(
+        APP,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop=args.loop,
+        http=args.http,
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        log_level=args.log_level,
+        access_log=args.access_log,
+    )
+
+
+def run_gunicorn(args):
+    """Мастер-процесс gunicorn с воркерами uvicorn (fork; только POSIX)"""
+    command = [
+        sys.executable, '-m', 'gunicorn', APP,
+        '--worker-class', 'uvicorn.workers.UvicornWorker',
+        '--workers', str(args.workers),
+        '--bind', f"{args.host}:{args.port}",
+        '--backlog', str(args.backlog),
+        '--keep-alive', str(args.keep_alive),
+        '--log-level', args.log_level,
+    ]
+    if args.access_log:
+        command += ['--access-logfile', '-']
+    os.execv(sys.executable, command)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Запуск Web Studio API')
+    parser.add_argument('--host', default=os.getenv('HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('PORT', 8000)))
+    parser.add_argument('--workers', '-w', type=int, default=_default_workers(),
+                        help='Число процессов-воркеров (по умолчанию — число CPU)')
+    parser.add_argument('--threads', type=int, default=int(os.getenv('THREADPOOL_SIZE', 40)),
+                        help='Потоков на воркер для синхронных обработчиков')
+    parser.add_argument('--backlog', type=int, default=int(os.getenv('BACKLOG', 2048)),
+                        help='Очередь ожидающих соединений сокета')
+    parser.add_argument('--keep-alive', type=int, default=int(os.getenv('KEEP_ALIVE', 5)),
+                        help='Время удержания простаивающего соединения, с')
+    parser.add_argument('--loop', default='uvloop' if _available('uvloop') else 'asyncio',
+                        choices=['auto', 'asyncio', 'uvloop'])
+    parser.add_argument('--http', default='httptools' if _available('httptools') else 'h11',
+                        choices=['auto', 'h11', 'httptools'])
+    parser.add_argument('--log-level', default='warning')
+    parser.add_argument('--access-log', action='store_true', help='Журнал каждого запроса')
+    parser.add_argument('--gunicorn', action='store_true', help='Запуск через gunicorn')
+    args = parser.parse_args()
+
+    # Воркеры читают размер пула потоков из окружения при старте (lifespan в main.py)
+    os.environ['THREADPOOL_SIZE'] = str(args.threads)
+
+    print(f"Web Studio API: http://{args.host}:{args.port}, воркеров {args.workers}, "
+          f"потоков {args.threads}, loop {args.loop}, http {args.http}")
+    if args.gunicorn:
+        run_gunicorn(args)
+    else:
+        run_uvicorn(args)
+
+
+if __name__ == '__main__':
+    main()
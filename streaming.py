@@ -0,0 +1,93 @@
+import csv
+import io
+import json
+import logging
+from datetime import date
+from decimal import Decimal
+from typing import Iterator, Optional
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import inspect as sa_inspect, select
+
+from database import Session
+
+logger = logging.getLogger(__name__)
+
+NDJSON = 'application/x-ndjson'
+CSV = 'text/csv'
+STREAM_MEDIA_TYPES = (NDJSON, CSV)
+
+# Строк в одной выборке с курсора и в одном отправляемом фрагменте
+STREAM_BATCH_SIZE = 1000
+
+
+def streaming_media_type(accept: Optional[str]) -> Optional[str]:
+    """Потоковый формат из заголовка Accept; None — обычный JSON-массив"""
+    if not accept:
+        return None
+    requested = [part.split(';')[0].strip().lower() for part in accept.split(',')]
+    return next((media_type for media_type in requested if media_type in STREAM_MEDIA_TYPES), None)
+
+
+def _partitions(entity_class, *criteria, read_only: bool = True) -> Iterator[tuple]:
+    """
+    Строки таблицы пачками с серверного курсора
+    Возвращает: сначала имена атрибутов, затем списки строк
+    """
+    attrs = [attr.key for attr in sa_inspect(entity_class).column_attrs]
+    stmt = select(*[getattr(entity_class, attr) for attr in attrs]).where(*criteria)
+    yield attrs
+
+    session = Session(info={'read_only': read_only})
+    try:
+        # Столбцы вместо сущностей: без identity map, память не растет с размером таблицы
+        result = session.execute(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+        for partition in result.partitions():
+            yield partition
+    except Exception as e:
+        # Статус ответа уже отправлен — остается прервать поток и записать ошибку
+        logger.error(f"Ошибка потоковой выгрузки {entity_class.__tablename__}: {e}")
+        raise
+    finally:
+        session.close()
+
+
+def _json_default(value):
+    """Типы столбцов, которых нет в JSON (как в jsonable_encoder FastAPI)"""
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется в JSON")
+
+
+def _ndjson(partitions: Iterator) -> Iterator[str]:
+    attrs = next(partitions)
+    encoder = json.JSONEncoder(ensure_ascii=False, default=_json_default)
+    for partition in partitions:
+        yield ''.join(encoder.encode(dict(zip(attrs, row))) + '\n' for row in partition)
+
+
+def _csv(partitions: Iterator) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(next(partitions))
+    for partition in partitions:
+        writer.writerows(partition)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Заголовок пустой таблицы
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream_entities(entity_class, media_type: str, *criteria, read_only: bool = True) -> StreamingResponse:
+    """
+    Потоковая выдача всех строк таблицы в NDJSON или CSV
+    read_only — читать с реплики (False — с основной БД, для клиента после записи)
+    """
+    logger.info(f"Потоковая выгрузка {entity_class.__tablename__} ({media_type})")
+    partitions = _partitions(entity_class, *criteria, read_only=read_only)
+    body = _ndjson(partitions) if media_type == NDJSON else _csv(partitions)
+    return StreamingResponse(body, media_type=media_type)
@@ -0,0 +1,251 @@
+"""
+Счетчики дашборда, поддерживаемые в той же транзакции, что и изменение данных
+
+Таблица Счетчики хранит готовые значения (показатель, ключ) → значение:
+    unpaid_amount   — неоплаченная сумма клиента (оплаты его договоров и услуг его проектов)
+    open_services   — невыполненные услуги реализующей команды
+    active_members  — активные участники команды
+
+Вспомогательные функции database.py отмечают измененные ключи сущностей
+(mark_changed). Перед фиксацией транзакции затронутые ключи счетчиков
+пересчитываются агрегатом только по этим ключам (по индексам внешних ключей)
+и записываются одной командой MERGE / ON CONFLICT.
+Ключи до изменения (другой клиент договора, удаленная услуга) запоминаются
+через on_write. Модуль подключается импортом в процессах, которые пишут в БД
+(API и загрузчик ETL); полный пересчет — etl_cli rebuild-summary.
+Пакеты ETL счетчики не обновляют (сессия с info[DEFERRED]): с ростом таблицы пересчет
+на каждый пакет дорожает, поэтому после импорта показатели пересчитываются один раз (rebuild).
+"""
+import logging
+from typing import Dict, Iterable, Optional, Set
+
+from sqlalchemy import Unicode, delete, event, func, insert, literal, select, union_all, update
+
+from database import Session, backend, on_write
+from models import Contract, Payment, Project, Service, SummaryCounter, TeamParticipation
+
+logger = logging.getLogger(__name__)
+
+METRICS = ('unpaid_amount', 'open_services', 'active_members')
+# Показатели-количества: значение хранится в общем столбце Numeric, отдается целым
+COUNT_METRICS = ('open_services', 'active_members')
+# Больше ключей сущности в транзакции (массовый импорт) — показатели пересчитываются целиком
+FULL_REFRESH_KEYS = 1000
+# Ключей в одном условии IN (у SQL Server ограничение на число параметров)
+CHUNK_SIZE = 500
+# Ключ session.info: счетчики пересчитываются после загрузки, а не в транзакции
+DEFERRED = 'summary_deferred'
+
+
+def _unpaid_amount(keys=None):
+    contracts = select(Contract.client.label('key'), Payment.amount.label('value')) \
+        .join(Payment, Payment.id == Contract.payment).where(Payment.paid.is_(False))
+    services = select(Project.client.label('key'), Payment.amount.label('value')) \
+        .select_from(Service) \
+        .join(Project, Project.contract == Service.project) \
+        .join(Payment, Payment.id == Service.payment).where(Payment.paid.is_(False))
+    if keys is not None:
+        contracts = contracts.where(Contract.client.in_(keys))
+        services = services.where(Project.client.in_(keys))
+    rows = union_all(contracts, services).subquery()
+    return select(rows.c.key, func.sum(rows.c.value)).group_by(rows.c.key)
+
+
+def _open_services(keys=None):
+    stmt = select(Service.implementing_team, func.count()).where(
+        Service.completed.is_(False), Service.implementing_team.is_not(None)
+    )
+    if keys is not None:
+        stmt = stmt.where(Service.implementing_team.in_(keys))
+    return stmt.group_by(Service.implementing_team)
+
+
+def _active_members(keys=None):
+    stmt = select(TeamParticipation.team, func.count()).where(TeamParticipation.active.is_(True))
+    if keys is not None:
+        stmt = stmt.where(TeamParticipation.team.in_(keys))
+    return stmt.group_by(TeamParticipation.team)
+
+
+# Показатель → запрос значений (ключ, значение), при keys — только по этим ключам
+AGGREGATES = {
+    'unpaid_amount': _unpaid_amount,
+    'open_services': _open_services,
+    'active_members': _active_members,
+}
+
+
+def _keys(values) -> Set[int]:
+    return {key for key in values if key is not None}
+
+
+def _payment_keys(session, keys):
+    return {'unpaid_amount': _keys(session.scalars(
+        select(Contract.client).where(Contract.payment.in_(keys))
+    )) | _keys(session.scalars(
+        select(Project.client).join(Service, Service.project == Project.contract).where(Service.payment.in_(keys))
+    ))}
+
+
+def _contract_keys(session, keys):
+    return {'unpaid_amount': _keys(session.scalars(select(Contract.client).where(Contract.id.in_(keys))))}
+
+
+def _project_keys(session, keys):
+    return {'unpaid_amount': _keys(session.scalars(select(Project.client).where(Project.name.in_(keys))))}
+
+
+def _service_keys(session, keys):
+    rows = session.execute(
+        select(Project.client, Service.implementing_team)
+        .outerjoin(Project, Project.contract == Service.project)
+        .where(Service.id.in_(keys))
+    ).all()
+    return {
+        'unpaid_amount': _keys(client for client, _ in rows),
+        'open_services': _keys(team for _, team in rows),
+    }
+
+
+def _participation_keys(session, keys):
+    # Ключ участия — (сотрудник, команда)
+    return {'active_members': {team for _, team in keys}}
+
+
+# Модель → (ключи счетчиков по ключам сущностей, атрибуты, меняющие ключи счетчиков)
+RESOLVERS = {
+    Payment: (_payment_keys, set()),
+    Contract: (_contract_keys, {'client', 'payment'}),
+    Project: (_project_keys, {'client', 'contract'}),
+    Service: (_service_keys, {'project', 'payment', 'implementing_team'}),
+    TeamParticipation: (_participation_keys, {'team'}),
+}
+RESOLVER_METRICS = {
+    Payment: ('unpaid_amount',),
+    Contract: ('unpaid_amount',),
+    Project: ('unpaid_amount',),
+    Service: ('unpaid_amount', 'open_services'),
+    TeamParticipation: ('active_members',),
+}
+
+
+def _chunks(keys):
+    keys = list(keys)
+    for start in range(0, len(keys), CHUNK_SIZE):
+        yield keys[start:start + CHUNK_SIZE]
+
+
+def _merge(pending: Dict[str, Optional[Set[int]]], metric: str, keys: Optional[Iterable[int]]):
+    if keys is None or (metric in pending and pending[metric] is None):
+        pending[metric] = None
+    else:
+        # Ключи из пакетов ETL могут прийти строками — счетчики хранят целые
+        pending.setdefault(metric, set()).update(int(key) for key in keys)
+
+
+def _resolve(session, pending, entity_class, keys):
+    """Добавляет к pending ключи счетчиков, зависящих от строк сущности"""
+    resolver, _ = RESOLVERS[entity_class]
+    if keys is None or len(keys) > FULL_REFRESH_KEYS:
+        for metric in RESOLVER_METRICS[entity_class]:
+            _merge(pending, metric, None)
+        return
+    for chunk in _chunks(keys):
+        for metric, metric_keys in resolver(session, chunk).items():
+            _merge(pending, metric, metric_keys)
+
+
+def refresh(session, metric: str, keys: Iterable[int]) -> int:
+    """
+    Пересчитывает показатель по ключам в транзакции сессии
+    Строки счетчиков сначала блокируются (UPDATE без изменений): параллельная транзакция
+    по тем же ключам дождется фиксации и посчитает агрегат уже с ее изменениями.
+    Недостающие строки сначала вставляются нулевыми — иначе блокировать нечего
+    и две транзакции с новым ключом посчитали бы агрегат, не видя друг друга.
+    После записи нулевые строки удаляются, как и при rebuild_metric
+    Возвращает: число записанных счетчиков
+    """
+    written = 0
+    for chunk in _chunks(keys):
+        backend.insert_missing(session, SummaryCounter, [
+            {'metric': metric, 'key': key, 'value': 0} for key in chunk
+        ])
+        session.execute(
+            update(SummaryCounter)
+            .where(SummaryCounter.metric == metric, SummaryCounter.key.in_(chunk))
+            .values(value=SummaryCounter.value),
+            execution_options={'synchronize_session': False}
+        )
+        values = dict(session.execute(AGGREGATES[metric](chunk)).all())
+        rows = [{'metric': metric, 'key': key, 'value': values.get(key) or 0} for key in chunk]
+        backend.upsert(session, SummaryCounter, rows, update=['value'], changed=['value'])
+        session.execute(
+            delete(SummaryCounter)
+            .where(SummaryCounter.metric == metric, SummaryCounter.key.in_(chunk), SummaryCounter.value == 0),
+            execution_options={'synchronize_session': False}
+        )
+        written += len(rows)
+    return written
+
+
+def rebuild_metric(connection, metric: str) -> int:
+    """
+    Полный пересчет показателя командами DELETE и INSERT ... SELECT
+    connection — сессия или соединение в открытой транзакции
+    Возвращает: число строк счетчиков
+    """
+    connection.execute(delete(SummaryCounter).where(SummaryCounter.metric == metric),
+                       execution_options={'synchronize_session': False})
+    values = AGGREGATES[metric]().subquery()
+    key, value = values.c
+    # Нулевые значения не записываются: отсутствующий счетчик читается как 0
+    source = select(literal(metric, Unicode(32)), key, value).where(key.is_not(None), value != 0)
+    columns = [SummaryCounter.metric, SummaryCounter.key, SummaryCounter.value]
+    return connection.execute(insert(SummaryCounter).from_select(columns, source)).rowcount
+
+
+def counter_value(metric: str, value):
+    """Значение счетчика для ответа: количества — целыми, суммы — как хранятся"""
+    if value is None:
+        return 0
+    return int(value) if metric in COUNT_METRICS else value
+
+
+def rebuild(connection) -> Dict[str, int]:
+    """Полный пересчет всех показателей (восстановление после загрузки мимо API)"""
+    return {metric: rebuild_metric(connection, metric) for metric in METRICS}
+
+
+@on_write
+def _before_write(session, entity_class, keys, fields):
+    """Ключи счетчиков по старому состоянию строк: после изменения они уже не найдутся"""
+    if entity_class not in RESOLVERS or session.info.get(DEFERRED):
+        return
+    _, moving = RESOLVERS[entity_class]
+    if fields is not None and not fields & moving:
+        return
+    _resolve(session, session.info.setdefault('summary', {}), entity_class, keys)
+
+
+@event.listens_for(Session, 'before_commit')
+def _refresh_counters(session):
+    if session.info.get(DEFERRED):
+        session.info.pop('summary', None)
+        return
+    changed = session.info.get('changed') or {}
+    pending = session.info.pop('summary', {})
+    for entity_class, keys in changed.items():
+        if entity_class in RESOLVERS:
+            _resolve(session, pending, entity_class, keys)
+
+    for metric, keys in pending.items():
+        if keys is None:
+            rebuild_metric(session, metric)
+            logger.info(f"Счетчики {metric} пересчитаны целиком")
+        elif keys:
+            refresh(session, metric, keys)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_counters(session, previous_transaction):
+    session.info.pop('summary', None)
@@ -0,0 +1,25 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Приложение и ETL читают DATABASE_URL при импорте database: БД тестов — временный файл SQLite
+_workdir = tempfile.mkdtemp(prefix='corpis-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{Path(_workdir) / 'test.db'}"
+# Файлы задач ETL — во временном каталоге, файлы для импорта по пути — data репозитория
+os.environ['ETL_UPLOAD_DIR'] = str(Path(_workdir) / 'uploads')
+os.environ['ETL_EXPORT_DIR'] = str(Path(_workdir) / 'exports')
+os.environ['ETL_DATA_DIR'] = str(Path(__file__).resolve().parent.parent / 'data')
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture(scope='session')
+def client():
+    """Клиент API на временной БД"""
+    from fastapi.testclient import TestClient
+    from main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
@@ -0,0 +1,111 @@
+"""Контроль допуска: 503 с Retry-After при полном бюджете и освобождение места"""
+import asyncio
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+import admission
+from admission import Limiter, Overloaded
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    limiter = Limiter('test', limit=1, queue=0, max_wait=0.05)
+    monkeypatch.setitem(admission.limiters, 'test', limiter)
+    return limiter
+
+
+@pytest.fixture
+def app_client(limiter):
+    app = FastAPI()
+
+    @app.get('/ok', dependencies=[admission.admit('test')])
+    def ok():
+        return {'active': limiter.active}
+
+    @app.get('/missing', dependencies=[admission.admit('test')])
+    def missing():
+        raise HTTPException(status_code=404, detail='Не найдено')
+
+    @app.get('/error', dependencies=[admission.admit('test')])
+    def error():
+        raise RuntimeError('сбой обработчика')
+
+    with TestClient(app, raise_server_exceptions=False) as client:
+        yield client
+
+
+def test_full_budget_is_503_with_retry_after(app_client, limiter):
+    limiter.active = limiter.limit
+
+    response = app_client.get('/ok')
+
+    assert response.status_code == 503
+    assert int(response.headers['Retry-After']) >= 1
+    assert limiter.rejected['queue_full'] == 1
+    # Отклоненный запрос место не занимал и не освобождает
+    assert limiter.active == limiter.limit
+
+
+def test_slot_released_after_response(app_client, limiter):
+    response = app_client.get('/ok')
+
+    assert response.status_code == 200
+    assert response.json() == {'active': 1}
+    assert limiter.active == 0
+    assert limiter.admitted == 1
+
+
+@pytest.mark.parametrize('path, status', [('/missing', 404), ('/error', 500)])
+def test_slot_released_after_exception(app_client, limiter, path, status):
+    assert app_client.get(path).status_code == status
+    assert limiter.active == 0
+    # Место снова доступно
+    assert app_client.get('/ok').status_code == 200
+
+
+def test_queue_wait_times_out():
+    async def scenario():
+        limiter = Limiter('test', limit=1, queue=1, max_wait=0.05)
+        admitted_at = await limiter.acquire()
+        with pytest.raises(Overloaded) as overloaded:
+            await limiter.acquire()
+        assert overloaded.value.reason == 'timeout'
+        limiter.release(admitted_at)
+        return limiter
+
+    limiter = asyncio.run(scenario())
+
+    assert limiter.active == 0
+    assert limiter.stats()['waiting'] == 0
+    assert limiter.rejected == {'queue_full': 0, 'timeout': 1}
+
+
+def test_released_slot_goes_to_waiter():
+    async def scenario():
+        limiter = Limiter('test', limit=1, queue=1, max_wait=1)
+        admitted_at = await limiter.acquire()
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        limiter.release(admitted_at)
+        limiter.release(await waiting)
+        return limiter
+
+    limiter = asyncio.run(scenario())
+
+    assert limiter.active == 0
+    assert limiter.admitted == 2
+
+
+def test_app_routes_use_class_budget(client, monkeypatch):
+    reports = admission.limiters['reports']
+    monkeypatch.setattr(reports, 'active', reports.limit)
+    monkeypatch.setattr(reports, 'queue', 0)
+
+    response = client.get('/dashboard/clients/1')
+
+    assert response.status_code == 503
+    assert 'Retry-After' in response.headers
+    # Другой класс маршрутов не затронут
+    assert client.get('/clients/', params={'client_id': 999999}).status_code == 404
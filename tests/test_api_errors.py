@@ -0,0 +1,17 @@
+"""Ошибки запроса проходят через сессию запроса без превращения в 500"""
+import pytest
+
+
+@pytest.mark.parametrize('method, path, body', [
+    ('PUT', '/clients/1', {'bogus': 'x'}),
+    ('POST', '/clients/', None),
+    ('POST', '/employees/1/teams/1', None),
+])
+def test_validation_error_is_422(client, method, path, body):
+    response = client.request(method, path, json=body)
+    assert response.status_code == 422
+
+
+def test_not_found_is_404(client):
+    response = client.get('/clients/?client_id=999999')
+    assert response.status_code == 404
@@ -0,0 +1,122 @@
+"""Фоновые задачи ETL: импорт, экспорт, прогресс SSE, файл результата и очистка"""
+import os
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+import pytest
+
+from etl.jobs import FINISHED, Job, JobQueue
+
+CLIENTS_CSV = (
+    'id,контактное_лицо,телефон,email\n'
+    '9001,Задача Импортова,80000000030,job1@example.com\n'
+    '9002,Задача Загрузкина,80000000031,job2@example.com\n'
+)
+
+
+def _wait(client, job_id: str, timeout: float = 60) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f"/etl/jobs/{job_id}").json()
+        if job['status'] in FINISHED:
+            return job
+        assert time.monotonic() < deadline, f"Задача {job_id} не завершилась: {job}"
+        time.sleep(0.1)
+
+
+def test_upload_import(client):
+    response = client.post('/etl/imports', params={'filename': 'клиент.csv'}, content=CLIENTS_CSV.encode())
+    assert response.status_code == 202
+
+    job = _wait(client, response.json()['id'])
+
+    assert job['status'] == 'done', job
+    assert (job['result']['success'], job['result']['failed']) == (2, 0)
+    assert client.get('/clients/', params={'client_id': 9002}).json()['email'] == 'job2@example.com'
+    assert response.json()['id'] in [job['id'] for job in client.get('/etl/jobs').json()]
+
+
+def test_import_errors(client):
+    assert client.post('/etl/imports').status_code == 400
+    assert client.post('/etl/imports', params={'path': '../main.py'}).status_code == 400
+    assert client.post('/etl/imports', params={'path': 'нет.csv'}).status_code == 404
+    assert client.post('/etl/imports', params={'filename': 'данные.txt'}, content=b'x').status_code == 400
+    assert client.post('/etl/imports', params={'filename': 'пусто.csv'}, content=b'').status_code == 400
+
+
+def test_export_and_file(client):
+    client.post('/positions/', params={'position': 'Экспортер', 'responsibilities': '-'})
+    response = client.post('/etl/exports', params={'table': 'Должности', 'format': 'csv'})
+    assert response.status_code == 202
+    job = _wait(client, response.json()['id'])
+    assert job['status'] == 'done', job
+
+    response = client.get(f"/etl/jobs/{job['id']}/file")
+
+    assert response.status_code == 200
+    lines = response.content.decode('utf-8-sig').splitlines()
+    assert lines[0].startswith('должность')
+    assert any(line.startswith('Экспортер,') for line in lines)
+    assert quote('должности.csv') in response.headers['content-disposition']
+
+
+def test_export_unknown_table_is_400_without_file(client):
+    export_dir = Path(os.environ['ETL_EXPORT_DIR'])
+    before = set(export_dir.iterdir()) if export_dir.exists() else set()
+
+    for table in ('нет_такой', '../../etc/passwd'):
+        assert client.post('/etl/exports', params={'table': table}).status_code == 400
+
+    assert (set(export_dir.iterdir()) if export_dir.exists() else set()) == before
+    assert client.post('/etl/exports', params={'table': 'должности', 'format': 'pdf'}).status_code == 400
+
+
+def test_job_events_until_finished(client):
+    job_id = client.post('/etl/exports', params={'table': 'тематики'}).json()['id']
+
+    with client.stream('GET', f"/etl/jobs/{job_id}/events") as response:
+        assert response.headers['content-type'].startswith('text/event-stream')
+        events = [line.removeprefix('event: ') for line in response.iter_lines() if line.startswith('event: ')]
+
+    assert events[-1] == 'done'
+    assert set(events) <= {'queued', 'running', 'done'}
+
+
+def test_job_file_not_ready(client):
+    assert client.get('/etl/jobs/нет/file').status_code == 404
+    assert client.get('/etl/jobs/нет').status_code == 404
+    assert client.get('/etl/jobs/нет/events').status_code == 404
+
+    job_id = client.post('/etl/imports', params={'filename': 'клиент.csv'}, content=CLIENTS_CSV.encode()).json()['id']
+    _wait(client, job_id)
+    assert client.get(f"/etl/jobs/{job_id}/file").status_code == 409
+
+
+def _finished_job(queue: JobQueue, path: Path, finished: float) -> Job:
+    path.write_text('x')
+    job = Job('export', {}, [str(path)])
+    job.status, job.finished = 'done', finished
+    queue.jobs[job.id] = job
+    return job
+
+
+def test_prune_removes_old_jobs_and_files(tmp_path):
+    queue = JobQueue(ttl=60, max_finished=2)
+    queue.directories.append(tmp_path)
+    now = time.time()
+    expired = _finished_job(queue, tmp_path / 'expired.csv', now - 120)
+    oldest = _finished_job(queue, tmp_path / 'oldest.csv', now - 30)
+    kept = [_finished_job(queue, tmp_path / f"kept{number}.csv", now - number) for number in range(2)]
+    running = Job('import', {}, [])
+    queue.jobs[running.id] = running
+    # Файл без задачи (например, после перезапуска сервера)
+    orphan = tmp_path / 'orphan.csv'
+    orphan.write_text('x')
+    os.utime(orphan, (now - 120, now - 120))
+
+    queue.prune()
+
+    assert set(queue.jobs) == {job.id for job in kept} | {running.id}
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['kept0.csv', 'kept1.csv']
+    assert expired.id not in queue.jobs and oldest.id not in queue.jobs
@@ -0,0 +1,84 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from etl.batch import RecordBatch
+from etl.extractor import engine_available, extract_frames
+
+
+@pytest.mark.parametrize('engine', ['calamine', 'openpyxl'])
+@pytest.mark.parametrize('start', [0, 5])
+def test_workbook_frames_match_read_excel(tmp_path, engine, start):
+    if not engine_available(engine):
+        pytest.skip(f"Движок {engine} не установлен")
+    path = tmp_path / 'данные.xlsx'
+    pd.DataFrame({
+        'id': range(1, 24),
+        'имя': [None if i % 4 == 0 else f"Имя {i}" for i in range(23)],
+        'сумма': [i * 1.5 for i in range(23)],
+        'дата': [datetime(2024, 1, 1 + i) for i in range(23)],
+    }).to_excel(path, index=False)
+
+    expected = pd.read_excel(path, engine=engine, skiprows=range(1, start + 1) if start else None)
+    frames = list(extract_frames(str(path), 10, start, engine))
+
+    assert [offset for offset, _ in frames] == list(range(start, 23, 10))
+    result = pd.concat([frame for _, frame in frames], ignore_index=True)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+CSV_WITH_BLANK_LINES = 'id,name\n1,a\n\n2,b\n3,c\n4,d\n\n\n5,e\n6,f\n'
+
+
+def _batches(path, start, engine='c'):
+    return [RecordBatch.from_frame(frame, offset) for offset, frame in extract_frames(str(path), 2, start, engine)]
+
+
+def _csv_engines():
+    return ['c', 'python'] + (['pyarrow'] if engine_available('pyarrow') else [])
+
+
+@pytest.mark.parametrize('engine', _csv_engines())
+def test_csv_blank_lines_keep_file_positions(tmp_path, engine):
+    path = tmp_path / 'данные.csv'
+    path.write_text(CSV_WITH_BLANK_LINES, encoding='utf-8')
+
+    batches = _batches(path, 0, engine)
+
+    assert [row[0] for batch in batches for row in batch.rows] == [1, 2, 3, 4, 5, 6]
+    assert [batch.number(idx) for batch in batches for idx in range(len(batch))] == [1, 3, 4, 5, 8, 9]
+    assert all(isinstance(row[0], int) for batch in batches for row in batch.rows)
+
+
+@pytest.mark.parametrize('engine', _csv_engines())
+@pytest.mark.parametrize('committed', [1, 2, 3])
+def test_csv_resume_after_blank_lines(tmp_path, committed, engine):
+    path = tmp_path / 'данные.csv'
+    path.write_text(CSV_WITH_BLANK_LINES, encoding='utf-8')
+
+    batches = _batches(path, 0, engine)
+    loaded = [row[0] for batch in batches[:committed] for row in batch.rows]
+    # Контрольная точка — позиция после последнего зафиксированного пакета
+    resumed = _batches(path, batches[committed - 1].end, engine)
+
+    assert loaded + [row[0] for batch in resumed for row in batch.rows] == [1, 2, 3, 4, 5, 6]
+
+
+@pytest.mark.parametrize('start', [0, 7])
+def test_pyarrow_csv_frames_match_c_parser(tmp_path, start):
+    if not engine_available('pyarrow'):
+        pytest.skip("Движок pyarrow не установлен")
+    path = tmp_path / 'данные.csv.gz'
+    pd.DataFrame({
+        'id': range(1, 24),
+        'имя': [None if i % 4 == 0 else f"Имя {i}" for i in range(23)],
+        'сумма': [i * 1.5 for i in range(23)],
+    }).to_csv(path, index=False)
+
+    expected = list(extract_frames(str(path), 10, start, 'c'))
+    frames = list(extract_frames(str(path), 10, start, 'pyarrow'))
+
+    assert [offset for offset, _ in frames] == [offset for offset, _ in expected]
+    for (_, frame), (_, expected_frame) in zip(frames, expected):
+        pd.testing.assert_frame_equal(frame, expected_frame, check_dtype=False)
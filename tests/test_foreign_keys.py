@@ -0,0 +1,17 @@
+"""Внешние ключи проверяются и в SQLite: нарушение — 400, как у SQL Server"""
+
+
+def test_delete_referenced_position_is_400(client):
+    assert client.post('/positions/', params={'position': 'Тестовая', 'responsibilities': '-'}).status_code == 200
+    assert client.post('/employees/', params={
+        'full_name': 'Тест Тестов', 'email': 'fk@example.com', 'phone': '80000000000', 'position': 'Тестовая',
+    }).status_code == 200
+
+    assert client.delete('/positions/Тестовая').status_code == 400
+
+
+def test_orphan_reference_is_400(client):
+    response = client.post('/employees/', params={
+        'full_name': 'Тест Сирота', 'email': 'orphan@example.com', 'phone': '80000000000', 'position': 'Нет такой',
+    })
+    assert response.status_code == 400
@@ -0,0 +1,53 @@
+"""Параллельная трансформация: порядок частей и освобождение разделяемой памяти"""
+from multiprocessing.shared_memory import SharedMemory
+
+import pytest
+
+from etl import parallel
+from etl.batch import RecordBatch
+from etl.extractor import engine_available, extract_frames
+from etl.transformer import transform
+
+
+@pytest.fixture
+def positions(tmp_path):
+    path = tmp_path / 'должности.csv'
+    path.write_text('должность,обязанности\n' + ''.join(f"Должность {i},Обязанности {i}\n" for i in range(20)),
+                    encoding='utf-8')
+    return str(path)
+
+
+@pytest.mark.parametrize('handoff', ['arrow', 'pickle'])
+def test_parallel_matches_sequential(positions, handoff):
+    if handoff == 'arrow' and not engine_available('pyarrow'):
+        pytest.skip("pyarrow не установлен")
+    expected = [transform(RecordBatch.from_frame(frame, offset))[1].rows
+                for offset, frame in extract_frames(positions, 3)]
+
+    results = list(parallel.transform_parallel(extract_frames(positions, 3), None, 2, handoff))
+
+    assert [offset for offset, *_ in results] == list(range(0, 20, 3))
+    assert [transformed.rows for *_, transformed in results] == expected
+
+
+def test_interrupted_run_releases_shared_memory(positions, monkeypatch):
+    if not engine_available('pyarrow'):
+        pytest.skip("pyarrow не установлен")
+    names = []
+    to_shared_memory = parallel._to_shared_memory
+
+    def recording(frame):
+        shm = to_shared_memory(frame)
+        names.append(shm[0].name)
+        return shm
+
+    monkeypatch.setattr(parallel, '_to_shared_memory', recording)
+
+    results = parallel.transform_parallel(extract_frames(positions, 1), None, 2, 'arrow')
+    next(results)
+    results.close()
+
+    assert len(names) > 1
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            SharedMemory(name=name)
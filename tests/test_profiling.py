@@ -0,0 +1,25 @@
+import pytest
+from sqlalchemy import create_engine, event, text
+
+from etl.profiling import RunProfile
+
+
+def test_statement_listener_removed_after_failed_stage():
+    engine = create_engine('sqlite://')
+    profile = RunProfile('import', 'test.csv', engine)
+
+    with pytest.raises(RuntimeError):
+        with profile.stage('load'):
+            with engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+            raise RuntimeError('ошибка загрузки')
+
+    assert profile.stages['load']['statements'] == 1
+    assert not event.contains(engine, 'before_cursor_execute', profile._count_statement)
+
+    with profile.stage('load'):
+        with profile.stage('summary'):
+            with engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+    assert profile.stages['summary']['statements'] == 1
+    assert not event.contains(engine, 'before_cursor_execute', profile._count_statement)
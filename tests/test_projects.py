@@ -0,0 +1,33 @@
+"""Пакетное повышение договоров до проектов"""
+
+
+def _contract(client, employee_id: int, client_id: int, paid: bool) -> int:
+    contract = client.post('/contracts/', params={
+        'processing_employee': employee_id, 'client': client_id, 'amount': 1000,
+    }).json()
+    if paid:
+        assert client.put(f"/payments/{contract['payment']}/status", params={'paid': True}).status_code == 200
+    return contract['id']
+
+
+def test_batch_duplicate_only_after_accepted(client):
+    client.post('/positions/', params={'position': 'Менеджер пакета', 'responsibilities': '-'})
+    employee = client.post('/employees/', params={
+        'full_name': 'Пакет Тестов', 'email': 'batch@example.com', 'phone': '80000000001',
+        'position': 'Менеджер пакета',
+    }).json()
+    customer = client.post('/clients/', params={
+        'contact_person': 'Пакетный клиент', 'phone': '80000000002', 'email': 'client@example.com',
+    }).json()
+    unpaid = _contract(client, employee['id'], customer['id'], paid=False)
+    paid = _contract(client, employee['id'], customer['id'], paid=True)
+
+    response = client.post('/projects/batch', json={'projects': [
+        {'contract_id': unpaid, 'name': 'Пакетный проект'},
+        {'contract_id': paid, 'name': 'Пакетный проект'},
+        {'contract_id': paid, 'name': 'Другой проект'},
+    ]})
+
+    assert response.status_code == 200
+    assert [result['status'] for result in response.json()['results']] == ['unpaid', 'promoted', 'duplicate']
+    assert response.json()['promoted'] == 1
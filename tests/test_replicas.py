@@ -0,0 +1,106 @@
+"""Разделение чтения и записи: GET с реплики, запись и чтение своих записей — с основной БД"""
+import sqlite3
+import time
+
+import pytest
+from sqlalchemy import text, update
+
+import database
+from backends import SQLiteBackend
+from database import PRIMARY_COOKIE, Session
+from models import Client
+from replicas import ReplicaSet
+
+
+@pytest.fixture
+def replica(client, tmp_path, monkeypatch):
+    """Копия тестовой БД как реплика; клиент, который есть только на реплике"""
+    path = tmp_path / 'replica.db'
+    # Копия через backup: основная БД в режиме WAL, файл без журнала может быть неполным
+    source, target = database.engine.raw_connection(), sqlite3.connect(path)
+    source.driver_connection.backup(target)
+    target.close()
+    source.close()
+    engine = SQLiteBackend(f"sqlite:///{path}").create_engine()
+    with engine.begin() as connection:
+        client_id = connection.execute(text(
+            'INSERT INTO "Клиент" ("контактное_лицо", "телефон", "email", "версия") '
+            "VALUES ('Только Реплика', '80000000040', 'replica@example.com', 1) RETURNING id"
+        )).scalar()
+    monkeypatch.setattr(database, 'replicas', ReplicaSet([engine]))
+    yield engine, client_id
+    engine.dispose()
+
+
+def test_get_reads_from_replica(client, replica):
+    _, client_id = replica
+
+    response = client.get('/clients/', params={'client_id': client_id})
+
+    assert response.status_code == 200
+    assert response.json()['contact_person'] == 'Только Реплика'
+
+
+def test_pinned_client_reads_from_primary(client, replica):
+    _, client_id = replica
+    client.cookies.set(PRIMARY_COOKIE, str(time.time() + 60))
+    try:
+        response = client.get('/clients/', params={'client_id': client_id})
+    finally:
+        client.cookies.clear()
+
+    assert response.status_code == 404
+
+
+def test_write_goes_to_primary(client, replica):
+    replica_engine, _ = replica
+
+    created = client.post('/clients/', params={
+        'contact_person': 'Основная Запись', 'phone': '80000000041', 'email': 'primary@example.com',
+    }).json()
+
+    with database.engine.connect() as connection:
+        assert connection.execute(text('SELECT count(*) FROM "Клиент" WHERE id = :id'),
+                                  {'id': created['id']}).scalar() == 1
+    with replica_engine.connect() as connection:
+        assert connection.execute(text('SELECT "контактное_лицо" FROM "Клиент" WHERE id = :id'),
+                                  {'id': created['id']}).scalar() == 'Только Реплика'
+
+
+@pytest.mark.parametrize('statement', [
+    update(Client).where(Client.id == 0).values(phone='80000000042'),
+    text('UPDATE "Клиент" SET "телефон" = \'80000000042\' WHERE id = 0'),
+])
+def test_read_only_session_switches_to_primary_on_write(replica, statement):
+    replica_engine, _ = replica
+    with Session(info={'read_only': True}) as session:
+        assert session.get_bind() is replica_engine
+
+        session.execute(statement)
+
+        assert session.info['wrote']
+        assert session.get_bind() is database.engine
+        session.rollback()
+
+
+def test_lagging_replica_is_skipped():
+    first, second = (SQLiteBackend('sqlite://').create_engine() for _ in range(2))
+    lags = {first: 30.0, second: 0.5}
+    replicas = ReplicaSet([first, second], max_lag=10, lag=lambda connection: lags[connection.engine])
+
+    replicas.check()
+    assert {replicas.pick() for _ in range(4)} == {second}
+
+    # Реплика догнала основную БД — следующая проверка возвращает ее
+    lags[first] = 1.0
+    replicas.check()
+    assert {replicas.pick() for _ in range(4)} == {first, second}
+
+
+def test_unknown_lag_keeps_replica():
+    engine = SQLiteBackend('sqlite://').create_engine()
+    replicas = ReplicaSet([engine], max_lag=10, lag=SQLiteBackend('sqlite://').replica_lag)
+
+    replicas.check()
+
+    assert replicas.pick() is engine
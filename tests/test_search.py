@@ -0,0 +1,82 @@
+"""Поиск по индексу в памяти: уровни совпадения, обновление после записи и журнал изменений"""
+import time
+from datetime import datetime
+
+import pytest
+from sqlalchemy import delete, select, update
+
+import search_index
+from database import engine, mark_changed, session_scope
+from models import Client, SearchChange
+
+
+def _eventually(check, timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while not check():
+        assert time.monotonic() < deadline, "Условие не выполнилось"
+        time.sleep(0.05)
+
+
+def _search(client, q: str, **params):
+    response = client.get('/search/', params={'q': q, 'entity': 'clients', **params})
+    assert response.status_code == 200
+    return {item['entity']['id']: item['match'] for item in response.json()}
+
+
+@pytest.fixture
+def arkady(client):
+    _eventually(lambda: all(index.ready for index in search_index.indexes.values()))
+    customer = client.post('/clients/', params={
+        'contact_person': 'Аркадий Паровозов', 'phone': '89990001122', 'email': 'arkady@example.com',
+    }).json()
+    # Индекс обновляется фоновым потоком после фиксации
+    _eventually(lambda: customer['id'] in _search(client, 'Паровозов'))
+    return customer['id']
+
+
+def test_exact_prefix_and_fuzzy(client, arkady):
+    assert _search(client, 'аркадий паровозов')[arkady] == 'exact'
+    assert _search(client, 'arkady@example.com')[arkady] == 'exact'
+    assert _search(client, '89990001122')[arkady] == 'exact'
+    assert _search(client, 'Арк Паро')[arkady] == 'prefix'
+    assert _search(client, 'Аркадий Паравозов')[arkady] == 'fuzzy'
+    assert arkady not in _search(client, 'Аркадий Паравозов', fuzzy=False)
+    assert arkady not in _search(client, 'Аркадий Локомотивов')
+
+
+def test_index_follows_updates_and_deletes(client, arkady):
+    client.patch(f"/clients/{arkady}", json={'contact_person': 'Аркадий Тепловозов'})
+    _eventually(lambda: arkady in _search(client, 'Тепловозов'))
+    assert arkady not in _search(client, 'Паровозов', fuzzy=False)
+
+    client.delete(f"/clients/{arkady}")
+    _eventually(lambda: arkady not in _search(client, 'Тепловозов'))
+
+
+def test_change_feed_catches_up_on_other_process_writes(client, arkady):
+    # Запись другого процесса: строка и журнал меняются мимо on_commit этого процесса
+    with engine.begin() as connection:
+        connection.execute(update(Client).where(Client.id == arkady).values(contact_person='Аркадий Электричкин'))
+        connection.execute(SearchChange.__table__.insert().values(
+            таблица=Client.__tablename__, ключ=arkady, создано=datetime.now()))
+    assert arkady not in _search(client, 'Электричкин', fuzzy=False)
+
+    search_index.change_feed.poll()
+
+    _eventually(lambda: arkady in _search(client, 'Электричкин', fuzzy=False))
+
+
+def test_large_change_logs_one_rebuild_marker(client):
+    with engine.begin() as connection:
+        connection.execute(delete(SearchChange))
+
+    with session_scope() as session:
+        mark_changed(session, Client, range(1, search_index.CHANGE_FULL_KEYS + 1))
+        session.commit()
+    with session_scope() as session:
+        mark_changed(session, Client, [1, 2])
+        session.commit()
+
+    with engine.connect() as connection:
+        keys = connection.execute(select(SearchChange.key).order_by(SearchChange.id)).scalars().all()
+    assert keys == [None, 1, 2]
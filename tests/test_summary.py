@@ -0,0 +1,59 @@
+"""Счетчики дашборда: пересчет в транзакции записи, полный пересчет и ответы API"""
+import pytest
+from sqlalchemy import select
+
+import summary
+from database import Session
+from models import SummaryCounter
+
+
+@pytest.fixture
+def team(client):
+    client.post('/positions/', params={'position': 'Счетчик', 'responsibilities': '-'})
+    employees = [
+        client.post('/employees/', params={
+            'full_name': f"Счетчик {number}", 'email': f"counter{number}@example.com",
+            'phone': '80000000030', 'position': 'Счетчик',
+        }).json()['id']
+        for number in range(3)
+    ]
+    team = client.post('/teams/', params={'team_leader': employees[0]}).json()
+    return team['id'], employees
+
+
+def _counters():
+    with Session() as session:
+        return set(session.execute(select(SummaryCounter.metric, SummaryCounter.key, SummaryCounter.value)).all())
+
+
+def test_counts_are_integers(client, team):
+    team_id, employees = team
+    client.put(f"/teams/{team_id}/members", json={'members': employees})
+
+    counters = client.get(f"/dashboard/teams/{team_id}").json()
+    assert counters == {'team': team_id, 'open_services': 0, 'active_members': 3}
+    assert isinstance(counters['active_members'], int)
+
+    top = client.get('/dashboard/active_members').json()
+    assert {'key': team_id, 'value': 3} in top
+    assert all(isinstance(row['value'], int) for row in top)
+
+
+def test_refresh_and_rebuild_agree(client, team):
+    team_id, employees = team
+    client.put(f"/teams/{team_id}/members", json={'members': employees[:2]})
+    client.put(f"/teams/{team_id}/members", json={'members': []})
+
+    # Обнуленный счетчик удаляется, как и при полном пересчете
+    assert client.get(f"/dashboard/teams/{team_id}").json()['active_members'] == 0
+    refreshed = _counters()
+    assert ('active_members', team_id) not in {(metric, key) for metric, key, _ in refreshed}
+
+    with Session() as session:
+        summary.rebuild(session)
+        session.commit()
+    assert _counters() == refreshed
+
+
+def test_missing_key_reads_as_zero(client):
+    assert client.get('/dashboard/clients/999999').json() == {'client': 999999, 'unpaid_amount': 0}
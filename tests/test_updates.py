@@ -0,0 +1,69 @@
+"""Обновление одной командой UPDATE ... RETURNING с проверкой версии (If-Match / ETag)"""
+import pytest
+
+
+@pytest.fixture
+def customer(client):
+    return client.post('/clients/', params={
+        'contact_person': 'Версия Тестова', 'phone': '80000000010', 'email': 'version@example.com',
+    }).json()
+
+
+def test_update_bumps_version_and_etag(client, customer):
+    response = client.patch(f"/clients/{customer['id']}", json={'phone': '80000000011'},
+                            headers={'If-Match': f'"{customer["version"]}"'})
+
+    assert response.status_code == 200
+    assert response.json()['phone'] == '80000000011'
+    assert response.json()['version'] == customer['version'] + 1
+    assert response.headers['ETag'] == f'"{customer["version"] + 1}"'
+
+    # Без If-Match версия не проверяется, но растет
+    response = client.put(f"/clients/{customer['id']}", json={'email': 'version2@example.com'})
+    assert response.status_code == 200
+    assert response.headers['ETag'] == f'"{customer["version"] + 2}"'
+
+
+def test_stale_if_match_is_412(client, customer):
+    url = f"/clients/{customer['id']}"
+    assert client.patch(url, json={'phone': '80000000012'},
+                        headers={'If-Match': f'"{customer["version"]}"'}).status_code == 200
+
+    response = client.patch(url, json={'phone': '80000000013'}, headers={'If-Match': f'W/"{customer["version"]}"'})
+
+    assert response.status_code == 412
+    # Отклоненное обновление ничего не меняет
+    current = client.get('/clients/', params={'client_id': customer['id']}).json()
+    assert current['phone'] == '80000000012'
+    assert current['version'] == customer['version'] + 1
+
+
+def test_update_missing_row_is_404(client):
+    assert client.patch('/clients/999999', json={'phone': '80000000014'}).status_code == 404
+    assert client.patch('/clients/999999', json={'phone': '80000000014'},
+                        headers={'If-Match': '"1"'}).status_code == 404
+
+
+def test_empty_patch_is_400(client, customer):
+    assert client.patch(f"/clients/{customer['id']}", json={}).status_code == 400
+
+
+def test_malformed_if_match_is_400(client, customer):
+    response = client.patch(f"/clients/{customer['id']}", json={'phone': '80000000015'},
+                            headers={'If-Match': 'abc'})
+    assert response.status_code == 400
+
+
+def test_update_without_returning(client, customer, monkeypatch):
+    """Диалекты без UPDATE ... RETURNING: число строк и повторное чтение"""
+    import database
+
+    monkeypatch.setattr(database.engine.dialect, 'update_returning', False)
+    url = f"/clients/{customer['id']}"
+
+    response = client.patch(url, json={'phone': '80000000016'}, headers={'If-Match': f'"{customer["version"]}"'})
+    assert response.status_code == 200
+    assert response.headers['ETag'] == f'"{customer["version"] + 1}"'
+
+    response = client.patch(url, json={'phone': '80000000017'}, headers={'If-Match': f'"{customer["version"]}"'})
+    assert response.status_code == 412
@@ -0,0 +1,149 @@
+"""Upsert по первичному ключу (ON CONFLICT, MERGE и переносимый UPDATE + INSERT) и состав команды"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import mssql
+from sqlalchemy.orm import Session
+
+from backends import Backend, MSSQLBackend, SQLiteBackend
+from models import Base, TeamParticipation
+
+
+class PortableBackend(SQLiteBackend):
+    """Бэкенд без ON CONFLICT: upsert по строкам"""
+
+    def _dialect_insert(self):
+        return None
+
+
+def _row(employee: int, active: bool, team: int = 1) -> dict:
+    return {'last_update': datetime(2024, 1, employee), 'active': active, 'employee': employee, 'team': team}
+
+
+@pytest.fixture(params=[SQLiteBackend, PortableBackend])
+def db(request):
+    backend = request.param('sqlite://')
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine, tables=[TeamParticipation.__table__])
+    with Session(engine) as session:
+        yield backend, session
+
+
+def _upsert(backend, session, rows):
+    return backend.upsert(session, TeamParticipation, rows, update=['active', 'last_update'],
+                          changed=['active'], returning=True)
+
+
+def _state(session):
+    return dict(session.execute(select(TeamParticipation.employee, TeamParticipation.active)).all())
+
+
+def test_upsert_inserts_and_updates(db):
+    backend, session = db
+
+    inserted = _upsert(backend, session, [_row(1, True), _row(2, True)])
+    assert sorted(row['сотрудник'] for row in inserted) == [1, 2]
+
+    updated = _upsert(backend, session, [_row(2, False), _row(3, True)])
+    assert sorted(row['сотрудник'] for row in updated) == [2, 3]
+    assert _state(session) == {1: True, 2: False, 3: True}
+
+
+def test_upsert_unchanged_rows_are_not_written(db):
+    backend, session = db
+    _upsert(backend, session, [_row(1, True)])
+
+    # active не изменился — строка не обновляется, даже при новом last_update
+    assert _upsert(backend, session, [{**_row(1, True), 'last_update': datetime(2025, 1, 1)}]) == []
+    assert session.scalar(select(TeamParticipation.last_update)) == datetime(2024, 1, 1)
+
+
+def test_upsert_in_chunks(db):
+    backend, session = db
+    # 4 столбца на строку: по 2 строки в команде
+    backend.max_parameters = 8
+
+    written = _upsert(backend, session, [_row(employee, True) for employee in range(1, 8)])
+
+    assert sorted(row['сотрудник'] for row in written) == list(range(1, 8))
+    assert _state(session) == {employee: True for employee in range(1, 8)}
+
+
+class _RecordingSession:
+    """Сессия, которая запоминает команды MERGE вместо выполнения"""
+
+    def __init__(self):
+        self.statements = []
+
+    def get_bind(self):
+        return type('Bind', (), {'dialect': mssql.dialect()})()
+
+    def execute(self, statement, params):
+        self.statements.append((str(statement), params))
+        return type('Result', (), {'mappings': lambda self: []})()
+
+
+def test_mssql_merge_stays_under_parameter_limit():
+    session = _RecordingSession()
+    rows = [_row(employee % 28 + 1, True, team=employee) for employee in range(1200)]
+
+    MSSQLBackend('mssql+pyodbc://localhost/test').upsert(session, TeamParticipation, rows, update=['active'])
+
+    assert len(session.statements) > 1
+    assert all(len(params) <= MSSQLBackend.max_parameters for _, params in session.statements)
+    assert sum(len(params) for _, params in session.statements) == 1200 * 4
+    assert all(sql.startswith('MERGE INTO') for sql, _ in session.statements)
+
+
+def test_chunks_split_by_parameters():
+    backend = Backend('sqlite://')
+    backend.max_parameters = 10
+    assert [len(chunk) for chunk in backend.chunks(list(range(25)), width=3)] == [3] * 8 + [1]
+    assert list(backend.chunks([])) == []
+
+
+@pytest.fixture
+def team(client):
+    client.post('/positions/', params={'position': 'Участник', 'responsibilities': '-'})
+    employees = [
+        client.post('/employees/', params={
+            'full_name': f"Участник {number}", 'email': f"member{number}@example.com",
+            'phone': '80000000020', 'position': 'Участник',
+        }).json()['id']
+        for number in range(5)
+    ]
+    team = client.post('/teams/', params={'team_leader': employees[0]}).json()
+    return team['id'], employees
+
+
+def _members(client, team_id):
+    return [member['employee'] for member in client.get(f"/teams/{team_id}/members", params={'active': True}).json()]
+
+
+def test_roster_activates_and_deactivates(client, team, monkeypatch):
+    import database
+
+    team_id, employees = team
+    # Маленький лимит параметров: состав и выбывшие обрабатываются частями
+    monkeypatch.setattr(database.backend, 'max_parameters', 8)
+
+    response = client.put(f"/teams/{team_id}/members", json={'members': employees[:4]})
+    assert response.status_code == 200
+    assert (response.json()['activated'], response.json()['deactivated']) == (4, 0)
+
+    response = client.put(f"/teams/{team_id}/members", json={'members': employees[2:]})
+    assert (response.json()['activated'], response.json()['deactivated']) == (1, 2)
+    assert _members(client, team_id) == sorted(employees[2:])
+
+    # Тот же состав — ничего не меняется
+    response = client.put(f"/teams/{team_id}/members", json={'members': employees[2:]})
+    assert (response.json()['activated'], response.json()['deactivated']) == (0, 0)
+
+    response = client.put(f"/teams/{team_id}/members", json={'members': []})
+    assert (response.json()['activated'], response.json()['deactivated']) == (0, 3)
+    assert _members(client, team_id) == []
+
+
+def test_roster_missing_team_is_404(client):
+    assert client.put('/teams/999999/members', json={'members': [1]}).status_code == 404
@@ -0,0 +1,178 @@
+"""Проверка файлов без загрузки (etl.validator, etl_cli import --dry-run)"""
+import os
+import subprocess
+import sys
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from backends import SQLiteBackend
+from etl.batch import RecordBatch
+from etl.validator import KeySnapshot, Validator
+from models import Base, Employee, Payment, Position
+
+EMPLOYEE_COLUMNS = ['id', 'full_name', 'email', 'phone', 'hire_date', 'position', 'dismissed']
+
+
+def _employee(id=1, full_name='Иван Иванов', email='ivan@example.com', phone='80000000050',
+              hire_date=date(2024, 1, 1), position='Бухгалтер', dismissed=False) -> tuple:
+    return id, full_name, email, phone, hire_date, position, dismissed
+
+
+@pytest.fixture
+def snapshot():
+    # Без БД: ссылки проверяются по ключам проверенных файлов
+    snapshot = KeySnapshot()
+    snapshot.add('Должности', 'должность', ['Бухгалтер'])
+    return snapshot
+
+
+def _check(model_class, snapshot, columns, rows, offset=0):
+    validator = Validator(model_class, snapshot)
+    return validator, validator.check(len(rows), RecordBatch(columns, rows, offset))
+
+
+def _found(errors):
+    return [(error['row'], error['column'], error['check']) for error in errors]
+
+
+def test_valid_rows_have_no_errors(snapshot):
+    validator, errors = _check(Employee, snapshot, EMPLOYEE_COLUMNS, [_employee(1), _employee(2)])
+
+    assert errors == []
+    assert validator.summary(errors)['valid'] == 2
+
+
+def test_type(snapshot):
+    _, errors = _check(Employee, snapshot, EMPLOYEE_COLUMNS, [_employee(1), _employee(2, hire_date='вчера')])
+
+    assert _found(errors) == [(2, 'дата_найма', 'type')]
+    assert errors[0]['value'] == 'вчера'
+
+
+def test_numeric_strings_are_converted(snapshot):
+    # Числа строками (внешние ключи после transform) — не ошибка типа
+    _, errors = _check(Payment, snapshot, ['id', 'amount', 'paid'], [('1', '10.50', False), ('2', 'x', True)])
+
+    assert _found(errors) == [(2, 'сумма', 'type')]
+
+
+def test_length(snapshot):
+    _, errors = _check(Employee, snapshot, EMPLOYEE_COLUMNS, [_employee(1, phone='8' * 12)])
+
+    assert _found(errors) == [(1, 'телефон', 'length')]
+
+
+def test_range(snapshot):
+    _, errors = _check(Payment, snapshot, ['id', 'amount', 'paid'], [
+        (2 ** 31, Decimal('1.00'), False),
+        (2, Decimal('100000000.00'), False),
+        (3, Decimal('99999999.99'), True),
+    ])
+
+    assert _found(errors) == [(1, 'id', 'range'), (2, 'сумма', 'range')]
+
+
+def test_required(snapshot):
+    _, errors = _check(Employee, snapshot, EMPLOYEE_COLUMNS, [_employee(None), _employee(2, full_name=None)])
+
+    # Пустой целый первичный ключ выдаст БД
+    assert _found(errors) == [(2, 'фио', 'required')]
+
+
+def test_duplicate_across_batches(snapshot):
+    validator = Validator(Position, snapshot)
+    columns = ['position', 'responsibilities']
+
+    assert validator.check(2, RecordBatch(columns, [('Юрист', '-'), ('Кассир', '-')])) == []
+    errors = validator.check(2, RecordBatch(columns, [('Кассир', '-'), ('Курьер', '-')], offset=2))
+
+    assert _found(errors) == [(3, 'должность', 'duplicate')]
+    assert errors[0]['message'] == 'Ключ повторяет запись 2'
+    assert validator.summary(errors)['invalid'] == 1
+
+
+def test_foreign_key(snapshot):
+    _, errors = _check(Employee, snapshot, EMPLOYEE_COLUMNS, [_employee(1), _employee(2, position='Пилот')])
+
+    assert _found(errors) == [(2, 'должность', 'foreign_key')]
+
+
+def test_checked_file_keys_satisfy_references(snapshot):
+    # Ключи строк без ошибок доступны ссылкам следующих файлов
+    _check(Position, snapshot, ['position', 'responsibilities'], [('Пилот', '-'), ('x' * 40, '-')])
+
+    _, errors = _check(Employee, snapshot, EMPLOYEE_COLUMNS, [_employee(1, position='Пилот'),
+                                                             _employee(2, position='x' * 40)])
+
+    # Строка с ошибкой длины в ключи не попала
+    assert _found(errors) == [(2, 'должность', 'length'), (2, 'должность', 'foreign_key')]
+
+
+def test_column_reported_once(snapshot):
+    validator = Validator(Position, snapshot)
+    columns = ['position', 'responsibilities', 'extra']
+
+    errors = validator.check(1, RecordBatch(columns, [('Юрист', '-', 1)]))
+    assert _found(errors) == [(None, 'extra', 'column')]
+    assert validator.check(1, RecordBatch(columns, [('Кассир', '-', 1)], offset=1)) == []
+
+
+@pytest.fixture
+def database_file(tmp_path):
+    path = tmp_path / 'snapshot.db'
+    backend = SQLiteBackend(f"sqlite:///{path}")
+    engine = backend.create_engine()
+    Base.metadata.create_all(engine, tables=[Position.__table__])
+    with engine.begin() as connection:
+        connection.execute(Position.__table__.insert(), [{'должность': 'Юрист', 'обязанности': '-'}])
+    engine.dispose()
+    return backend
+
+
+def test_snapshot_reads_database_keys(database_file):
+    with KeySnapshot(database_file) as snapshot:
+        missing = snapshot.missing(Position.__table__, 'должность', {'Юрист', 'Пилот'})
+
+    assert missing == {'Пилот'}
+
+
+def test_snapshot_engine_is_read_only(database_file):
+    engine = database_file.read_only_engine()
+    try:
+        with engine.connect() as connection, pytest.raises(OperationalError):
+            connection.execute(text('DELETE FROM "Должности"'))
+    finally:
+        engine.dispose()
+
+
+def test_snapshot_without_database_file(tmp_path):
+    path = tmp_path / 'missing.db'
+
+    with KeySnapshot(SQLiteBackend(f"sqlite:///{path}")) as snapshot:
+        assert snapshot.missing(Position.__table__, 'должность', {'Юрист'}) == {'Юрист'}
+
+    assert not path.exists()
+
+
+def test_dry_run_does_not_create_database(tmp_path):
+    path = tmp_path / 'missing.db'
+    data = tmp_path / 'должности.csv'
+    data.write_text('должность,обязанности\nЮрист,Договоры\nЮрист,Суды\n', encoding='utf-8')
+    root = Path(__file__).resolve().parent.parent
+
+    result = subprocess.run(
+        [sys.executable, str(root / 'etl_cli.py'), 'import', '--file', str(data), '--dry-run'],
+        cwd=tmp_path, capture_output=True, text=True, timeout=120,
+        env={**os.environ, 'DATABASE_URL': f"sqlite:///{path}"},
+    )
+
+    # Повтор ключа найден, БД не создана
+    assert result.returncode != 0
+    assert 'duplicate' in result.stdout
+    assert not path.exists()
+    assert list(tmp_path.iterdir()) == [data]